@@ -0,0 +1,81 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+# Compares peak memory and duration of a commit that serialises the full text before
+# writing it with one that streams the text into the file. Every commit runs in a fresh
+# interpreter, so the peak RSS of one does not hide another. Linux only.
+#
+#   python benchmark/bench_commit.py [--size 100MB] [--yaml]
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from common import UNITS, Sampler, anonymous_rss, make_content, parse_size, peak_rss
+from mrjsonstore import JsonStore
+from mrjsonstore.serialisers import json_codecs, yaml_codec
+
+CODECS = {**json_codecs, 'yaml': yaml_codec}
+
+
+def child(directory: str, size: str, codec_name: str, method: str) -> None:
+    codec = CODECS[codec_name]
+    if method == 'serialise':
+        codec = codec._replace(dump=None)
+    store = JsonStore(os.path.join(directory, f'{codec_name}-{method}'), codec=codec).unwrap()
+    store.content.update(make_content(parse_size(size)))
+    baseline, baseline_anonymous = peak_rss(), anonymous_rss()
+    sampler = Sampler()
+    sampler.start()
+    start = time.perf_counter()
+    store.commit().unwrap()
+    duration = time.perf_counter() - start
+    sampler.stopped.set()
+    sampler.join()
+    result = {
+        'duration': duration,
+        'peak': peak_rss() - baseline,
+        'anonymous': max(sampler.peak, anonymous_rss()) - baseline_anonymous,
+    }
+    print(json.dumps(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', default='100MB')
+    parser.add_argument('--yaml', action='store_true', help='include the much slower YAML codec')
+    parser.add_argument('--child', nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(
+            f'{"codec":>11} {"method":>10} {"duration [s]":>13} {"peak RSS [MB]":>14}'
+            f' {"peak anon [MB]":>15}'
+        )
+        for codec_name, codec in CODECS.items():
+            if codec is yaml_codec and not args.yaml:
+                continue
+            for method in ['serialise', 'dump'] if codec.dump else ['serialise']:
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', directory, args.size, codec_name, method],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f'{codec_name:>11} {method:>10} {result["duration"]:>13.3f}'
+                    f' {result["peak"] / UNITS["MB"]:>14.1f}'
+                    f' {result["anonymous"] / UNITS["MB"]:>15.1f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
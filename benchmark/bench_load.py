@@ -0,0 +1,91 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+# Compares peak memory and duration of loading a store by reading its full text with the
+# streaming load of each codec. Every load runs in a fresh interpreter, so the peak RSS of
+# one does not hide another. Linux only.
+#
+#   python benchmark/bench_load.py [--size 100MB]
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from common import UNITS, Sampler, anonymous_rss, make_record, parse_size, peak_rss
+from mrjsonstore.serialisers import json_codecs
+
+
+def write_content(filename: str, size: int) -> None:
+    per_record = len(json.dumps({'user-0': make_record(0)}))
+    with open(filename, 'w') as f:
+        f.write('{')
+        for i in range(max(1, size // per_record)):
+            f.write(('' if i == 0 else ', ') + json.dumps(f'user-{i}') + ': ')
+            f.write(json.dumps(make_record(i)))
+        f.write('}')
+
+
+def child(filename: str, codec_name: str, method: str) -> None:
+    codec = json_codecs[codec_name]
+    baseline, baseline_anonymous = peak_rss(), anonymous_rss()
+    sampler = Sampler()
+    sampler.start()
+    start = time.perf_counter()
+    with open(filename, encoding='utf-8') as f:
+        if method == 'read':
+            content = codec.deserialise(f.read())
+        else:
+            assert codec.load
+            content = codec.load(f)
+    duration = time.perf_counter() - start
+    sampler.stopped.set()
+    sampler.join()
+    result = {
+        'keys': len(content),
+        'duration': duration,
+        'peak': peak_rss() - baseline,
+        'anonymous': max(sampler.peak, anonymous_rss()) - baseline_anonymous,
+    }
+    print(json.dumps(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', default='100MB')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'bench.json')
+        write_content(filename, parse_size(args.size))
+        size = os.path.getsize(filename)
+        print(f'file size: {size / UNITS["MB"]:.1f} MB')
+        print(
+            f'{"codec":>11} {"method":>8} {"duration [s]":>13} {"peak RSS [MB]":>14}'
+            f' {"peak anon [MB]":>15}'
+        )
+        for codec_name, codec in json_codecs.items():
+            for method in ['read', 'load'] if codec.load else ['read']:
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', filename, codec_name, method],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f'{codec_name:>11} {method:>8} {result["duration"]:>13.3f}'
+                    f' {result["peak"] / UNITS["MB"]:>14.1f}'
+                    f' {result["anonymous"] / UNITS["MB"]:>15.1f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+# Compares the copied snapshot used by untracked stores with the undo log used by
+# tracked stores: cost of opening a transaction and of rolling it back after touching
+# a few keys, over store sizes from 1 KB to 100 MB.
+#
+#   python benchmark/bench_rollback.py [--max-size 100MB] [--touched 10]
+
+import os
+import time
+import argparse
+import tempfile
+
+from common import make_content, parse_size
+from mrjsonstore import JsonStore
+
+SIZES = ['1KB', '10KB', '100KB', '1MB', '10MB', '100MB']
+
+
+def measure(content: dict, tracked: bool, touched: int, repeat: int) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        store = JsonStore(os.path.join(directory, 'bench.json'), dry_run=True, tracked=tracked)
+        store = store.unwrap()
+        store._content = content
+        keys = list(content)[:touched]
+        open_time = rollback_time = 0.0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            t = store.transaction()
+            open_time += time.perf_counter() - start
+            for key in keys:
+                store.content[key]['score'] = -1
+            start = time.perf_counter()
+            t.rollback()
+            rollback_time += time.perf_counter() - start
+        return open_time / repeat, rollback_time / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-size', default='100MB', choices=SIZES)
+    parser.add_argument('--touched', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"size":>6} {"strategy":>10} {"open [ms]":>12} {"rollback [ms]":>14}')
+    for size in SIZES[: SIZES.index(args.max_size) + 1]:
+        content = make_content(parse_size(size))
+        for strategy, tracked in [('serialised', False), ('undo log', True)]:
+            open_time, rollback_time = measure(content, tracked, args.touched, args.repeat)
+            print(
+                f'{size:>6} {strategy:>10} {open_time * 1000:>12.3f} {rollback_time * 1000:>14.3f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+# Helpers shared by the benchmark scripts.
+
+import os
+import sys
+import json
+import resource
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+UNITS = {'KB': 1024, 'MB': 1024 * 1024, 'GB': 1024 * 1024 * 1024}
+
+
+def parse_size(size: str) -> int:
+    return int(size[:-2]) * UNITS[size[-2:]]
+
+
+def make_record(i: int, depth: int = 1) -> dict:
+    record: dict = {'id': i, 'name': f'user-{i}', 'tags': ['a', 'b'], 'score': i * 0.5}
+    for level in range(1, depth):
+        record = {'level': level, 'child': record}
+    return record
+
+
+def make_content(size: int, depth: int = 1) -> dict:
+    # top-level keys holding records nested `depth` levels deep, about `size` bytes as JSON
+    per_record = len(json.dumps({'user-0': make_record(0, depth)}))
+    return {f'user-{i}': make_record(i, depth) for i in range(max(1, size // per_record))}
+
+
+def peak_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def anonymous_rss() -> int:
+    # resident pages that are not backed by a file; pages of a mapped file count towards
+    # the peak RSS, but the kernel can drop them at any time
+    with open('/proc/self/statm') as f:
+        _, resident, shared = f.read().split()[:3]
+    return (int(resident) - int(shared)) * resource.getpagesize()
+
+
+class Sampler(threading.Thread):
+    def __init__(self) -> None:
+        super().__init__(daemon=True)
+        self.peak = anonymous_rss()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(0.005):
+            self.peak = max(self.peak, anonymous_rss())
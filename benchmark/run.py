@@ -0,0 +1,191 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+# Measures loading a store, opening a transaction, committing and rolling back, over file
+# format, store size, nesting depth and dry_run. Results can be written to a JSON file and
+# compared with the results of an earlier run; the exit status is 1 if any case got slower
+# than the threshold allows.
+#
+#   python benchmark/run.py [--sizes 10KB,100KB,1MB] [--depths 1,8] [--formats json,yaml]
+#                           [--repeat 7] [--output results.json]
+#                           [--compare baseline.json] [--threshold 0.2] [--filter commit]
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from common import make_content, parse_size
+from mrjsonstore import JsonStore
+
+CASES = ['load', 'transaction', 'commit', 'rollback']
+TOUCHED = 10
+
+
+def open_store(filename: str, dry_run: bool, tracked: bool) -> JsonStore:
+    return JsonStore(filename, dry_run=dry_run, tracked=tracked).unwrap()
+
+
+def touch(store: JsonStore, keys: List[str], value: int) -> None:
+    for key in keys:
+        record = store.content[key]
+        while 'child' in record:
+            record = record['child']
+        record['score'] = value
+
+
+def bench_load(filename: str, dry_run: bool, tracked: bool) -> Iterator[Callable[[], object]]:
+    while True:
+        yield lambda: open_store(filename, dry_run, tracked)
+
+
+def bench_transaction(
+    filename: str, dry_run: bool, tracked: bool
+) -> Iterator[Callable[[], object]]:
+    # opening a transaction takes the rollback snapshot
+    store = open_store(filename, dry_run, tracked)
+    while True:
+        yield store.transaction
+        store.rollback()
+
+
+def bench_commit(filename: str, dry_run: bool, tracked: bool) -> Iterator[Callable[[], object]]:
+    store = open_store(filename, dry_run, tracked)
+    keys = list(store.content)[:TOUCHED]
+    for i in range(sys.maxsize):
+        t = store.transaction()
+        touch(store, keys, -i)
+        yield t.commit
+
+
+def bench_rollback(filename: str, dry_run: bool, tracked: bool) -> Iterator[Callable[[], object]]:
+    store = open_store(filename, dry_run, tracked)
+    keys = list(store.content)[:TOUCHED]
+    for i in range(sys.maxsize):
+        t = store.transaction()
+        touch(store, keys, -i)
+        yield t.rollback
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'transaction': bench_transaction,
+    'commit': bench_commit,
+    'rollback': bench_rollback,
+}
+
+
+def measure(benchmark: Iterator[Callable[[], object]], repeat: int) -> List[float]:
+    # every run gets its own set-up from the generator, only the call itself is timed
+    durations = []
+    for _ in range(repeat + 1):
+        call = next(benchmark)
+        start = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - start)
+    # the first run warms up caches
+    return durations[1:]
+
+
+def run(args: argparse.Namespace) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for file_format in args.formats:
+            for size in args.sizes:
+                for depth in args.depths:
+                    filename = os.path.join(directory, f'{size}-{depth}.{file_format}')
+                    store = open_store(filename, False, False)
+                    store.content.update(make_content(parse_size(size), depth))
+                    store.commit().unwrap()
+                    for case in CASES:
+                        for dry_run in [False, True]:
+                            name = f'{case}/{file_format}/{size}/depth={depth}/dry_run={dry_run}'
+                            if args.filter and args.filter not in name:
+                                continue
+                            durations = measure(
+                                BENCHMARKS[case](filename, dry_run, args.tracked), args.repeat
+                            )
+                            results[name] = {
+                                'min': min(durations),
+                                'median': statistics.median(durations),
+                                'repeat': args.repeat,
+                            }
+                            print(
+                                f'{name:<50} {min(durations) * 1000:>10.3f}'
+                                f' {statistics.median(durations) * 1000:>10.3f}',
+                                flush=True,
+                            )
+    return results
+
+
+def metadata() -> dict:
+    directory = os.path.dirname(os.path.abspath(__file__))
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], cwd=directory, capture_output=True, text=True
+    ).stdout.strip()
+    return {
+        'revision': revision or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(
+    baseline: Dict[str, dict], results: Dict[str, dict], threshold: float
+) -> List[Tuple[str, float]]:
+    # compares the fastest runs, which are least affected by noise
+    regressions = []
+    print(f'\n{"case":<50} {"baseline":>10} {"current":>10} {"ratio":>7}')
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['min'] / baseline[name]['min']
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append((name, ratio))
+        print(
+            f'{name:<50} {baseline[name]["min"] * 1000:>10.3f} {result["min"] * 1000:>10.3f}'
+            f' {ratio:>7.2f}{"  REGRESSION" if regressed else ""}'
+        )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10KB,100KB,1MB', type=lambda x: x.split(','))
+    parser.add_argument('--depths', default='1,8', type=lambda x: [int(d) for d in x.split(',')])
+    parser.add_argument('--formats', default='json,yaml', type=lambda x: x.split(','))
+    parser.add_argument('--tracked', action='store_true', help='benchmark tracked stores')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--filter', help='only run cases whose name contains this')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare with the results in this JSON file')
+    parser.add_argument(
+        '--threshold', type=float, default=0.2, help='tolerated slowdown, 0.2 is 20%%'
+    )
+    args = parser.parse_args()
+
+    print(f'{"case":<50} {"min [ms]":>10} {"median [ms]":>10}')
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': metadata(), 'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} case(s) slower than {1 + args.threshold:.2f}x baseline')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,15 @@
 from mrjsonstore import JsonStore
 
 def write():
-    store = JsonStore('example.json')
-    with store() as x:
-        assert isinstance(x, dict)
-        x['woohoo'] = 'I am just a Python dictionary'
+    # shared stores are only loaded once per process
+    store = JsonStore.open('example.json', shared=True).unwrap()
+    with store.transaction():
+        assert isinstance(store.content, dict)
+        store.content['woohoo'] = 'I am just a Python dictionary'
 
 def read():
-    store = JsonStore('example.json')
-    with store() as x:
-        assert x['woohoo'] == 'I am just a Python dictionary'
+    store = JsonStore.open('example.json', shared=True).unwrap()
+    assert store.content['woohoo'] == 'I am just a Python dictionary'
 
 write()
 read()
@@ -1,6 +1,27 @@
 # Copyright 2024 Ole Kliemann
 # SPDX-License-Identifier: Apache-2.0
 
-from mrjsonstore.json_store import JsonStore, Transaction
+from mrjsonstore.json_store import JsonStore, Transaction, Savepoint
+from mrjsonstore.serialisers import Codec, register_codec
+from mrjsonstore.locking import ConcurrentModificationError
+from mrjsonstore.async_json_store import AsyncJsonStore, AsyncTransaction
+from mrjsonstore.readonly import ReadOnlyJsonStore
+from mrjsonstore.sharded_json_store import ShardedJsonStore, ShardedTransaction
+from mrjsonstore.convert import convert
+from mrjsonstore.metrics import Metrics
 
-__all__ = ['JsonStore', 'Transaction']
+__all__ = [
+    'JsonStore',
+    'Transaction',
+    'Savepoint',
+    'Codec',
+    'register_codec',
+    'ConcurrentModificationError',
+    'AsyncJsonStore',
+    'AsyncTransaction',
+    'ShardedJsonStore',
+    'ShardedTransaction',
+    'ReadOnlyJsonStore',
+    'convert',
+    'Metrics',
+]
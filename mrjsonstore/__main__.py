@@ -0,0 +1,28 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+import argparse
+from typing import List, Optional
+
+from mrjsonstore.convert import convert
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m mrjsonstore',
+        description='Convert a store between file formats, chosen by file extension.',
+    )
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    parser.add_argument('--journal', action='store_true', help='replay the journal of the source')
+    args = parser.parse_args(argv)
+    result = convert(args.source, args.destination, journal=args.journal)
+    if not result:
+        print(f'{parser.prog}: {result.unwrap_err()}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Generator, MutableMapping, Optional, TypeVar, cast
+from drresult import noexcept, Ok, Err, Result
+
+from mrjsonstore.json_store import JsonStore, Transaction
+
+T = TypeVar('T')
+
+
+class AsyncJsonStore:
+    def __init__(self, store: JsonStore, executor: Optional[Executor] = None):
+        self._store = store
+        self._executor = executor
+        self._lock = asyncio.Lock()
+        self._current_transaction: Optional['AsyncTransaction'] = None
+
+    @classmethod
+    async def open(
+        cls, filename: str, executor: Optional[Executor] = None, **kwargs: Any
+    ) -> Result['AsyncJsonStore']:
+        loop = asyncio.get_running_loop()
+        store = await loop.run_in_executor(
+            executor, lambda: cast(Result[JsonStore], JsonStore(filename, **kwargs))
+        )
+        if not store:
+            return store
+        return Ok(cls(store.unwrap(), executor))
+
+    @property
+    def store(self) -> JsonStore:
+        return self._store
+
+    @property
+    def content(self) -> MutableMapping[str, Any]:
+        return self._store.content
+
+    @property
+    def current_transaction(self) -> Optional['AsyncTransaction']:
+        return self._current_transaction
+
+    @noexcept
+    def transaction(self, rollback: bool = True) -> 'AsyncTransaction':
+        return AsyncTransaction(self, rollback)
+
+    async def load(self) -> Result[None]:
+        return await self._run(self._store.load)
+
+    async def commit(self) -> Result[Transaction.State]:
+        if self._owns_current_transaction():
+            assert self._current_transaction
+            return await self._current_transaction.commit()
+        async with self.transaction(rollback=False) as t:
+            pass
+        return t.result
+
+    async def rollback(self) -> None:
+        assert self._current_transaction and self._owns_current_transaction()
+        await self._current_transaction.rollback()
+
+    def _owns_current_transaction(self) -> bool:
+        transaction = self._current_transaction
+        return bool(transaction and transaction._owner is asyncio.current_task())
+
+    async def _run(self, func: Callable[[], T], release: bool = False) -> T:
+        # the executor cannot abandon a write halfway through; when the awaiting task is
+        # cancelled, the store stays locked until the write has finished
+        future = asyncio.get_running_loop().run_in_executor(self._executor, func)
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if release:
+                future.add_done_callback(lambda _: self._lock.release())
+            raise
+        except BaseException:
+            if release:
+                self._lock.release()
+            raise
+        if release:
+            self._lock.release()
+        return result
+
+
+class AsyncTransaction:
+    def __init__(self, store: AsyncJsonStore, rollback: bool):
+        self._store = store
+        self._rollback = rollback
+        self._transaction: Optional[Transaction] = None
+        self._owner: Optional[asyncio.Task] = None
+        self._abandoning: Optional[asyncio.Future] = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self._transaction and self._transaction.active)
+
+    @property
+    def result(self) -> Result[Transaction.State]:
+        if not self._transaction:
+            return Err(ValueError(Transaction.State.Active))
+        return self._transaction.result
+
+    @property
+    def transaction(self) -> Optional[Transaction]:
+        return self._transaction
+
+    def __await__(self) -> Generator[Any, None, 'AsyncTransaction']:
+        return self._begin().__await__()
+
+    async def __aenter__(self) -> 'AsyncTransaction':
+        return await self._begin()
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        assert self._transaction and self._transaction.active
+        if exc_type and self._rollback:
+            await self.rollback()
+        else:
+            await self.commit()
+
+    async def commit(self) -> Result[Transaction.State]:
+        assert self._transaction and self._transaction.active
+        self._store._current_transaction = None
+        return await self._store._run(self._transaction.commit, release=True)
+
+    async def rollback(self) -> None:
+        assert self._transaction and self._transaction.active and self._rollback
+        self._store._current_transaction = None
+        await self._store._run(self._transaction.rollback, release=True)
+
+    async def _begin(self) -> 'AsyncTransaction':
+        assert not self._transaction
+        assert not self._store._owns_current_transaction()
+        await self._store._lock.acquire()
+        store = self._store._store
+        future = asyncio.get_running_loop().run_in_executor(
+            self._store._executor, lambda: store.transaction(rollback=self._rollback)
+        )
+        try:
+            self._transaction = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(self._abandon)
+            raise
+        except BaseException:
+            self._store._lock.release()
+            raise
+        self._owner = asyncio.current_task()
+        self._store._current_transaction = self
+        return self
+
+    def _abandon(self, future: asyncio.Future) -> None:
+        # the task was cancelled while the transaction was being opened
+        if future.cancelled() or future.exception():
+            self._store._lock.release()
+            return
+        transaction = future.result()
+        end = transaction.rollback if self._rollback else transaction.commit
+        self._abandoning = asyncio.ensure_future(self._store._run(end, release=True))
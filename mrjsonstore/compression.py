@@ -0,0 +1,87 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import os
+import gzip
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+
+class Compression(NamedTuple):
+    name: str
+    # wrap the raw file; closing the wrapper must leave the file open
+    reader: Callable[[IO[bytes]], Any]
+    writer: Callable[[IO[bytes], Optional[int]], Any]
+
+
+def _gzip_writer(f: IO[bytes], level: Optional[int]) -> gzip.GzipFile:
+    # the modification time is left out, so the same content compresses to the same file
+    return gzip.GzipFile(
+        filename='', fileobj=f, mode='wb', compresslevel=6 if level is None else level, mtime=0
+    )
+
+
+gzip_compression = Compression('gzip', lambda f: gzip.GzipFile(fileobj=f, mode='rb'), _gzip_writer)
+
+
+def _missing_compression(name: str, module: str) -> Compression:
+    # keeps the extension from silently being read as uncompressed
+    def fail(*args: Any) -> Any:
+        raise ImportError(f'{module} is required for {name} files')
+
+    return Compression(name, fail, fail)
+
+
+def _make_zstd_compression() -> Compression:
+    try:
+        import zstandard
+    except ImportError:
+        return _missing_compression('zstd', 'zstandard')
+    return Compression(
+        'zstd',
+        lambda f: zstandard.ZstdDecompressor().stream_reader(f, closefd=False),
+        lambda f, level: zstandard.ZstdCompressor(
+            level=3 if level is None else level
+        ).stream_writer(f, closefd=False),
+    )
+
+
+zstd_compression = _make_zstd_compression()
+
+compressions_by_extension: Dict[str, Compression] = {
+    '.gz': gzip_compression,
+    '.zst': zstd_compression,
+}
+
+
+def split_compression(filename: str) -> Tuple[str, Optional[Compression]]:
+    # 'store.json.gz' is a gzip compressed 'store.json'
+    name, extension = os.path.splitext(filename)
+    compression = compressions_by_extension.get(extension)
+    if compression:
+        return name, compression
+    return filename, None
+
+
+@contextmanager
+def open_stream(
+    f: IO[bytes],
+    compression: Optional[Compression],
+    writing: bool,
+    binary: bool,
+    level: Optional[int] = None,
+) -> Iterator[IO[Any]]:
+    # wraps the raw file for the codec; the wrappers are closed on exit, the file itself is
+    # left open
+    stream: Any = f
+    if compression:
+        stream = compression.writer(f, level) if writing else compression.reader(f)
+    text = None if binary else io.TextIOWrapper(stream, encoding='utf-8')
+    try:
+        yield text or stream
+    finally:
+        if text:
+            text.detach()
+        if stream is not f:
+            stream.close()
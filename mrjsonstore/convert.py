@@ -0,0 +1,29 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from typing import Optional, cast
+from drresult import returns_result, Ok, Result
+
+from mrjsonstore.json_store import JsonStore
+from mrjsonstore.serialisers import Codec
+
+
+@returns_result
+def convert(
+    source: str,
+    destination: str,
+    journal: bool = False,
+    source_codec: Optional[Codec] = None,
+    destination_codec: Optional[Codec] = None,
+) -> Result[None]:
+    # the formats are chosen by the extensions of the file names unless codecs are given;
+    # a journal of the source is replayed, and any journal of the destination is compacted
+    reader = cast(Result[JsonStore], JsonStore(source, journal=journal, codec=source_codec))
+    content = reader.unwrap_or_raise().content
+    writer = cast(
+        Result[JsonStore], JsonStore(destination, journal=True, codec=destination_codec)
+    ).unwrap_or_raise()
+    writer.content.clear()
+    writer.content.update(content)
+    writer.compact().unwrap_or_raise()
+    return Ok(None)
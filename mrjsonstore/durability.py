@@ -0,0 +1,120 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import atexit
+import threading
+import weakref
+from typing import IO, Any, Dict, Optional
+from atomicwrites import AtomicWriter
+
+# weakest first; every level replaces the file atomically, they differ in when the data
+# and the rename reach the disk
+DURABILITY_LEVELS = ['rename-only', 'periodic', 'full']
+
+
+def check_durability(durability: str) -> None:
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f'Invalid durability: {durability!r}')
+
+
+def strongest(a: Optional[str], b: str) -> str:
+    if a is None:
+        return b
+    return max(a, b, key=DURABILITY_LEVELS.index)
+
+
+def sync_path(path: str) -> None:
+    # fsyncs the file, if it still exists, and the directory holding its name
+    for name in [path, os.path.dirname(os.path.abspath(path))]:
+        try:
+            fd = os.open(name, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class DurableAtomicWriter(AtomicWriter):
+    def __init__(self, path: str, durability: str = 'full', **kwargs: Any):
+        super().__init__(path, **kwargs)
+        self._durability = durability
+
+    def sync(self, f: IO[Any]) -> None:
+        if self._durability == 'full':
+            super().sync(f)
+        else:
+            f.flush()
+
+    def commit(self, f: IO[Any]) -> None:
+        if self._durability == 'full' or not self._overwrite:
+            super().commit(f)
+        else:
+            os.replace(f.name, self._path)
+
+
+class PeriodicSyncer:
+    # fsyncs the files written since the last round at most once per interval
+    def __init__(self, interval: float):
+        self._interval = interval
+        self._condition = threading.Condition()
+        self._paths: Dict[str, None] = {}
+        self._error: Optional[OSError] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='mrjsonstore-sync')
+        self._thread.daemon = True
+        self._thread.start()
+        _running_syncers.add(self)
+
+    def mark(self, path: str) -> None:
+        with self._condition:
+            self._paths[path] = None
+
+    def sync(self) -> None:
+        with self._condition:
+            paths, self._paths = self._paths, {}
+            error, self._error = self._error, None
+        if error:
+            raise error
+        for path in paths:
+            sync_path(path)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        _running_syncers.discard(self)
+        self.sync()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed, timeout=self._interval)
+                if self._closed:
+                    return
+            try:
+                self.sync()
+            except OSError as e:
+                # reported by the next explicit sync
+                with self._condition:
+                    self._error = e
+
+
+_running_syncers: 'weakref.WeakSet[PeriodicSyncer]' = weakref.WeakSet()
+
+
+@atexit.register
+def _close_syncers() -> None:
+    # registered before the write-behind threads are closed at exit, so it runs after them
+    # and syncs what they wrote last
+    errors = []
+    for syncer in list(_running_syncers):
+        try:
+            syncer.close()
+        except OSError as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
@@ -0,0 +1,63 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+from typing import Callable, Dict
+
+
+class GroupCommitter:
+    def __init__(self, lock: threading.Lock, flush: Callable[[], None], window: float, size: int):
+        self._lock = lock
+        self._flush = flush
+        self._window = window
+        self._size = size
+        self._condition = threading.Condition()
+        self._requested = 0
+        self._completed = 0
+        self._flushing = False
+        self._errors: Dict[int, Exception] = {}
+
+    def enqueue(self) -> int:
+        # called with the transaction lock held, so the changes of this ticket are in the
+        # content by the time a flush acquires the lock
+        with self._condition:
+            self._requested += 1
+            self._condition.notify_all()
+            return self._requested
+
+    def wait(self, ticket: int) -> None:
+        with self._condition:
+            while self._completed < ticket:
+                if self._flushing:
+                    self._condition.wait()
+                else:
+                    self._lead()
+            error = self._errors.pop(ticket, None)
+        if error:
+            raise error
+
+    def _lead(self) -> None:
+        self._flushing = True
+        try:
+            self._condition.wait_for(
+                lambda: self._requested - self._completed >= self._size, timeout=self._window
+            )
+            self._condition.release()
+            error = None
+            try:
+                with self._lock:
+                    with self._condition:
+                        target = self._requested
+                    try:
+                        self._flush()
+                    except Exception as e:
+                        error = e
+            finally:
+                self._condition.acquire()
+            if error:
+                for ticket in range(self._completed + 1, target + 1):
+                    self._errors[ticket] = error
+            self._completed = target
+        finally:
+            self._flushing = False
+            self._condition.notify_all()
@@ -0,0 +1,76 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, Hashable, Iterable, List
+
+from mrjsonstore.patch import resolve
+from mrjsonstore.snapshot import MISSING, Path
+
+
+def index_key(value: Any) -> Hashable:
+    # lists and objects are compared by value, like every other JSON value
+    if isinstance(value, (dict, list)):
+        return ('json', json.dumps(value, sort_keys=True))
+    return value
+
+
+def field_value(record: Any, field: Path) -> Any:
+    try:
+        return resolve(record, field)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return MISSING
+
+
+class Index:
+    # maps the values of a field to the keys of the records in a collection that have it;
+    # records without the field are not indexed
+    def __init__(self, collection: Path, field: Path):
+        self.collection = collection
+        self.field = field
+        self._keys: Dict[Hashable, Dict[Any, None]] = {}
+        self._values: Dict[Any, Hashable] = {}
+
+    def build(self, content: dict) -> None:
+        self._keys.clear()
+        self._values.clear()
+        records = field_value(content, self.collection)
+        if isinstance(records, Mapping):
+            for key, record in records.items():
+                self._add(key, record)
+
+    def update(self, content: dict, changed: Iterable[Path]) -> None:
+        depth = len(self.collection)
+        records = field_value(content, self.collection)
+        for path in changed:
+            if path[:depth] != self.collection[: len(path)]:
+                continue
+            if len(path) <= depth:
+                # the collection itself was replaced
+                self.build(content)
+                return
+            key = path[depth]
+            self._remove(key)
+            if isinstance(records, Mapping) and key in records:
+                self._add(key, records[key])
+
+    def lookup(self, value: Any) -> List[Any]:
+        return list(self._keys.get(index_key(value), ()))
+
+    def _add(self, key: Any, record: Any) -> None:
+        value = field_value(record, self.field)
+        if value is MISSING:
+            return
+        value = index_key(value)
+        self._keys.setdefault(value, {})[key] = None
+        self._values[key] = value
+
+    def _remove(self, key: Any) -> None:
+        value = self._values.pop(key, MISSING)
+        if value is MISSING:
+            return
+        keys = self._keys[value]
+        del keys[key]
+        if not keys:
+            del self._keys[value]
@@ -0,0 +1,86 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+from typing import Any, List
+
+from mrjsonstore.durability import sync_path
+from mrjsonstore.patch import to_pointer, apply_operation, copy_tree
+
+
+def same_value(a: Any, b: Any) -> bool:
+    # like ==, but 1, 1.0 and True are different values in the file, at any depth
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same_value(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same_value(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def diff_top_level(old: dict, new: dict) -> List[dict]:
+    operations: List[dict] = []
+    for key, value in new.items():
+        if key not in old or not same_value(old[key], value):
+            operations.append({'op': 'add', 'path': to_pointer([key]), 'value': value})
+    for key in old.keys() - new.keys():
+        operations.append({'op': 'remove', 'path': to_pointer([key])})
+    return operations
+
+
+class Journal:
+    def __init__(self, filename: str):
+        self._filename = filename
+        self._entries: int = 0
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def entries(self) -> int:
+        return self._entries
+
+    def replay(self, content: dict, truncate: bool = True) -> None:
+        self._entries = 0
+        if not os.path.exists(self._filename):
+            return
+        valid = 0
+        with open(self._filename, 'rb') as f:
+            lines = f.readlines()
+        for n, line in enumerate(lines):
+            try:
+                operations = json.loads(line)
+            except ValueError:
+                if n == len(lines) - 1 and not line.endswith(b'\n'):
+                    # torn write of the last entry, it was never acknowledged
+                    break
+                raise
+            for operation in operations:
+                apply_operation(content, operation, strict=False)
+            valid += len(line)
+            self._entries += 1
+        if truncate and valid < os.path.getsize(self._filename):
+            with open(self._filename, 'r+b') as f:
+                f.truncate(valid)
+
+    def append(self, operations: List[dict], sync: bool = True) -> int:
+        line = json.dumps(operations).encode() + b'\n'
+        created = not os.path.exists(self._filename)
+        with open(self._filename, 'ab') as f:
+            f.write(line)
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+        if sync and created:
+            # the new name of the journal has to reach the disk as well
+            sync_path(self._filename)
+        self._entries += 1
+        return len(line)
+
+    def clear(self) -> None:
+        if os.path.exists(self._filename):
+            os.remove(self._filename)
+        self._entries = 0
@@ -2,87 +2,764 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import os
-import yaml
-import json
+import time
+import threading
+from concurrent.futures import Future, wait
 from enum import Enum
-from typing import Optional, Callable, NewType
+from typing import (
+    IO,
+    Any,
+    ContextManager,
+    Dict,
+    List,
+    MutableMapping,
+    MutableSequence,
+    Optional,
+    Callable,
+    Sequence,
+    Tuple,
+    Union,
+    NewType,
+    cast,
+)
 from atomicwrites import atomic_write
 from drresult import returns_result, constructs_as_result, noexcept, gather_result, Ok, Err, Result
-
-json_serialiser: Callable[[dict], str] = lambda x: json.dumps(x)
-yaml_serialiser: Callable[[dict], str] = lambda x: yaml.safe_dump(x)
-
-json_deserialiser: Callable[[str], dict] = lambda x: json.loads(x)
-yaml_deserialiser: Callable[[str], dict] = lambda x: yaml.safe_load(x)
+from mrjsonstore.compression import open_stream, split_compression
+from mrjsonstore.durability import (
+    DurableAtomicWriter,
+    PeriodicSyncer,
+    check_durability,
+    strongest,
+)
+from mrjsonstore.group_commit import GroupCommitter
+from mrjsonstore.index import Index, field_value
+from mrjsonstore.journal import Journal, copy_tree, diff_top_level
+from mrjsonstore.locking import (
+    ConcurrentModificationError,
+    FileLock,
+    FileStamp,
+    Stamp,
+    file_stamp,
+    locking_supported,
+)
+from mrjsonstore.metrics import Metrics, TimedAtomicWriter, TimedWriter
+from mrjsonstore.patch import (
+    PathPart,
+    apply_operation,
+    apply_patch,
+    parse_path,
+    resolve,
+    to_pointer,
+)
+from mrjsonstore.readonly import ReadOnlyJsonStore
+from mrjsonstore.registry import registry
+from mrjsonstore.serialisers import Codec, codec_for_filename
+from mrjsonstore.streaming import HashingReader, HashingWriter, Spool
+from mrjsonstore.snapshot import CopiedSnapshot, UndoLog, UnloadedSnapshot
+from mrjsonstore.tracking import (
+    Path,
+    Tracker,
+    TrackedDict,
+    minimal_paths,
+    operations_for_paths,
+    unwrap,
+)
+from mrjsonstore.write_behind import WriteBehind
 
 
 @constructs_as_result
 class JsonStore:
-    def __init__(self, filename: str, dry_run: bool = False):
+    def __init__(
+        self,
+        filename: str,
+        dry_run: bool = False,
+        journal: bool = False,
+        compact_after: int = 1000,
+        tracked: bool = False,
+        lazy: bool = False,
+        codec: Optional[Codec] = None,
+        locking: bool = False,
+        on_conflict: str = 'fail',
+        threadsafe: bool = False,
+        group_commit_window: Optional[float] = None,
+        group_commit_size: int = 64,
+        write_behind: bool = False,
+        compression_level: Optional[int] = None,
+        metrics: Optional[Metrics] = None,
+        durability: str = 'full',
+        sync_interval: float = 1.0,
+    ):
         self._filename = filename
         self._dry_run = dry_run
+        self._compact_after = compact_after
+        self._journal: Optional[Journal] = None
+        self._persisted: dict = {}
+        self._tracker: Optional[Tracker] = None
+        self._dirty: Dict[Path, None] = {}
+        if tracked:
+            self._tracker = Tracker()
+            self._dirty = self._tracker.attach()
         self._content: dict = {}
+        self._loaded: bool = False
         self._current_transaction: Optional['Transaction'] = None
-        _, extension = os.path.splitext(self._filename)
-        if extension == '.yaml' or extension == '.yml':
-            self._serialiser = yaml_serialiser
-            self._deserialiser = yaml_deserialiser
-        else:
-            self._serialiser = json_serialiser
-            self._deserialiser = json_deserialiser
-        if os.path.exists(self._filename):
-            with open(self._filename) as f:
-                self._content = self._deserialiser(f.read())
+        self._codec = codec or codec_for_filename(self._filename)
+        _, self._compression = split_compression(self._filename)
+        self._compression_level = compression_level
+        self._metrics = metrics
+        if journal:
+            self._journal = Journal(self._filename + '.journal')
+        if on_conflict not in ('fail', 'merge'):
+            raise ValueError(f'Invalid conflict policy: {on_conflict!r}')
+        if on_conflict == 'merge' and not tracked:
+            raise ValueError('Merging concurrent changes requires tracked=True')
+        self._on_conflict = on_conflict
+        check_durability(durability)
+        self._durability = durability
+        self._requested_durability: Optional[str] = None
+        self._sync_interval = sync_interval
+        self._syncer: Optional[PeriodicSyncer] = None
+        self._syncer_lock = threading.Lock()
+        self._lock: Optional[FileLock] = None
+        self._stamp: Optional[Stamp] = None
+        self._shared = False
+        self._files_seen: Optional[Tuple[FileStamp, FileStamp]] = None
+        if locking:
+            if not locking_supported:
+                raise ValueError('Locking requires fcntl, which this platform does not provide')
+            self._lock = FileLock(self._filename + '.lock')
+        self._transaction_lock: Optional[threading.Lock] = None
+        if threadsafe:
+            self._transaction_lock = threading.Lock()
+        self._read_view: Optional[dict] = None
+        self._publish_views = False
+        self._fingerprint: Optional[bytes] = None
+        self._skipped_commits = 0
+        self._operations: List[dict] = []
+        self._indexes: Dict[Tuple[Path, Path], Index] = {}
+        self._index_changes: Dict[Path, None] = {}
+        self._group_committer: Optional[GroupCommitter] = None
+        if group_commit_window is not None:
+            if not self._transaction_lock:
+                raise ValueError('Group commit requires threadsafe=True')
+            self._group_committer = GroupCommitter(
+                self._transaction_lock, self._flush, group_commit_window, group_commit_size
+            )
+        self._write_behind: Optional[WriteBehind] = None
+        if write_behind:
+            if locking or self._group_committer:
+                raise ValueError('Write-behind cannot be combined with locking or group commit')
+            self._write_behind = WriteBehind(self._persist_unlocked)
+        if not lazy:
+            self._load()
+
+    @staticmethod
+    @returns_result
+    def open(filename: str, shared: bool = False, **kwargs: Any) -> Result['JsonStore']:
+        # a shared store is loaded once per process and options, and reloaded when its
+        # files were changed by someone else
+        if not shared:
+            return cast(Result[JsonStore], JsonStore(filename, **kwargs))
+        key = (os.path.realpath(filename), tuple(sorted(kwargs.items())))
+        return registry.open(key, lambda: JsonStore._open_shared(filename, kwargs))
+
+    @staticmethod
+    def _open_shared(filename: str, kwargs: Dict[str, Any]) -> Result['JsonStore']:
+        store = cast(Result[JsonStore], JsonStore(filename, **kwargs))
+        if store:
+            store.unwrap()._shared = True
+        return store
+
+    @staticmethod
+    def open_readonly(filename: str, **kwargs: Any) -> Result[ReadOnlyJsonStore]:
+        return cast(Result[ReadOnlyJsonStore], ReadOnlyJsonStore(filename, **kwargs))
 
     @property
-    def content(self) -> dict:
+    def content(self) -> MutableMapping[str, Any]:
+        if not self._loaded:
+            self.load().unwrap_or_raise()
+        if self._tracker:
+            return TrackedDict(self._content, (), self._tracker)
         return self._content
 
+    @property
+    def codec(self) -> Codec:
+        return self._codec
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def skipped_commits(self) -> int:
+        return self._skipped_commits
+
+    @property
+    def metrics(self) -> Optional[Metrics]:
+        return self._metrics
+
+    @property
+    def durability(self) -> str:
+        return self._durability
+
     @property
     def current_transaction(self) -> Optional['Transaction']:
         return self._current_transaction
 
     @noexcept
-    def transaction(self, rollback: bool = True) -> 'Transaction':
-        assert not self._current_transaction or not self._current_transaction._active
-        self._current_transaction = Transaction(self, rollback=rollback)
-        return self._current_transaction
+    def transaction(
+        self,
+        rollback: bool = True,
+        timeout: Optional[float] = None,
+        durability: Optional[str] = None,
+    ) -> 'Transaction':
+        return self.try_transaction(
+            rollback=rollback, timeout=timeout, durability=durability
+        ).unwrap_or_raise()
+
+    @returns_result
+    def try_transaction(
+        self,
+        rollback: bool = True,
+        timeout: Optional[float] = None,
+        durability: Optional[str] = None,
+    ) -> Result['Transaction']:
+        if durability is not None:
+            check_durability(durability)
+        if self._owns_current_transaction():
+            assert self._current_transaction
+            return Ok(self._current_transaction.savepoint(rollback=rollback, durability=durability))
+        self._acquire(timeout)
+        try:
+            assert not self._current_transaction or not self._current_transaction._active
+            if self._lock and self._loaded and self._current_stamp() != self._stamp:
+                with self._lock.shared():
+                    self._reload()
+            self._current_transaction = Transaction(self, rollback, durability)
+        except BaseException:
+            self._release()
+            raise
+        return Ok(self._current_transaction)
 
     @noexcept
     def rollback(self) -> None:
-        assert self._current_transaction and self._current_transaction._active
+        assert self._current_transaction and self._owns_current_transaction()
         self._current_transaction.rollback()
         self._current_transaction = None
 
     @returns_result
     def commit(self) -> Result['Transaction.State']:
-        if not self._current_transaction or not self._current_transaction._active:
-            transaction = Transaction(self, rollback=False)
-        else:
+        if self._current_transaction and self._owns_current_transaction():
             transaction = self._current_transaction
             self._current_transaction = None
+        else:
+            self._acquire(None)
+            transaction = Transaction(self, rollback=False)
         return transaction.commit()
 
+    @returns_result
+    def get(self, path: Union[str, Sequence[PathPart]]) -> Result[Any]:
+        return Ok(resolve(self.content, parse_path(path)))
+
+    @returns_result
+    def set(self, path: Union[str, Sequence[PathPart]], value: Any) -> Result[None]:
+        # replaces list elements instead of inserting before them, '-' appends
+        parts = parse_path(path)
+        parent = resolve(self.content, parts[:-1])
+        op = 'replace' if isinstance(parent, MutableSequence) and parts[-1:] != ['-'] else 'add'
+        return self.apply_patch([{'op': op, 'path': to_pointer(parts), 'value': value}])
+
+    @returns_result
+    def delete(self, path: Union[str, Sequence[PathPart]]) -> Result[None]:
+        return self.apply_patch([{'op': 'remove', 'path': to_pointer(parse_path(path))}])
+
+    @returns_result
+    def apply_patch(self, operations: Sequence[dict]) -> Result[None]:
+        apply_patch(self.content, operations)
+        self._operations.extend(
+            (
+                dict(operation, value=copy_tree(unwrap(operation['value'])))
+                if 'value' in operation
+                else dict(operation)
+            )
+            for operation in operations
+        )
+        return Ok(None)
+
+    @returns_result
+    def create_index(
+        self, collection: Union[str, Sequence[PathPart]], field: Union[str, Sequence[PathPart]]
+    ) -> Result[None]:
+        # indexes are kept up to date from the paths the tracker records
+        if not self._tracker:
+            raise ValueError('Indexes require tracked=True')
+        index = Index(tuple(parse_path(collection)), tuple(parse_path(field)))
+        if (index.collection, index.field) in self._indexes:
+            return Ok(None)
+        if not self._indexes:
+            self._index_changes = self._tracker.attach()
+        if self._loaded:
+            index.build(self._content)
+        self._indexes[(index.collection, index.field)] = index
+        return Ok(None)
+
+    @returns_result
+    def drop_index(
+        self, collection: Union[str, Sequence[PathPart]], field: Union[str, Sequence[PathPart]]
+    ) -> Result[None]:
+        del self._indexes[(tuple(parse_path(collection)), tuple(parse_path(field)))]
+        if not self._indexes:
+            assert self._tracker
+            self._tracker.detach(self._index_changes)
+            self._index_changes = {}
+        return Ok(None)
+
+    @returns_result
+    def find(
+        self,
+        collection: Union[str, Sequence[PathPart]],
+        field: Union[str, Sequence[PathPart]],
+        value: Any,
+    ) -> Result[Dict[Any, Any]]:
+        # the records in the collection whose field equals value, by key; without an index
+        # on the field, the collection is scanned
+        collection_path, field_path = tuple(parse_path(collection)), tuple(parse_path(field))
+        records = resolve(self.content, collection_path)
+        index = self._indexes.get((collection_path, field_path))
+        if index:
+            self._update_indexes()
+            keys = index.lookup(value)
+        else:
+            data = resolve(self._content, collection_path)
+            keys = [key for key in data if field_value(data[key], field_path) == value]
+        return Ok({key: records[key] for key in keys})
+
+    @noexcept
+    def read_view(self) -> dict:
+        view = self._read_view
+        if view is None:
+            # only the first view waits for the transaction, later ones are published by the
+            # commits
+            assert not self._owns_current_transaction()
+            self._acquire(None)
+            try:
+                if not self._loaded:
+                    self._load()
+                self._publish_views = True
+                if self._read_view is None:
+                    self._publish_view()
+                view = self._read_view
+            finally:
+                self._release()
+        assert view is not None
+        return view
+
+    @returns_result
+    def load(self) -> Result[None]:
+        if not self._loaded:
+            self._load()
+        return Ok(None)
+
+    @returns_result
+    def compact(self) -> Result[None]:
+        if not self._loaded:
+            self._load()
+        if self._dry_run:
+            return Ok(None)
+        if self._write_behind:
+            with self._write_behind.lock:
+                self._compact(self._content, self._durability)
+        else:
+            self._locked_write(lambda: self._compact(self._content, self._durability))
+        return Ok(None)
+
+    @returns_result
+    def flush(self) -> Result[None]:
+        if self._write_behind:
+            self._write_behind.flush()
+        if self._syncer:
+            self._syncer.sync()
+        return Ok(None)
+
+    @returns_result
+    def close(self) -> Result[None]:
+        if self._write_behind:
+            self._write_behind.close()
+        with self._syncer_lock:
+            syncer, self._syncer = self._syncer, None
+        if syncer:
+            syncer.close()
+        return Ok(None)
+
+    def _load(self) -> None:
+        if self._lock and (
+            os.path.exists(self._filename)
+            or (self._journal and os.path.exists(self._journal.filename))
+        ):
+            with self._lock.shared():
+                self._content = self._read()
+        else:
+            self._content = self._read()
+        self._loaded = True
+        self._build_indexes()
+
+    def _read(self) -> dict:
+        if self._lock:
+            self._stamp = self._current_stamp()
+        self._files_seen = self._files_stamp()
+        self._fingerprint = None
+        content: dict = {}
+        if os.path.exists(self._filename):
+            metrics = self._metrics
+            start = time.perf_counter() if metrics else 0.0
+            with open(self._filename, 'rb') as raw, self._open_stream(raw, False) as f:
+                # the fingerprint of the text as read lets the first commit be skipped too
+                reader = HashingReader(f)
+                if self._codec.load:
+                    content = self._codec.load(cast(IO[Any], reader))
+                else:
+                    content = self._codec.deserialise(reader.read())
+                self._fingerprint = reader.digest()
+            if metrics:
+                metrics.observe('deserialise', time.perf_counter() - start)
+        if self._journal:
+            self._journal.replay(content)
+            if not self._tracker:
+                self._persisted = copy_tree(content)
+        return content
+
+    def _open_stream(self, f: IO[bytes], writing: bool) -> ContextManager[IO[Any]]:
+        return open_stream(
+            f, self._compression, writing, self._codec.binary, self._compression_level
+        )
+
+    def _reload(self) -> None:
+        content = self._read()
+        self._content.clear()
+        self._content.update(content)
+        self._dirty.clear()
+        self._operations.clear()
+        self._publish_view()
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        self._index_changes.clear()
+        for index in self._indexes.values():
+            index.build(self._content)
+
+    def _invalidate_indexes(self, paths: Dict[Path, None]) -> None:
+        # for changes the tracker did not see, like restoring an undo log
+        if self._indexes:
+            self._index_changes.update(paths)
+
+    def _update_indexes(self) -> None:
+        if self._index_changes:
+            changed = minimal_paths(self._index_changes)
+            self._index_changes.clear()
+            for index in self._indexes.values():
+                index.update(self._content, changed)
+
+    def _files_stamp(self) -> Tuple[FileStamp, FileStamp]:
+        return (
+            file_stamp(self._filename),
+            file_stamp(self._journal.filename) if self._journal else None,
+        )
+
+    def _record_files(self) -> None:
+        # a shared store notices when its files change, but not because of its own writes
+        if self._shared:
+            self._files_seen = self._files_stamp()
+
+    def _revalidate(self) -> None:
+        # drops changes that were not committed, like any reload
+        if not self._loaded or self._owns_current_transaction():
+            return
+        if self._write_behind:
+            self._write_behind.flush()
+        if self._files_stamp() == self._files_seen:
+            return
+        self._acquire(None)
+        try:
+            if self._files_stamp() != self._files_seen:
+                if self._lock:
+                    with self._lock.shared():
+                        self._reload()
+                else:
+                    self._reload()
+        finally:
+            self._release()
+
+    def _resident_bytes(self) -> int:
+        if not self._loaded or not self._files_seen:
+            return 0
+        return sum(stamp[2] for stamp in self._files_seen if stamp)
+
+    def _current_stamp(self) -> Stamp:
+        assert self._lock
+        return (
+            self._lock.generation(),
+            file_stamp(self._filename),
+            file_stamp(self._journal.filename) if self._journal else None,
+        )
+
+    def _merge(self) -> None:
+        operations = operations_for_paths(self._content, self._dirty)
+        content = self._read()
+        try:
+            for operation in operations:
+                apply_operation(content, operation, strict=False)
+        except (KeyError, IndexError, ValueError) as e:
+            raise ConcurrentModificationError(
+                f'Cannot merge changes into concurrently modified {self._filename}: {e!r}'
+            ) from e
+        self._content.clear()
+        self._content.update(content)
+        self._publish_view()
+        self._build_indexes()
+
+    def _publish_view(self) -> None:
+        # called with the transaction lock held, once the content is consistent
+        if self._publish_views and self._loaded:
+            self._read_view = copy_tree(self._content)
+        else:
+            self._read_view = None
+
+    def _locked_write(self, write: Callable[[], bool]) -> None:
+        if not self._lock:
+            write()
+            return
+        with self._lock.exclusive():
+            if self._current_stamp() != self._stamp:
+                if self._on_conflict != 'merge':
+                    raise ConcurrentModificationError(
+                        f'{self._filename} was modified by another writer since it was loaded'
+                    )
+                self._merge()
+            if write():
+                self._lock.bump()
+                self._stamp = self._current_stamp()
+
+    def _compact(self, content: dict, durability: str) -> bool:
+        self._write(content, durability)
+        if self._journal:
+            self._journal.clear()
+            self._record_files()
+        return True
+
+    def _acquire(self, timeout: Optional[float]) -> None:
+        if self._transaction_lock and not self._transaction_lock.acquire(
+            timeout=-1 if timeout is None else timeout
+        ):
+            raise TimeoutError(f'Timed out waiting for transaction on {self._filename}')
+
+    def _release(self) -> None:
+        if self._transaction_lock:
+            self._transaction_lock.release()
+
+    def _owns_current_transaction(self) -> bool:
+        transaction = self._current_transaction
+        if not transaction or not transaction._active:
+            return False
+        return not self._transaction_lock or transaction._owner == threading.get_ident()
+
+    def _unload(self) -> None:
+        self._read_view = None
+        self._content = {}
+        self._persisted = {}
+        self._loaded = False
+
+    def _write(self, content: dict, durability: str) -> bool:
+        # the text is hashed before the file is opened; if it is the same as last time,
+        # nothing is written. Up to a limit, the text is kept from that pass and written as
+        # it is, larger texts are serialised again
+        metrics = self._metrics
+        start = time.perf_counter() if metrics else 0.0
+        spool = Spool()
+        writer = HashingWriter(cast(IO[Any], spool))
+        self._serialise(content, cast(IO[Any], writer))
+        fingerprint = writer.digest()
+        if metrics:
+            metrics.observe('serialise', time.perf_counter() - start)
+        if fingerprint == self._fingerprint and os.path.exists(self._filename):
+            self._skip()
+            return False
+        writer_kwargs: Dict[str, Any] = {'writer_cls': DurableAtomicWriter}
+        if metrics:
+            writer_kwargs = {'writer_cls': TimedAtomicWriter, 'metrics': metrics}
+        writer_kwargs['durability'] = durability
+        with atomic_write(self._filename, mode='wb', overwrite=True, **writer_kwargs) as raw:
+            start = time.perf_counter() if metrics else 0.0
+            timed = None
+            with self._open_stream(raw, True) as f:
+                if spool.chunks is not None:
+                    for chunk in spool.chunks:
+                        f.write(chunk)
+                else:
+                    timed = TimedWriter(f) if metrics else None
+                    self._serialise(content, cast(IO[Any], timed) if timed else f)
+            if metrics:
+                # closing the stream flushes the encoder and compressor into the file
+                seconds = time.perf_counter() - start
+                if timed:
+                    metrics.observe('serialise', seconds - timed.seconds)
+                    seconds = timed.seconds
+                metrics.observe('write', seconds)
+                metrics.increment('bytes_written', raw.tell())
+        self._fingerprint = fingerprint
+        self._record_files()
+        if durability == 'periodic':
+            self._mark_unsynced(self._filename)
+        return True
+
+    def _serialise(self, content: dict, f: IO[Any]) -> None:
+        if self._codec.dump:
+            self._codec.dump(content, f)
+        else:
+            f.write(self._codec.serialise(content))
+
+    def _mark_unsynced(self, filename: str) -> None:
+        # write-behind writes from its own thread
+        with self._syncer_lock:
+            if not self._syncer:
+                self._syncer = PeriodicSyncer(self._sync_interval)
+            self._syncer.mark(filename)
+
+    def _request_durability(self, durability: str) -> None:
+        # commits that are written together get the strongest durability any of them asked for
+        self._requested_durability = strongest(self._requested_durability, durability)
+
+    def _take_durability(self) -> str:
+        durability = self._requested_durability or self._durability
+        self._requested_durability = None
+        return durability
+
+    def _skip(self) -> None:
+        self._skipped_commits += 1
+        if self._metrics:
+            self._metrics.increment('skipped_commits')
+
+    def _skip_unchanged(self) -> bool:
+        if self._tracker and not self._dirty:
+            self._skip()
+            return True
+        return False
+
+    def _append(self, operations: List[dict], durability: str) -> None:
+        assert self._journal
+        metrics = self._metrics
+        start = time.perf_counter() if metrics else 0.0
+        written = self._journal.append(operations, sync=durability == 'full')
+        self._record_files()
+        if metrics:
+            metrics.observe('journal', time.perf_counter() - start)
+            metrics.increment('bytes_written', written)
+        if durability == 'periodic':
+            self._mark_unsynced(self._journal.filename)
+
+    def _flush(self) -> None:
+        durability = self._take_durability()
+        if not self._dry_run and self._loaded and not self._skip_unchanged():
+            self._persist(durability)
+        self._dirty.clear()
+
+    def _persist(self, durability: str) -> None:
+        self._locked_write(lambda: self._persist_unlocked(self._content, self._dirty, durability))
+
+    def _persist_unlocked(self, content: dict, dirty: Dict[Path, None], durability: str) -> bool:
+        if not self._journal:
+            return self._write(content, durability)
+        if self._tracker:
+            operations = operations_for_paths(content, dirty)
+            if operations:
+                self._append(operations, durability)
+        else:
+            operations = diff_top_level(self._persisted, content)
+            if operations:
+                self._append(operations, durability)
+            for operation in operations:
+                if 'value' in operation:
+                    operation = dict(operation, value=copy_tree(operation['value']))
+                apply_operation(self._persisted, operation)
+        if not operations:
+            self._skip()
+            return False
+        if self._journal.entries >= self._compact_after:
+            self._compact(content, durability)
+        return True
+
 
 class Transaction:
-    State = Enum('State', ['Active', 'Committed', 'Rolledback'])
+    State = Enum('State', ['Active', 'Pending', 'Committed', 'Rolledback'])
 
-    def __init__(self, store: JsonStore, rollback: bool):
+    def __init__(self, store: JsonStore, rollback: bool, durability: Optional[str] = None):
         self._store = store
-        self._rollback: Optional[str] = None
+        self._durability = durability or store._durability
+        self._rollback: Optional[CopiedSnapshot | UndoLog | UnloadedSnapshot] = None
         if rollback:
-            self._rollback = json.dumps(store._content)
+            metrics = store._metrics
+            start = time.perf_counter() if metrics else 0.0
+            if not store._loaded:
+                self._rollback = UnloadedSnapshot(store._unload)
+            elif store._tracker:
+                self._rollback = store._tracker.attach_undo_log()
+            else:
+                self._rollback = CopiedSnapshot(store._content)
+            if metrics:
+                metrics.observe('snapshot', time.perf_counter() - start)
+        self._changed: Dict[Path, None] = {}
+        if store._tracker:
+            self._changed = store._tracker.attach()
         self._active: bool = True
+        self._owner = threading.get_ident()
         self._result: Result[Transaction.State] = Err(ValueError(Transaction.State.Active))
+        self._pending: Optional[Future] = None
+        self._savepoints: List[Savepoint] = []
+        self._operations_start = len(store._operations)
+        self._operations: List[dict] = []
 
     @property
     def active(self) -> bool:
         return self._active
 
+    @property
+    def operations(self) -> List[dict]:
+        # the patch of the changes made through the path API, once committed
+        return self._operations
+
     @property
     def result(self) -> Result['Transaction.State']:
+        pending = self._pending
+        if pending and pending.done():
+            error = pending.exception()
+            self._result = Err(error) if error else Ok(Transaction.State.Committed)
+            self._pending = None
         return self._result
 
+    @noexcept
+    def wait(self, timeout: Optional[float] = None) -> Result['Transaction.State']:
+        pending = self._pending
+        if pending:
+            wait([pending], timeout)
+        return self.result
+
+    @noexcept
+    def changed_paths(self) -> List[Path]:
+        assert self._store._tracker
+        return minimal_paths(self._changed)
+
+    @property
+    def durability(self) -> str:
+        return self._durability
+
+    @noexcept
+    def savepoint(self, rollback: bool = True, durability: Optional[str] = None) -> 'Savepoint':
+        # the transaction writes the changes of its savepoints, so it takes on their durability
+        assert self._active and self._owner == threading.get_ident()
+        if durability:
+            self._durability = strongest(self._durability, durability)
+        savepoint = Savepoint(self, rollback)
+        self._savepoints.append(savepoint)
+        return savepoint
+
     @noexcept
     def __enter__(self) -> 'Transaction':
         assert self._active
@@ -99,20 +776,114 @@ class Transaction:
     @returns_result
     def commit(self) -> Result['Transaction.State']:
         assert self._active
+        metrics = self._store._metrics
+        start = time.perf_counter() if metrics else 0.0
         self._active = False
-        with gather_result() as result:
-            if not self._store._dry_run:
-                with atomic_write(self._store._filename, overwrite=True) as f:
-                    f.write(self._store._serialiser(self._store._content))
-            result.set(Ok(Transaction.State.Committed))
-        self._result = result.get()
+        self._detach()
+        self._operations, self._store._operations = self._store._operations, []
+        released = False
+        try:
+            with gather_result() as result:
+                self._store._publish_view()
+                committer = self._store._group_committer
+                writer = self._store._write_behind
+                state = Transaction.State.Committed
+                self._store._request_durability(self._durability)
+                if committer and not self._store._dry_run and self._store._loaded:
+                    ticket = committer.enqueue()
+                    self._store._release()
+                    released = True
+                    committer.wait(ticket)
+                elif writer and not self._store._dry_run and self._store._loaded:
+                    durability = self._store._take_durability()
+                    if not self._store._skip_unchanged():
+                        self._pending = writer.submit(
+                            copy_tree(self._store._content), dict(self._store._dirty), durability
+                        )
+                        self._store._dirty.clear()
+                        state = Transaction.State.Pending
+                else:
+                    self._store._flush()
+                result.set(Ok(state))
+            self._result = result.get()
+        finally:
+            if not released:
+                self._store._release()
+        if metrics and self._result:
+            metrics.observe('commit', time.perf_counter() - start)
+            metrics.increment('commits')
         return self._result
 
     @noexcept
     def rollback(self) -> None:
         assert self._active and self._rollback
-        self._store._content.clear()
-        self._store._content.update(json.loads(self._rollback))
+        metrics = self._store._metrics
+        start = time.perf_counter() if metrics else 0.0
+        try:
+            self._rollback.restore(self._store._content)
+            self._store._invalidate_indexes(self._changed)
+            del self._store._operations[self._operations_start :]
+            self._detach()
+            self._rollback = None
+            self._active = False
+            self._result = Ok(Transaction.State.Rolledback)
+        finally:
+            self._store._release()
+        if metrics:
+            metrics.observe('rollback', time.perf_counter() - start)
+            metrics.increment('rollbacks')
+
+    def _close_savepoints(self, first: Optional['Savepoint'] = None) -> None:
+        # closing a savepoint closes all savepoints taken after it
+        index = self._savepoints.index(first) if first else 0
+        for savepoint in reversed(self._savepoints[index:]):
+            savepoint._active = False
+            savepoint._detach()
+        del self._savepoints[index:]
+
+    def _detach(self) -> None:
+        self._close_savepoints()
+        if self._store._tracker:
+            self._store._tracker.detach(self._changed)
+            if isinstance(self._rollback, UndoLog):
+                self._store._tracker.detach_undo_log(self._rollback)
+
+
+class Savepoint(Transaction):
+    # changes since the savepoint can be rolled back on their own; committing the savepoint
+    # keeps them in its transaction, which is the only one to write them
+    def __init__(self, transaction: Transaction, rollback: bool):
+        super().__init__(transaction._store, rollback, transaction._durability)
+        self._transaction = transaction
+
+    @property
+    def durability(self) -> str:
+        return self._transaction._durability
+
+    @noexcept
+    def savepoint(self, rollback: bool = True, durability: Optional[str] = None) -> 'Savepoint':
+        assert self._active
+        return self._transaction.savepoint(rollback=rollback, durability=durability)
+
+    @returns_result
+    def commit(self) -> Result['Transaction.State']:
+        assert self._active
+        self._transaction._close_savepoints(self)
+        self._operations = self._store._operations[self._operations_start :]
+        self._result = Ok(Transaction.State.Committed)
+        return self._result
+
+    @noexcept
+    def rollback(self) -> None:
+        assert self._active and self._rollback
+        metrics = self._store._metrics
+        start = time.perf_counter() if metrics else 0.0
+        self._transaction._close_savepoints(self)
+        self._rollback.restore(self._store._content)
+        self._store._invalidate_indexes(self._changed)
+        del self._store._operations[self._operations_start :]
         self._rollback = None
-        self._active = False
         self._result = Ok(Transaction.State.Rolledback)
+        if metrics:
+            metrics.observe('rollback', time.perf_counter() - start)
+            metrics.increment('rollbacks')
@@ -0,0 +1,67 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+locking_supported = fcntl is not None
+FileStamp = Optional[Tuple[int, int, int]]
+Stamp = Tuple[int, FileStamp, FileStamp]
+
+
+class ConcurrentModificationError(Exception):
+    pass
+
+
+def file_stamp(filename: str) -> FileStamp:
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class FileLock:
+    def __init__(self, filename: str):
+        if fcntl is None:
+            raise OSError('File locking requires fcntl')
+        self._filename = filename
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        with self._locked(fcntl.LOCK_SH):
+            yield
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._locked(fcntl.LOCK_EX):
+            yield
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        with open(self._filename, 'a') as f:
+            fcntl.flock(f.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def generation(self) -> int:
+        # bumped by every writer, so cooperating processes notice each other's commits
+        # even where inode, mtime and size of the store happen to match
+        try:
+            with open(self._filename) as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def bump(self) -> None:
+        generation = self.generation() + 1
+        with open(self._filename, 'w') as f:
+            f.write(str(generation))
@@ -0,0 +1,68 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import time
+import threading
+from typing import IO, Any, Dict, NamedTuple, Union
+from mrjsonstore.durability import DurableAtomicWriter
+
+
+class Timing(NamedTuple):
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+
+class Metrics:
+    # Phases: deserialise, snapshot, serialise, write, fsync, rename, journal, commit and
+    # rollback. Counters: commits, skipped_commits, rollbacks and bytes_written. Override
+    # observe() and increment() to forward them elsewhere; they are called from the
+    # committing thread, which is the background thread in write-behind mode.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.timings: Dict[str, Timing] = {}
+        self.counters: Dict[str, int] = {}
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            timing = self.timings.get(phase, Timing())
+            self.timings[phase] = Timing(
+                timing.calls + 1, timing.total + seconds, max(timing.max, seconds)
+            )
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+
+class TimedAtomicWriter(DurableAtomicWriter):
+    def __init__(self, path: str, metrics: Metrics, **kwargs: Any):
+        super().__init__(path, **kwargs)
+        self._metrics = metrics
+
+    def sync(self, f: IO[Any]) -> None:
+        start = time.perf_counter()
+        super().sync(f)
+        self._metrics.observe('fsync', time.perf_counter() - start)
+
+    def commit(self, f: IO[Any]) -> None:
+        start = time.perf_counter()
+        super().commit(f)
+        self._metrics.observe('rename', time.perf_counter() - start)
+
+
+class TimedWriter:
+    # times the writes into the file, which include encoding and compression
+    def __init__(self, f: IO[Any]):
+        self._f = f
+        self.seconds = 0.0
+
+    def write(self, data: Union[str, bytes]) -> int:
+        start = time.perf_counter()
+        try:
+            return self._f.write(data)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def writable(self) -> bool:
+        return True
@@ -0,0 +1,150 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from collections.abc import MutableSequence
+from typing import Any, List, Sequence, Union
+
+PathPart = Union[str, int]
+
+
+def to_pointer(parts: Sequence[PathPart]) -> str:
+    return ''.join('/' + str(part).replace('~', '~0').replace('/', '~1') for part in parts)
+
+
+def from_pointer(pointer: str) -> List[str]:
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise ValueError(f'Invalid JSON pointer: {pointer!r}')
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def parse_path(path: Union[str, Sequence[PathPart]]) -> List[PathPart]:
+    # 'a/b/0' and '/a/b/0' both address content['a']['b'][0]
+    if not isinstance(path, str):
+        return list(path)
+    return list(from_pointer(path if path.startswith('/') or not path else '/' + path))
+
+
+def _index(container: MutableSequence, part: PathPart, allow_end: bool = False) -> int:
+    if allow_end and part == '-':
+        return len(container)
+    if isinstance(part, int):
+        index = part
+    elif part.isdigit() and (part == '0' or not part.startswith('0')):
+        index = int(part)
+    else:
+        raise ValueError(f'Invalid list index: {part!r}')
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise IndexError(f'List index out of range: {index}')
+    return index
+
+
+def copy_tree(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: copy_tree(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_tree(v) for v in value]
+    return value
+
+
+def resolve(document: Any, parts: Sequence[PathPart]) -> Any:
+    for part in parts:
+        # tracked lists are no list instances
+        if isinstance(document, MutableSequence):
+            document = document[_index(document, part)]
+        else:
+            document = document[part]
+    return document
+
+
+def expand_operation(document: Any, operation: dict) -> List[dict]:
+    # move, copy and test in terms of add and remove
+    match operation['op']:
+        case 'move':
+            if (operation['path'] + '/').startswith(operation['from'] + '/'):
+                if operation['path'] == operation['from']:
+                    return []
+                raise ValueError(f'Cannot move {operation["from"]!r} into itself')
+            value = resolve(document, from_pointer(operation['from']))
+            return [
+                {'op': 'remove', 'path': operation['from']},
+                {'op': 'add', 'path': operation['path'], 'value': value},
+            ]
+        case 'copy':
+            value = copy_tree(resolve(document, from_pointer(operation['from'])))
+            return [{'op': 'add', 'path': operation['path'], 'value': value}]
+        case 'test':
+            if resolve(document, from_pointer(operation['path'])) != operation['value']:
+                raise ValueError(f'Test failed: {operation["path"]!r}')
+            return []
+    return [operation]
+
+
+def apply_operation(document: dict, operation: dict, strict: bool = True) -> None:
+    if operation['op'] in ('move', 'copy', 'test'):
+        for step in expand_operation(document, operation):
+            apply_operation(document, step, strict)
+        return
+    parts = from_pointer(operation['path'])
+    if not parts:
+        raise ValueError('Cannot apply operation to document root')
+    parent = resolve(document, parts[:-1])
+    key = parts[-1]
+    match operation['op']:
+        case 'add' | 'replace':
+            if isinstance(parent, MutableSequence):
+                index = _index(parent, key, allow_end=True)
+                if operation['op'] == 'add':
+                    parent.insert(index, operation['value'])
+                else:
+                    parent[index] = operation['value']
+            else:
+                if operation['op'] == 'replace' and strict and key not in parent:
+                    raise KeyError(key)
+                parent[key] = operation['value']
+        case 'remove':
+            if isinstance(parent, MutableSequence):
+                del parent[_index(parent, key)]
+            elif key in parent:
+                del parent[key]
+            elif strict:
+                raise KeyError(key)
+        case _:
+            raise ValueError(f'Unsupported operation: {operation["op"]!r}')
+
+
+def invert_operation(document: Any, operation: dict) -> dict:
+    # the add, replace or remove operation that undoes the given one, which is yet to be
+    # applied
+    parts = from_pointer(operation['path'])
+    if not parts:
+        raise ValueError('Cannot apply operation to document root')
+    parent = resolve(document, parts[:-1])
+    key = parts[-1]
+    if isinstance(parent, MutableSequence):
+        index = _index(parent, key, allow_end=operation['op'] == 'add')
+        path = to_pointer(parts[:-1] + [index])
+        if operation['op'] == 'add':
+            return {'op': 'remove', 'path': path}
+        op = 'add' if operation['op'] == 'remove' else 'replace'
+        return {'op': op, 'path': path, 'value': parent[index]}
+    if key in parent:
+        op = 'add' if operation['op'] == 'remove' else 'replace'
+        return {'op': op, 'path': operation['path'], 'value': parent[key]}
+    return {'op': 'remove', 'path': operation['path']}
+
+
+def apply_patch(document: Any, operations: Sequence[dict]) -> None:
+    # applies all operations or, if one of them fails, none
+    undo: List[dict] = []
+    try:
+        for operation in operations:
+            for step in expand_operation(document, operation):
+                inverse = invert_operation(document, step)
+                apply_operation(document, step)
+                undo.append(inverse)
+    except BaseException:
+        for inverse in reversed(undo):
+            apply_operation(document, inverse)
+        raise
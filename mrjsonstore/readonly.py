@@ -0,0 +1,209 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import mmap
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence, Set, Tuple, Union
+from drresult import returns_result, constructs_as_result, Ok, Result
+
+from mrjsonstore.compression import split_compression
+from mrjsonstore.journal import Journal
+from mrjsonstore.locking import file_stamp
+from mrjsonstore.patch import PathPart, parse_path, resolve
+from mrjsonstore.serialisers import Codec, codec_for_filename, json_codecs
+from mrjsonstore.streaming import index_json
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None  # type: ignore
+
+Stamp = Tuple[Optional[Tuple[int, int, int]], Optional[Tuple[int, int, int]]]
+
+
+@constructs_as_result
+class ReadOnlyJsonStore:
+    def __init__(
+        self,
+        filename: str,
+        journal: bool = False,
+        codec: Optional[Codec] = None,
+        cache_size: int = 128,
+    ):
+        self._filename = filename
+        self._codec = codec or codec_for_filename(filename)
+        if self._codec not in json_codecs.values():
+            raise ValueError(f'Read-only stores need a JSON codec, not {self._codec.name!r}')
+        if split_compression(filename)[1]:
+            raise ValueError('Read-only stores cannot map compressed files')
+        self._journal: Optional[Journal] = None
+        if journal:
+            self._journal = Journal(filename + '.journal')
+        self._cache_size = cache_size
+        self._cache: OrderedDict[str, Any] = OrderedDict()
+        self._index: Dict[str, Any] = {}
+        self._overlay: Optional[_Overlay] = None
+        self._stamp: Optional[Stamp] = None
+        self._reloads = 0
+        self._open()
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def content(self) -> Mapping[str, Any]:
+        return ReadOnlyContent(self)
+
+    @property
+    def reloads(self) -> int:
+        return self._reloads
+
+    @returns_result
+    def get(self, path: Union[str, Sequence[PathPart]]) -> Result[Any]:
+        parts = parse_path(path)
+        self._revalidate()
+        if not parts:
+            return Ok({key: self._member(key) for key in self._keys()})
+        return Ok(resolve(self._member(str(parts[0])), parts[1:]))
+
+    @returns_result
+    def revalidate(self) -> Result[bool]:
+        return Ok(self._revalidate())
+
+    def _revalidate(self) -> bool:
+        if self._current_stamp() == self._stamp:
+            return False
+        self._open()
+        self._reloads += 1
+        return True
+
+    def _current_stamp(self) -> Stamp:
+        return (
+            file_stamp(self._filename),
+            file_stamp(self._journal.filename) if self._journal else None,
+        )
+
+    def _open(self) -> None:
+        journal_stamp = file_stamp(self._journal.filename) if self._journal else None
+        index: Dict[str, Any] = {}
+        stamp = None
+        if os.path.exists(self._filename):
+            with open(self._filename, encoding='utf-8', newline='') as f:
+                stat = os.fstat(f.fileno())
+                stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                index = self._index_file(f, stat.st_size)
+        self._index = index
+        self._cache.clear()
+        self._overlay = None
+        if self._journal:
+            overlay = _Overlay(self)
+            self._journal.replay(overlay, truncate=False)
+            self._overlay = overlay
+        self._stamp = (stamp, journal_stamp)
+
+    def _index_file(self, f: Any, size: int) -> Dict[str, Any]:
+        # maps every top-level key to the text of its value in a mapping of the file, which
+        # is only decoded when the key is accessed
+        if not size:
+            index_json(f)
+        # the mapping stays open as long as the index refers to it
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        if msgspec:
+            try:
+                return msgspec.json.decode(view, type=Dict[str, msgspec.Raw])
+            except msgspec.DecodeError:
+                pass
+        return {key: view[start:end] for key, (start, end) in index_json(f).items()}
+
+    def _keys(self) -> Iterator[str]:
+        overlay = self._overlay
+        if overlay is None:
+            yield from self._index
+            return
+        for key in self._index:
+            if key not in overlay.deleted:
+                yield key
+        for key in overlay:
+            if key not in self._index:
+                yield key
+
+    def _contains(self, key: str) -> bool:
+        overlay = self._overlay
+        if overlay is not None:
+            return key in overlay
+        return key in self._index
+
+    def _member(self, key: str) -> Any:
+        overlay = self._overlay
+        if overlay is not None and (key in overlay.deleted or dict.__contains__(overlay, key)):
+            return overlay[key]
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = self._decode(key)
+        self._cache[key] = value
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def _decode(self, key: str) -> Any:
+        return self._codec.deserialise(bytes(self._index[key]).decode('utf-8'))
+
+
+class _Overlay(dict):
+    # journal operations are applied to the members they touch, which are decoded on demand
+    def __init__(self, store: ReadOnlyJsonStore):
+        super().__init__()
+        self._store = store
+        self.deleted: Set[str] = set()
+
+    def __missing__(self, key: str) -> Any:
+        if key in self.deleted:
+            raise KeyError(key)
+        value = self._store._decode(key)
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        if dict.__contains__(self, key):
+            return True
+        return key not in self.deleted and key in self._store._index
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        dict.__setitem__(self, key, value)
+        self.deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        if dict.__contains__(self, key):
+            dict.__delitem__(self, key)
+        self.deleted.add(key)
+
+
+class ReadOnlyContent(Mapping[str, Any]):
+    def __init__(self, store: ReadOnlyJsonStore):
+        self._store = store
+
+    def __getitem__(self, key: str) -> Any:
+        self._store._revalidate()
+        if not self._store._contains(key):
+            raise KeyError(key)
+        return self._store._member(key)
+
+    def __contains__(self, key: object) -> bool:
+        self._store._revalidate()
+        return isinstance(key, str) and self._store._contains(key)
+
+    def __iter__(self) -> Iterator[str]:
+        self._store._revalidate()
+        return iter(list(self._store._keys()))
+
+    def __len__(self) -> int:
+        self._store._revalidate()
+        return sum(1 for _ in self._store._keys())
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
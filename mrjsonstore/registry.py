@@ -0,0 +1,67 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+from drresult import returns_result, Ok, Result
+
+
+class StoreRegistry:
+    # keeps the most recently opened stores, at most max_stores of them and, as far as the
+    # size of their files tells, about max_bytes; the most recent one is always kept
+    def __init__(self, max_stores: int = 64, max_bytes: Optional[int] = None):
+        self.max_stores = max_stores
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stores: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._stores)
+
+    @returns_result
+    def open(self, key: Hashable, create: Callable[[], Result[Any]]) -> Result[Any]:
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                self._stores.move_to_end(key)
+        if store is not None:
+            store._revalidate()
+            return Ok(store)
+        # parsed outside the lock; if another thread was faster, its store wins
+        created = create()
+        if not created:
+            return created
+        with self._lock:
+            store = self._stores.setdefault(key, created.unwrap())
+            self._stores.move_to_end(key)
+            evicted = self._evict()
+        self._close(evicted)
+        return Ok(store)
+
+    def clear(self) -> None:
+        with self._lock:
+            evicted = list(self._stores.values())
+            self._stores.clear()
+        self._close(evicted)
+
+    def _evict(self) -> List[Any]:
+        evicted = []
+        while len(self._stores) > 1 and (
+            len(self._stores) > self.max_stores
+            or (
+                self.max_bytes is not None
+                and sum(store._resident_bytes() for store in self._stores.values()) > self.max_bytes
+            )
+        ):
+            evicted.append(self._stores.popitem(last=False)[1])
+        return evicted
+
+    def _close(self, stores: List[Any]) -> None:
+        # writes their pending commits and stops their threads; failed background writes
+        # were already reported to their transactions
+        for store in stores:
+            store.close()
+
+
+registry = StoreRegistry()
@@ -0,0 +1,269 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import os
+import json
+import math
+import mmap
+import yaml
+from typing import IO, Any, Callable, Dict, List, NamedTuple, Optional
+
+from mrjsonstore.compression import split_compression
+from mrjsonstore.streaming import dump_object, load_json
+
+# libyaml is an optional build dependency of PyYAML; without it, use the pure Python
+# implementation, which produces identical output
+yaml_loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+yaml_dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+json_serialiser: Callable[[dict], str] = lambda x: json.dumps(x)
+yaml_serialiser: Callable[[dict], str] = lambda x: yaml.dump(x, Dumper=yaml_dumper)
+
+json_deserialiser: Callable[[str], dict] = lambda x: json.loads(x)
+yaml_deserialiser: Callable[[str], dict] = lambda x: yaml.load(x, Loader=yaml_loader)
+
+
+class Codec(NamedTuple):
+    name: str
+    serialise: Callable[[Any], Any]
+    deserialise: Callable[[Any], Any]
+    # reads directly from the open file instead of deserialising its full text
+    load: Optional[Callable[[IO[Any]], Any]] = None
+    # writes directly to the open file instead of serialising the full text first
+    dump: Optional[Callable[[Any, IO[Any]], None]] = None
+    # serialises to bytes instead of str, and the file is opened in binary mode
+    binary: bool = False
+
+
+def _dump(serialise: Callable[[Any], str], separator: str) -> Callable[[Any, IO[str]], None]:
+    return lambda x, f: dump_object(x, f, serialise, separator)
+
+
+json_codec = Codec('json', json_serialiser, json_deserialiser, None, _dump(json_serialiser, ', '))
+# keeps only the text of one top-level member in memory instead of the whole file, but
+# decodes several times slower and does not share the strings of repeated keys between
+# members, so it only pays off for stores with large string values
+json_stream_codec = Codec(
+    'json-stream', json_serialiser, json_deserialiser, load_json, _dump(json_serialiser, ', ')
+)
+yaml_codec = Codec(
+    'yaml',
+    yaml_serialiser,
+    yaml_deserialiser,
+    lambda f: yaml.load(f, Loader=yaml_loader),
+    lambda x, f: yaml.dump(x, f, Dumper=yaml_dumper),
+)
+
+# The fast backends fall back to the standard library for input they cannot handle
+# (integers beyond 64 bit, NaN and Infinity, keys that are not strings), so every file
+# written by one backend reads back to the same content with any other. They write compact
+# JSON, so their files differ from the standard library's byte by byte.
+
+
+def _with_fallback(fast: Callable, slow: Callable, errors: tuple) -> Callable:
+    def call(x: Any) -> Any:
+        try:
+            return fast(x)
+        except errors:
+            return slow(x)
+
+    return call
+
+
+def _has_non_finite(x: Any) -> bool:
+    stack = [x]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return False
+
+
+def _keeping_non_finite(encode: Callable[[Any], str]) -> Callable[[Any], str]:
+    # orjson and msgspec write NaN and Infinity as null instead of failing; only text that
+    # contains null can have lost one
+    def call(x: Any) -> str:
+        text = encode(x)
+        if 'null' in text and _has_non_finite(x):
+            raise ValueError('Non-finite float')
+        return text
+
+    return call
+
+
+def _mmap_load(
+    loads: Callable, errors: tuple, deserialise: Callable[[str], Any]
+) -> Callable[[IO[str]], Any]:
+    # decodes straight from the page cache; unlike a copy of the text, mapped pages can be
+    # dropped by the kernel under memory pressure
+    def load(f: IO[str]) -> Any:
+        # a decompressing stream has the file number of the compressed file
+        if not isinstance(getattr(f, 'buffer', None), io.BufferedReader):
+            return deserialise(f.read())
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                with memoryview(m) as view:
+                    try:
+                        return loads(view)
+                    except errors:
+                        pass
+        return load_json(f)
+
+    return load
+
+
+def _refuse(x: Any) -> Any:
+    raise TypeError(f'Object of type {type(x).__name__} is not JSON serializable')
+
+
+def _make_orjson_codec() -> Optional[Codec]:
+    try:
+        import orjson
+    except ImportError:
+        return None
+    # dates, subclasses and dataclasses are left to the standard library, which rejects
+    # them like it always did, instead of being written as something else
+    option = (
+        orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_SUBCLASS
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+    serialise = _with_fallback(
+        _keeping_non_finite(lambda x: orjson.dumps(x, default=_refuse, option=option).decode()),
+        json_serialiser,
+        (TypeError, ValueError),
+    )
+    deserialise = _with_fallback(orjson.loads, json_deserialiser, (orjson.JSONDecodeError,))
+    return Codec(
+        'orjson',
+        serialise,
+        deserialise,
+        _mmap_load(orjson.loads, (orjson.JSONDecodeError,), deserialise),
+        _dump(serialise, ','),
+    )
+
+
+def _make_msgspec_codec() -> Optional[Codec]:
+    try:
+        import msgspec
+    except ImportError:
+        return None
+    serialise = _with_fallback(
+        _keeping_non_finite(lambda x: msgspec.json.encode(x).decode()),
+        json_serialiser,
+        (TypeError, ValueError, OverflowError, msgspec.EncodeError),
+    )
+    deserialise = _with_fallback(msgspec.json.decode, json_deserialiser, (msgspec.DecodeError,))
+    return Codec(
+        'msgspec',
+        serialise,
+        deserialise,
+        _mmap_load(msgspec.json.decode, (msgspec.DecodeError,), deserialise),
+        _dump(serialise, ','),
+    )
+
+
+def _make_ujson_codec() -> Optional[Codec]:
+    try:
+        import ujson
+    except ImportError:
+        return None
+    serialise = _with_fallback(
+        lambda x: ujson.dumps(x, escape_forward_slashes=False),
+        json_serialiser,
+        (TypeError, OverflowError),
+    )
+    return Codec(
+        'ujson',
+        serialise,
+        _with_fallback(ujson.loads, json_deserialiser, (ValueError,)),
+        None,
+        _dump(serialise, ','),
+    )
+
+
+def _missing_codec(name: str, module: str) -> Codec:
+    # keeps the extension from silently falling back to JSON
+    def fail(*args: Any) -> Any:
+        raise ImportError(f'{module} is required for {name} files')
+
+    return Codec(name, fail, fail, binary=True)
+
+
+def _make_msgpack_codec() -> Codec:
+    try:
+        import msgpack
+    except ImportError:
+        return _missing_codec('msgpack', 'msgpack')
+
+    def dump(x: Any, f: IO[bytes]) -> None:
+        # writes one top-level member at a time, like the JSON codecs
+        packer = msgpack.Packer()
+        f.write(packer.pack_map_header(len(x)))
+        for key, value in x.items():
+            f.write(packer.pack(key))
+            f.write(packer.pack(value))
+
+    return Codec(
+        'msgpack',
+        msgpack.packb,
+        lambda x: msgpack.unpackb(x, strict_map_key=False),
+        None,
+        dump,
+        binary=True,
+    )
+
+
+def _make_cbor_codec() -> Codec:
+    try:
+        import cbor2
+    except ImportError:
+        return _missing_codec('cbor', 'cbor2')
+    return Codec('cbor', cbor2.dumps, cbor2.loads, cbor2.load, cbor2.dump, binary=True)
+
+
+msgpack_codec = _make_msgpack_codec()
+cbor_codec = _make_cbor_codec()
+
+# in order of preference; ujson and msgspec write some values the standard library rejects
+# (dates, decimals, keys of any type), and read them back as something else, so they are
+# only used when asked for by name
+json_codecs: Dict[str, Codec] = {
+    codec.name: codec
+    for codec in [
+        _make_orjson_codec(),
+        json_codec,
+        _make_ujson_codec(),
+        _make_msgspec_codec(),
+        json_stream_codec,
+    ]
+    if codec
+}
+
+codecs_by_extension: Dict[str, Codec] = {
+    '.yaml': yaml_codec,
+    '.yml': yaml_codec,
+    '.msgpack': msgpack_codec,
+    '.mpk': msgpack_codec,
+    '.cbor': cbor_codec,
+}
+
+
+def default_json_codec() -> Codec:
+    return next(iter(json_codecs.values()))
+
+
+def register_codec(extension: str, codec: Codec) -> None:
+    codecs_by_extension[extension] = codec
+
+
+def codec_for_filename(filename: str) -> Codec:
+    filename, _ = split_compression(filename)
+    _, extension = os.path.splitext(filename)
+    return codecs_by_extension.get(extension) or default_json_codec()
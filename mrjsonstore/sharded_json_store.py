@@ -0,0 +1,279 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import zlib
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    cast,
+)
+from urllib.parse import quote
+from drresult import returns_result, constructs_as_result, noexcept, Ok, Err, Result
+
+from mrjsonstore.json_store import JsonStore, Transaction
+
+
+@constructs_as_result
+class ShardedJsonStore:
+    def __init__(
+        self,
+        directory: str,
+        shards: Optional[int] = None,
+        extension: str = '.json',
+        **kwargs: Any,
+    ):
+        if shards is not None and shards < 1:
+            raise ValueError(f'Invalid number of shards: {shards}')
+        self._directory = directory
+        self._shards = shards
+        self._extension = extension
+        # a shard is written when its tracker recorded changes, not whenever it was read
+        if not kwargs.setdefault('tracked', True):
+            raise ValueError('Shards are always tracked')
+        self._kwargs = kwargs
+        # shards found on disk, opened on first access
+        self._names: Dict[str, None] = {}
+        self._stores: Dict[str, JsonStore] = {}
+        self._current_transaction: Optional['ShardedTransaction'] = None
+        if os.path.isdir(directory):
+            buckets = {f'shard-{i}{extension}' for i in range(shards or 0)}
+            for name in sorted(os.listdir(directory)):
+                # a journaled shard may only exist as its journal so far
+                name = name.removesuffix('.lock').removesuffix('.journal')
+                if not name.startswith(('shard-', 'key-')) or not name.endswith(extension):
+                    continue
+                # the keys in a shard are only checked once it is opened
+                if (name not in buckets) if shards is not None else name.startswith('shard-'):
+                    raise ValueError(f'{name} belongs to another number of shards')
+                self._names[name] = None
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def content(self) -> MutableMapping[str, Any]:
+        return ShardedContent(self)
+
+    @property
+    def current_transaction(self) -> Optional['ShardedTransaction']:
+        return self._current_transaction
+
+    @noexcept
+    def transaction(self, rollback: bool = True) -> 'ShardedTransaction':
+        assert not self._current_transaction or not self._current_transaction.active
+        self._current_transaction = ShardedTransaction(self, rollback)
+        return self._current_transaction
+
+    @noexcept
+    def rollback(self) -> None:
+        assert self._current_transaction
+        self._current_transaction.rollback()
+
+    @returns_result
+    def commit(self) -> Result[Transaction.State]:
+        if self._current_transaction and self._current_transaction.active:
+            return self._current_transaction.commit()
+        return self._commit(
+            {name: store.commit for name, store in self._stores.items() if store._dirty}
+        )
+
+    def _shard_name(self, key: str) -> str:
+        if self._shards is None:
+            return f'key-{quote(key, safe="")}{self._extension}'
+        bucket = zlib.crc32(key.encode('utf-8')) % self._shards
+        return f'shard-{bucket}{self._extension}'
+
+    def _open(self, name: str) -> JsonStore:
+        store = self._create(name)
+        if store.loaded:
+            for key in store.content:
+                if self._shard_name(key) != name:
+                    raise ValueError(f'{name} contains {key!r}, which belongs to another shard')
+        return store
+
+    def _create(self, name: str) -> JsonStore:
+        store = cast(
+            Result[JsonStore], JsonStore(os.path.join(self._directory, name), **self._kwargs)
+        ).unwrap_or_raise()
+        assert store._tracker
+        store._tracker.listen(lambda: self._changing(name, store))
+        return store
+
+    def _changing(self, name: str, store: JsonStore) -> None:
+        # a shard joins the current transaction with its first change
+        transaction = self._current_transaction
+        if transaction and transaction.active:
+            transaction._begin(name, store)
+
+    def _get(self, name: str) -> Optional[JsonStore]:
+        store = self._stores.get(name)
+        if store is None and name in self._names:
+            store = self._open(name)
+            self._stores[name] = store
+        return store
+
+    def _all(self) -> Iterator[JsonStore]:
+        for name in list(self._names):
+            store = self._get(name)
+            if store is not None:
+                yield store
+
+    def _shard(self, key: str, create: bool) -> Optional[JsonStore]:
+        assert isinstance(key, str)
+        name = self._shard_name(key)
+        store = self._get(name)
+        if store is None:
+            if not create:
+                return None
+            store = self._create(name)
+            self._stores[name] = store
+            self._names[name] = None
+        if store._lock:
+            # a locking shard may reload when it joins a transaction, which has to happen
+            # before its content is handed out
+            self._changing(name, store)
+        return store
+
+    def _changed(self, names: Iterable[str]) -> List[str]:
+        return [name for name in names if name in self._stores and self._stores[name]._dirty]
+
+    def _commit(self, shards: Dict[str, Callable[[], Result]]) -> Result[Transaction.State]:
+        if shards and not self._kwargs.get('dry_run'):
+            os.makedirs(self._directory, exist_ok=True)
+        error: Optional[Result] = None
+        for name, commit in shards.items():
+            result = commit()
+            if not result:
+                if error is None:
+                    error = result
+                continue
+            store = self._stores[name]
+            if not store.content and not store._dry_run:
+                for filename in (store._filename, store._filename + '.journal'):
+                    if os.path.exists(filename):
+                        os.remove(filename)
+                del self._stores[name]
+                del self._names[name]
+        return error if error is not None else Ok(Transaction.State.Committed)
+
+
+class ShardedContent(MutableMapping[str, Any]):
+    def __init__(self, store: ShardedJsonStore):
+        self._store = store
+
+    def __getitem__(self, key: str) -> Any:
+        shard = self._store._shard(key, create=False)
+        if shard is None:
+            raise KeyError(key)
+        return shard.content[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        shard = self._store._shard(key, create=True)
+        assert shard is not None
+        shard.content[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        shard = self._store._shard(key, create=False)
+        if shard is None:
+            raise KeyError(key)
+        del shard.content[key]
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        shard = self._store._get(self._store._shard_name(key))
+        return shard is not None and key in shard.content
+
+    def __iter__(self) -> Iterator[str]:
+        for shard in self._store._all():
+            yield from shard.content
+
+    def __len__(self) -> int:
+        return sum(len(shard.content) for shard in self._store._all())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self._items()) == dict(other.items())
+
+    def __repr__(self) -> str:
+        return repr(dict(self._items()))
+
+    def _items(self) -> Iterator[Tuple[str, Any]]:
+        for shard in self._store._all():
+            yield from shard.content.items()
+
+
+class ShardedTransaction:
+    def __init__(self, store: ShardedJsonStore, rollback: bool):
+        self._store = store
+        self._rollback = rollback
+        self._transactions: Dict[str, Transaction] = {}
+        self._active: bool = True
+        self._result: Result[Transaction.State] = Err(ValueError(Transaction.State.Active))
+        self._shards: Optional[List[str]] = None
+        # changes made before the transaction are committed with it
+        for name in store._changed(list(store._stores)):
+            self._begin(name, store._stores[name])
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @property
+    def result(self) -> Result[Transaction.State]:
+        return self._result
+
+    @property
+    def shards(self) -> List[str]:
+        # the shards changed in the transaction
+        if self._shards is not None:
+            return self._shards
+        return self._store._changed(self._transactions)
+
+    @noexcept
+    def __enter__(self) -> 'ShardedTransaction':
+        assert self._active
+        return self
+
+    @noexcept
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        assert self._active
+        if exc_type and self._rollback:
+            self.rollback()
+        else:
+            self._result = self.commit()
+
+    @returns_result
+    def commit(self) -> Result[Transaction.State]:
+        assert self._active
+        self._active = False
+        transactions = self._transactions
+        self._shards = self._store._changed(transactions)
+        self._result = self._store._commit(
+            {name: transactions[name].commit for name in transactions}
+        )
+        return self._result
+
+    @noexcept
+    def rollback(self) -> None:
+        assert self._active and self._rollback
+        self._shards = []
+        for transaction in self._transactions.values():
+            transaction.rollback()
+        self._active = False
+        self._result = Ok(Transaction.State.Rolledback)
+
+    def _begin(self, name: str, store: JsonStore) -> None:
+        if name not in self._transactions:
+            self._transactions[name] = store.transaction(rollback=self._rollback)
@@ -0,0 +1,59 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from typing import Any, Callable, List, Set, Tuple
+
+from mrjsonstore.patch import PathPart, copy_tree
+
+Path = Tuple[PathPart, ...]
+
+MISSING: Any = object()
+
+
+class CopiedSnapshot:
+    # a copy keeps every value as it is, unlike a round trip through some format; the
+    # leaves are never changed in place, so only dictionaries and lists are copied
+    def __init__(self, content: dict):
+        self._copy = copy_tree(content)
+
+    def restore(self, content: dict) -> None:
+        content.clear()
+        content.update(self._copy)
+
+
+class UnloadedSnapshot:
+    def __init__(self, unload: Callable[[], None]):
+        self._unload = unload
+
+    def restore(self, content: dict) -> None:
+        # content loaded during the transaction is discarded, the file is still unchanged
+        self._unload()
+
+
+class UndoLog:
+    def __init__(self) -> None:
+        self._entries: List[Tuple[Any, Any, Any]] = []
+        self._recorded: Set[Tuple[int, Any]] = set()
+
+    def record_key(self, container: dict, key: Any) -> None:
+        if (id(container), key) not in self._recorded:
+            self._recorded.add((id(container), key))
+            self._entries.append((container, key, container.get(key, MISSING)))
+
+    def record_list(self, container: list) -> None:
+        if (id(container), MISSING) not in self._recorded:
+            self._recorded.add((id(container), MISSING))
+            self._entries.append((container, MISSING, list(container)))
+
+    def restore(self, content: dict) -> None:
+        # every touched container gets back its contents from before its first change,
+        # which restores the original tree without resolving paths
+        for container, key, original in reversed(self._entries):
+            if key is MISSING:
+                container[:] = original
+            elif original is MISSING:
+                container.pop(key, None)
+            else:
+                container[key] = original
+        self._entries.clear()
+        self._recorded.clear()
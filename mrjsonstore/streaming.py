@@ -0,0 +1,228 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import re
+import json
+import hashlib
+import itertools
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple, Union
+
+CHUNK_SIZE = 1 << 20
+SPOOL_LIMIT = 16 * CHUNK_SIZE
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+class _Reader:
+    def __init__(self, f: IO[str], chunk_size: int, offsets: bool = False):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._offsets = offsets
+        self._mark = (0, 0)
+
+    def offset(self) -> int:
+        # byte offset of the current position in the file; positions are only ever asked for
+        # in increasing order, so each character is encoded once
+        assert self._offsets
+        mark, offset = self._mark
+        offset += len(self._buffer[mark : self._pos].encode('utf-8'))
+        self._mark = (self._pos, offset)
+        return offset
+
+    def peek(self) -> str:
+        self._skip_whitespace()
+        return self._buffer[self._pos : self._pos + 1]
+
+    def expect(self, char: str, message: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(message, self._buffer, self._pos)
+        self._pos += 1
+
+    def expect_end(self) -> None:
+        if self.peek():
+            raise json.JSONDecodeError('Extra data', self._buffer, self._pos)
+
+    def value(self) -> Any:
+        self._skip_whitespace()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # either invalid or not complete yet; reading ever larger chunks keeps the
+                # cost of decoding a huge value again and again linear
+                if not self._fill(size):
+                    raise
+                size *= 2
+                continue
+            # a value at the end of the buffer, or a number directly followed by what may be
+            # its continuation, may be incomplete
+            if not self._truncated(value, end) or not self._fill(size):
+                self._pos = end
+                return value
+
+    def _truncated(self, value: Any, end: int) -> bool:
+        if end == len(self._buffer):
+            return True
+        return isinstance(value, (int, float)) and self._buffer[end] in '.eE+-0123456789'
+
+    def _skip_whitespace(self) -> None:
+        while True:
+            self._pos = _whitespace.match(self._buffer, self._pos).end()  # type: ignore[union-attr]
+            if self._pos < len(self._buffer) or not self._fill(self._chunk_size):
+                return
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        if self._offsets:
+            self._mark = (0, self.offset())
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+
+def load_json(f: IO[str], chunk_size: int = CHUNK_SIZE) -> Any:
+    # decodes a top-level object member by member, so besides the decoded content only the
+    # text of the largest member is in memory at a time
+    reader = _Reader(f, chunk_size)
+    if reader.peek() != '{':
+        value = reader.value()
+        reader.expect_end()
+        return value
+    reader.expect('{', 'Expecting object')
+    content: dict = {}
+    if reader.peek() == '}':
+        reader.expect('}', 'Expecting object end')
+    else:
+        while True:
+            if reader.peek() != '"':
+                reader.expect('"', 'Expecting property name enclosed in double quotes')
+            key = reader.value()
+            reader.expect(':', "Expecting ':' delimiter")
+            content[key] = reader.value()
+            if reader.peek() == '}':
+                reader.expect('}', 'Expecting object end')
+                break
+            reader.expect(',', "Expecting ',' delimiter")
+    reader.expect_end()
+    return content
+
+
+def index_json(f: IO[str], chunk_size: int = CHUNK_SIZE) -> Dict[str, Tuple[int, int]]:
+    # the byte range of the text of each member of a top-level object; the values are
+    # decoded to find their end, but not kept
+    reader = _Reader(f, chunk_size, offsets=True)
+    reader.expect('{', 'Expecting object')
+    index: Dict[str, Tuple[int, int]] = {}
+    if reader.peek() == '}':
+        reader.expect('}', 'Expecting object end')
+    else:
+        while True:
+            if reader.peek() != '"':
+                reader.expect('"', 'Expecting property name enclosed in double quotes')
+            key = reader.value()
+            reader.expect(':', "Expecting ':' delimiter")
+            reader.peek()
+            start = reader.offset()
+            reader.value()
+            index[key] = (start, reader.offset())
+            if reader.peek() == '}':
+                reader.expect('}', 'Expecting object end')
+                break
+            reader.expect(',', "Expecting ',' delimiter")
+    reader.expect_end()
+    return index
+
+
+def dump_object(content: Any, f: IO[str], dumps: Callable[[Any], str], separator: str) -> None:
+    # encodes a top-level object a batch of members at a time, growing the batch while the
+    # text of a batch stays below the chunk size to keep the overhead per call low
+    if not isinstance(content, dict) or not content:
+        f.write(dumps(content))
+        return
+    f.write('{')
+    items = iter(content.items())
+    size = 1
+    first = True
+    while True:
+        batch = dict(itertools.islice(items, size))
+        if not batch:
+            break
+        text = dumps(batch)
+        if not first:
+            f.write(separator)
+        f.write(text[1:-1])
+        first = False
+        if len(text) < CHUNK_SIZE:
+            size *= 2
+        elif size > 1:
+            size //= 2
+    f.write('}')
+
+
+class HashingWriter:
+    def __init__(self, f: IO[Any]):
+        self._f = f
+        self._hash = hashlib.blake2b(digest_size=16)
+
+    def write(self, text: Union[str, bytes]) -> int:
+        self._hash.update(text if isinstance(text, bytes) else text.encode('utf-8'))
+        return self._f.write(text)
+
+    def writable(self) -> bool:
+        return True
+
+    def digest(self) -> bytes:
+        return self._hash.digest()
+
+
+class HashingReader:
+    def __init__(self, f: IO[Any]):
+        self._f = f
+        self._hash = hashlib.blake2b(digest_size=16)
+
+    def read(self, size: int = -1) -> Union[str, bytes]:
+        data = self._f.read(size)
+        self._hash.update(data if isinstance(data, bytes) else data.encode('utf-8'))
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def digest(self) -> bytes:
+        # whatever the decoder left unread counts as well
+        while self.read(CHUNK_SIZE):
+            pass
+        return self._hash.digest()
+
+
+class Spool:
+    # keeps what is written to it up to a limit, and drops all of it once the limit is passed
+    def __init__(self, limit: Optional[int] = None):
+        self._limit = SPOOL_LIMIT if limit is None else limit
+        self._size = 0
+        self.chunks: Optional[List[Union[str, bytes]]] = []
+
+    def write(self, text: Union[str, bytes]) -> int:
+        if self.chunks is not None:
+            self._size += len(text)
+            if self._size > self._limit:
+                self.chunks = None
+            else:
+                self.chunks.append(text)
+        return len(text)
+
+    def writable(self) -> bool:
+        return True
@@ -0,0 +1,181 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from collections.abc import MutableMapping, MutableSequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mrjsonstore.journal import copy_tree
+from mrjsonstore.patch import to_pointer, resolve
+from mrjsonstore.snapshot import Path, UndoLog
+
+
+class Tracker:
+    def __init__(self) -> None:
+        self._recorders: List[Dict[Path, None]] = []
+        self._undo_logs: List[UndoLog] = []
+        self._listeners: List[Callable[[], None]] = []
+
+    def attach(self) -> Dict[Path, None]:
+        recorder: Dict[Path, None] = {}
+        self._recorders.append(recorder)
+        return recorder
+
+    def detach(self, recorder: Dict[Path, None]) -> None:
+        self._recorders = [r for r in self._recorders if r is not recorder]
+
+    def attach_undo_log(self) -> UndoLog:
+        undo_log = UndoLog()
+        self._undo_logs.append(undo_log)
+        return undo_log
+
+    def detach_undo_log(self, undo_log: UndoLog) -> None:
+        self._undo_logs = [u for u in self._undo_logs if u is not undo_log]
+
+    def listen(self, listener: Callable[[], None]) -> None:
+        # called before every change is recorded, so it may still attach an undo log
+        self._listeners.append(listener)
+
+    def record_key(self, path: Path, container: dict, key: Any) -> None:
+        for listener in self._listeners:
+            listener()
+        for recorder in self._recorders:
+            recorder[path] = None
+        for undo_log in self._undo_logs:
+            undo_log.record_key(container, key)
+
+    def record_list(self, path: Path, container: list) -> None:
+        for listener in self._listeners:
+            listener()
+        for recorder in self._recorders:
+            recorder[path] = None
+        for undo_log in self._undo_logs:
+            undo_log.record_list(container)
+
+
+def minimal_paths(paths: Iterable[Path]) -> List[Path]:
+    paths = list(paths)
+    recorded = set(paths)
+    return [p for p in paths if not any(p[:i] in recorded for i in range(1, len(p)))]
+
+
+def operations_for_paths(content: dict, paths: Iterable[Path]) -> List[dict]:
+    operations: List[dict] = []
+    for path in minimal_paths(paths):
+        try:
+            parent = resolve(content, path[:-1])
+            value = resolve(parent, path[-1:])
+        except (KeyError, IndexError, TypeError, ValueError):
+            operations.append({'op': 'remove', 'path': to_pointer(path)})
+            continue
+        op = 'replace' if isinstance(parent, list) else 'add'
+        operations.append({'op': op, 'path': to_pointer(path), 'value': value})
+    return operations
+
+
+def wrap(value: Any, path: Path, tracker: Tracker, anchor: Optional[Path] = None) -> Any:
+    if isinstance(value, dict):
+        return TrackedDict(value, path, tracker, anchor)
+    if isinstance(value, list):
+        return TrackedList(value, path, tracker, anchor)
+    return value
+
+
+def unwrap(value: Any) -> Any:
+    if isinstance(value, (TrackedDict, TrackedList)):
+        return copy_tree(value._data)
+    return value
+
+
+class TrackedDict(MutableMapping):
+    # below a list element, changes are recorded as changes of the outermost such list
+    # (the anchor): the indices in a path would go stale as soon as the list shifts
+    def __init__(self, data: dict, path: Path, tracker: Tracker, anchor: Optional[Path] = None):
+        self._data = data
+        self._path = path
+        self._tracker = tracker
+        self._anchor = anchor
+
+    def __getitem__(self, key: Any) -> Any:
+        return wrap(self._data[key], self._path + (key,), self._tracker, self._anchor)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._tracker.record_key(self._recorded_path(key), self._data, key)
+        self._data[key] = unwrap(value)
+
+    def __delitem__(self, key: Any) -> None:
+        if key not in self._data:
+            raise KeyError(key)
+        self._tracker.record_key(self._recorded_path(key), self._data, key)
+        del self._data[key]
+
+    def _recorded_path(self, key: Any) -> Path:
+        return self._anchor if self._anchor is not None else self._path + (key,)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (TrackedDict, TrackedList)):
+            other = other._data
+        return self._data == other
+
+    def __repr__(self) -> str:
+        return repr(self._data)
+
+    def copy(self) -> dict:
+        return copy_tree(self._data)
+
+
+class TrackedList(MutableSequence):
+    def __init__(self, data: list, path: Path, tracker: Tracker, anchor: Optional[Path] = None):
+        self._data = data
+        self._path = path
+        self._tracker = tracker
+        self._anchor = anchor if anchor is not None else path
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return copy_tree(self._data[index])
+        value = self._data[index]
+        if index < 0:
+            index += len(self._data)
+        return wrap(value, self._path + (index,), self._tracker, self._anchor)
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._tracker.record_list(self._anchor, self._data)
+        if isinstance(index, slice):
+            self._data[index] = [unwrap(v) for v in value]
+        else:
+            self._data[index] = unwrap(value)
+
+    def __delitem__(self, index: Any) -> None:
+        self._tracker.record_list(self._anchor, self._data)
+        del self._data[index]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def insert(self, index: int, value: Any) -> None:
+        self._tracker.record_list(self._anchor, self._data)
+        self._data.insert(index, unwrap(value))
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        self._tracker.record_list(self._anchor, self._data)
+        self._data.sort(*args, **kwargs)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (TrackedDict, TrackedList)):
+            other = other._data
+        return self._data == other
+
+    def __repr__(self) -> str:
+        return repr(self._data)
+
+    def copy(self) -> list:
+        return copy_tree(self._data)
@@ -0,0 +1,99 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import atexit
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from mrjsonstore.durability import strongest
+from mrjsonstore.snapshot import Path
+
+
+class WriteBehind:
+    def __init__(self, write: Callable[[dict, Dict[Path, None], str], object]):
+        self._write = write
+        self._condition = threading.Condition()
+        self._snapshot: Optional[dict] = None
+        self._dirty: Dict[Path, None] = {}
+        self._durability: Optional[str] = None
+        self._futures: List[Future] = []
+        self._last: Optional[Future] = None
+        self._closed = False
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='mrjsonstore-write-behind')
+        self._thread.daemon = True
+        self._thread.start()
+        _running.add(self)
+
+    def submit(self, snapshot: dict, dirty: Dict[Path, None], durability: str) -> Future:
+        future: Future = Future()
+        with self._condition:
+            assert not self._closed
+            # a snapshot that has not been picked up yet is superseded by this one
+            self._snapshot = snapshot
+            self._dirty.update(dirty)
+            self._durability = strongest(self._durability, durability)
+            self._futures.append(future)
+            self._last = future
+            self._condition.notify()
+        return future
+
+    def flush(self) -> None:
+        with self._condition:
+            last = self._last
+        if last:
+            error = last.exception()
+            if error:
+                raise error
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        _running.discard(self)
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._snapshot is None and not self._closed:
+                    self._condition.wait()
+                if self._snapshot is None:
+                    return
+                snapshot, dirty, futures = self._snapshot, self._dirty, self._futures
+                durability = self._durability
+                assert durability
+                self._snapshot, self._dirty, self._futures = None, {}, []
+                self._durability = None
+            try:
+                with self.lock:
+                    self._write(snapshot, dirty, durability)
+            except Exception as e:
+                with self._condition:
+                    # the paths are still unwritten, so the next snapshot has to include them
+                    dirty.update(self._dirty)
+                    self._dirty = dirty
+                    self._durability = strongest(self._durability, durability)
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future in futures:
+                    future.set_result(None)
+
+
+_running: 'weakref.WeakSet[WriteBehind]' = weakref.WeakSet()
+
+
+@atexit.register
+def _close_all() -> None:
+    # pending commits are written before the interpreter exits; a failed write has already
+    # been reported to its transaction
+    for write_behind in list(_running):
+        try:
+            write_behind.close()
+        except Exception:
+            pass
@@ -0,0 +1,37 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from mrjsonstore.serialisers import Codec
+
+import pytest
+
+# optional backends, by file extension and by codec name
+backends = {
+    '.msgpack': 'msgpack',
+    '.mpk': 'msgpack',
+    '.cbor': 'cbor2',
+    '.zst': 'zstandard',
+    'msgpack': 'msgpack',
+    'cbor': 'cbor2',
+}
+
+
+def required_backends(value):
+    if isinstance(value, Codec):
+        return [backends[value.name]] if value.name in backends else []
+    if not isinstance(value, str):
+        return []
+    # 'test.cbor.zst' as well as a bare extension like '.msgpack'
+    extensions = ['.' + part for part in os.path.basename(value).split('.')[1:]]
+    return [backends[extension] for extension in extensions if extension in backends]
+
+
+@pytest.fixture(autouse=True)
+def skip_missing_backends(request):
+    # cases parametrised with a file name or codec that needs a backend which is not
+    # installed are skipped instead of failing
+    callspec = getattr(request.node, 'callspec', None)
+    for value in callspec.params.values() if callspec else []:
+        for module in required_backends(value):
+            pytest.importorskip(module)
@@ -0,0 +1,258 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import asyncio
+import threading
+from mrjsonstore import JsonStore, Transaction, AsyncJsonStore, Codec
+from mrjsonstore.serialisers import json_codec
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+def read_store(filename):
+    store = JsonStore(filename)
+    assert store
+    return store.unwrap().content
+
+
+async def open_store(filename, **kwargs):
+    store = await AsyncJsonStore.open(filename, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def test_async_open_invalid_file(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    with open(filename, 'w') as f:
+        f.write('invalid')
+
+    async def run():
+        store = await AsyncJsonStore.open(filename)
+        assert not store
+
+    asyncio.run(run())
+
+
+def test_async_transaction_commits(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+
+    async def run():
+        store = await open_store(filename, tracked=tracked)
+        async with store.transaction() as t:
+            assert store.current_transaction is t
+            store.content['foo'] = 'bar'
+        assert store.current_transaction is None
+        assert t.result.unwrap() == Transaction.State.Committed
+
+    asyncio.run(run())
+    assert read_store(filename) == {'foo': 'bar'}
+
+
+def test_async_transaction_rolls_back_on_exception(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+
+    async def run():
+        store = await open_store(filename, tracked=tracked)
+        store.content['foo'] = 'bar'
+        with pytest.raises(RuntimeError):
+            async with store.transaction() as t:
+                store.content['foo'] = 'baz'
+                raise RuntimeError()
+        assert t.result.unwrap() == Transaction.State.Rolledback
+        assert store.content == {'foo': 'bar'}
+
+    asyncio.run(run())
+    assert not os.path.exists(filename)
+
+
+def test_async_transaction_cancelled_body_rolls_back(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+
+    async def run():
+        store = await open_store(filename)
+        entered = asyncio.Event()
+
+        async def body():
+            async with store.transaction():
+                store.content['foo'] = 'bar'
+                entered.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(body())
+        await entered.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert store.content == {}
+        assert store.current_transaction is None
+
+        async with store.transaction() as t:
+            store.content['foo'] = 'baz'
+        assert t.result
+
+    asyncio.run(run())
+    assert read_store(filename) == {'foo': 'baz'}
+
+
+def test_async_transaction_without_rollback_commits_on_exception(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+
+    async def run():
+        store = await open_store(filename)
+        with pytest.raises(RuntimeError):
+            async with store.transaction(rollback=False) as t:
+                store.content['foo'] = 'bar'
+                raise RuntimeError()
+        assert t.result.unwrap() == Transaction.State.Committed
+
+    asyncio.run(run())
+    assert read_store(filename) == {'foo': 'bar'}
+
+
+def test_async_transaction_awaited(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+
+    async def run():
+        store = await open_store(filename)
+        t = await store.transaction()
+        store.content['foo'] = 'bar'
+        assert await store.commit()
+        assert not t.active
+
+        t = await store.transaction()
+        store.content['foo'] = 'baz'
+        await store.rollback()
+        assert t.result.unwrap() == Transaction.State.Rolledback
+        assert store.content == {'foo': 'bar'}
+
+    asyncio.run(run())
+    assert read_store(filename) == {'foo': 'bar'}
+
+
+def test_async_commit(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+
+    async def run():
+        store = await open_store(filename)
+        store.content['foo'] = 'bar'
+        result = await store.commit()
+        assert result.unwrap() == Transaction.State.Committed
+
+    asyncio.run(run())
+    assert read_store(filename) == {'foo': 'bar'}
+
+
+def test_async_commit_error(tmp_path, filename):
+    filename = os.path.join(tmp_path, 'invalid', 'non', 'existing', 'path', filename)
+
+    async def run():
+        store = await open_store(filename)
+        store.content['foo'] = 'bar'
+        result = await store.commit()
+        assert not result
+        assert isinstance(result.unwrap_err(), FileNotFoundError)
+
+        async with store.transaction() as t:
+            pass
+        assert not t.result
+
+    asyncio.run(run())
+
+
+def test_async_lazy_load(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    assert store.commit()
+
+    async def run():
+        store = await open_store(filename, lazy=True)
+        assert not store.store.loaded
+        assert await store.load()
+        assert store.store.loaded
+        assert store.content == {'foo': 'bar'}
+
+    asyncio.run(run())
+
+
+def test_async_transactions_serialised(tmp_path, tracked):
+    filename = os.path.join(tmp_path, 'test.json')
+
+    async def run():
+        store = await open_store(filename, tracked=tracked)
+        store.content['counter'] = 0
+
+        async def increment():
+            async with store.transaction():
+                counter = store.content['counter']
+                await asyncio.sleep(0)
+                store.content['counter'] = counter + 1
+
+        await asyncio.gather(*(increment() for _ in range(20)))
+        assert store.content['counter'] == 20
+
+    asyncio.run(run())
+    assert read_store(filename) == {'counter': 20}
+
+
+def test_async_commit_runs_off_loop(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    threads = []
+
+    def serialise(content):
+        threads.append(threading.get_ident())
+        return json_codec.serialise(content)
+
+    codec = Codec('recording', serialise, json_codec.deserialise)
+
+    async def run():
+        store = await open_store(filename, codec=codec)
+        store.content['foo'] = 'bar'
+        assert await store.commit()
+
+    asyncio.run(run())
+    assert threads and threading.get_ident() not in threads
+
+
+def test_async_cancelled_commit_completes(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    writing = threading.Event()
+    proceed = threading.Event()
+
+    def serialise(content):
+        writing.set()
+        proceed.wait()
+        return json_codec.serialise(content)
+
+    codec = Codec('blocking', serialise, json_codec.deserialise)
+
+    async def run():
+        store = await open_store(filename, codec=codec)
+        store.content['foo'] = 'bar'
+        task = asyncio.create_task(store.commit())
+        await asyncio.get_running_loop().run_in_executor(None, writing.wait)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        waiting = asyncio.create_task(store.commit())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        proceed.set()
+        assert await waiting
+
+    asyncio.run(run())
+    assert read_store(filename) == {'foo': 'bar'}
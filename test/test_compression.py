@@ -0,0 +1,124 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import gzip
+import json
+from drresult import Panic
+from mrjsonstore import JsonStore, Transaction
+from mrjsonstore.compression import _missing_compression, compressions_by_extension
+from mrjsonstore.serialisers import codec_for_filename, default_json_codec, yaml_codec
+
+import pytest
+
+
+@pytest.fixture(
+    params=['test.json.gz', 'test.yaml.gz', 'test.json.zst', 'test.msgpack.gz', 'test.cbor.zst']
+)
+def filename(request):
+    return request.param
+
+
+content = {'foo': {'bar': ['baz'] * 100}, 'unicode': 'äöü €'}
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def decompress(filename):
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if filename.endswith('.gz'):
+        return gzip.decompress(data)
+    zstandard = pytest.importorskip('zstandard')
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def test_codec_for_compressed_filename():
+    assert codec_for_filename('test.json.gz') is default_json_codec()
+    assert codec_for_filename('test.yaml.zst') is yaml_codec
+    assert codec_for_filename('test.gz') is default_json_codec()
+
+
+def test_compressed_round_trip(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename)
+    store.content.update(content)
+    assert store.commit()
+    assert os.path.getsize(filename) < len(json.dumps(content)) / 2
+    assert open_store(filename).content == content
+
+
+def test_compressed_file_readable_by_others(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json.gz')
+    store = open_store(filename)
+    store.content.update(content)
+    assert store.commit()
+    assert json.loads(decompress(filename)) == content
+
+    with gzip.open(filename, 'wt') as f:
+        json.dump({'foo': 'bar'}, f)
+    assert open_store(filename).content == {'foo': 'bar'}
+
+
+def test_compressed_transactions(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, journal=True)
+    with store.transaction() as t:
+        store.content.update(content)
+    assert t.result.unwrap() == Transaction.State.Committed
+    with pytest.raises(RuntimeError):
+        with store.transaction(rollback=True) as t:
+            store.content['foo'] = 'qux'
+            raise RuntimeError()
+    assert t.result.unwrap() == Transaction.State.Rolledback
+    assert store.compact()
+    with store.transaction():
+        store.content['new'] = 1
+    assert open_store(filename, journal=True).content == {**content, 'new': 1}
+    assert open_store(filename).content == content
+
+
+def test_compressed_unchanged_commit_skipped(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename)
+    store.content.update(content)
+    assert store.commit()
+    with open(filename, 'rb') as f:
+        data = f.read()
+    assert store.commit()
+    assert store.skipped_commits == 1
+
+    # the same content compresses to the same file
+    os.remove(filename)
+    assert store.commit()
+    with open(filename, 'rb') as f:
+        assert f.read() == data
+
+
+@pytest.mark.parametrize('extension', ['.gz', '.zst'])
+def test_compression_level(tmp_path, extension):
+    sizes = []
+    for level in [1, 9]:
+        filename = os.path.join(tmp_path, f'test-{level}.json{extension}')
+        store = open_store(filename, compression_level=level)
+        store.content.update({f'key-{i}': f'value-{i % 7}' * (i % 13) for i in range(2000)})
+        assert store.commit()
+        sizes.append(os.path.getsize(filename))
+        assert open_store(filename).content == store.content
+    assert sizes[1] < sizes[0]
+
+
+def test_missing_compression_backend(tmp_path):
+    compression = compressions_by_extension['.zst']
+    compressions_by_extension['.zst'] = _missing_compression('zstd', 'zstandard')
+    try:
+        store = open_store(os.path.join(tmp_path, 'test.json.zst'))
+        store.content['foo'] = 'bar'
+        with pytest.raises(Panic, match='zstandard is required'):
+            store.commit()
+    finally:
+        compressions_by_extension['.zst'] = compression
@@ -0,0 +1,95 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import subprocess
+from mrjsonstore import JsonStore, convert
+from mrjsonstore.__main__ import main
+
+import pytest
+
+content = {'foo': {'bar': [1, 2.5, None, 'baz']}, 'unicode': 'äöü €'}
+
+extensions = ['.json', '.yaml', '.msgpack', '.cbor']
+
+
+def write_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    store = store.unwrap()
+    store.content.update(content)
+    assert store.commit()
+
+
+def read_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    return store.unwrap().content
+
+
+@pytest.mark.parametrize('source', extensions)
+@pytest.mark.parametrize('destination', extensions)
+def test_convert(tmp_path, source, destination):
+    source = os.path.join(tmp_path, 'source' + source)
+    destination = os.path.join(tmp_path, 'destination' + destination)
+    write_store(source)
+    assert convert(source, destination)
+    assert read_store(destination) == content
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [os.path.basename(source), os.path.basename(destination)]
+    )
+
+
+def test_convert_replays_journal(tmp_path):
+    pytest.importorskip('msgpack')
+    source = os.path.join(tmp_path, 'source.json')
+    destination = os.path.join(tmp_path, 'destination.msgpack')
+    write_store(source, journal=True)
+    assert os.path.exists(source + '.journal')
+    assert convert(source, destination, journal=True)
+    assert read_store(destination) == content
+    assert not os.path.exists(destination + '.journal')
+
+
+def test_convert_replaces_destination(tmp_path):
+    pytest.importorskip('cbor2')
+    source = os.path.join(tmp_path, 'source.json')
+    destination = os.path.join(tmp_path, 'destination.cbor')
+    write_store(source)
+    write_store(destination)
+    store = JsonStore(destination).unwrap()
+    store.content['other'] = 1
+    assert store.commit()
+    assert convert(source, destination)
+    assert read_store(destination) == content
+
+
+def test_convert_broken_source(tmp_path):
+    pytest.importorskip('msgpack')
+    source = os.path.join(tmp_path, 'source.json')
+    with open(source, 'w') as f:
+        f.write('{"foo": ')
+    assert not convert(source, os.path.join(tmp_path, 'destination.msgpack'))
+    assert main([source, os.path.join(tmp_path, 'destination.msgpack')]) == 1
+
+
+def test_main(tmp_path):
+    pytest.importorskip('msgpack')
+    source = os.path.join(tmp_path, 'source.yaml')
+    destination = os.path.join(tmp_path, 'destination.msgpack')
+    write_store(source)
+    assert main([source, destination]) == 0
+    assert read_store(destination) == content
+
+
+def test_command_line(tmp_path):
+    source = os.path.join(tmp_path, 'source.json')
+    destination = os.path.join(tmp_path, 'destination.json')
+    write_store(source)
+    subprocess.run(
+        [sys.executable, '-W', 'error', '-m', 'mrjsonstore', source, destination],
+        check=True,
+        capture_output=True,
+    )
+    assert read_store(destination) == content
@@ -8,12 +8,12 @@ from mrjsonstore import JsonStore, Transaction
 import pytest
 
 
-@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml'])
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml', 'test.msgpack', 'test.cbor'])
 def filename(request):
     return request.param
 
 
-@pytest.fixture(params=['broken.json', 'broken.yaml'])
+@pytest.fixture(params=['broken.json', 'broken.yaml', 'broken.msgpack', 'broken.cbor'])
 def broken_filename(request):
     return request.param
 
@@ -48,9 +48,18 @@ foo:
     'broken.yaml': r'''
 %aieatie
 ''',
+    'test.msgpack': b'\x81\xa3foo\x81\xa3bar\xa3baz',
+    'test.cbor': b'\xa1cfoo\xa1cbarcbaz',
+    'broken.msgpack': b'\x81\xa3foo\x81\xa3bar',
+    'broken.cbor': b'\xa1cfoo\xa1cbar',
 }
 
 
+def write_file(filepath, content):
+    with open(filepath, 'wb' if isinstance(content, bytes) else 'w') as f:
+        f.write(content)
+
+
 def test_no_rollback_no_exception(tmp_path, filename):
     filename = os.path.join(tmp_path, filename)
     store = JsonStore(filename)
@@ -317,8 +326,7 @@ def test_rollback_exception_modifying_existing_data(tmp_path, filename):
 
 def test_read_existing_file(tmp_path, filename, dry_run):
     filepath = os.path.join(tmp_path, filename)
-    with open(filepath, 'w') as f:
-        f.write(file_content[filename])
+    write_file(filepath, file_content[filename])
 
     store = JsonStore(filepath, dry_run=dry_run)
     assert store
@@ -328,8 +336,7 @@ def test_read_existing_file(tmp_path, filename, dry_run):
 
 def test_read_existing_file_broken(tmp_path, broken_filename, dry_run):
     filepath = os.path.join(tmp_path, broken_filename)
-    with open(filepath, 'w') as f:
-        f.write(file_content[broken_filename])
+    write_file(filepath, file_content[broken_filename])
 
     store = JsonStore(filepath, dry_run=dry_run)
     assert not store
@@ -0,0 +1,147 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import time
+import atomicwrites
+from mrjsonstore import JsonStore, Transaction
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.msgpack', 'test.json.gz'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def journal(request):
+    return request.param
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    # atomicwrites keeps its own reference to os.fsync
+    synced = []
+
+    def fsync(fd):
+        synced.append(fd)
+
+    monkeypatch.setattr(atomicwrites, '_proper_fsync', fsync)
+    monkeypatch.setattr(os, 'fsync', fsync)
+    return synced
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def commit(store, durability=None, **content):
+    with store.transaction(durability=durability) as t:
+        store.content.update(content)
+    assert t.result.unwrap() == Transaction.State.Committed
+    return t
+
+
+def test_full(tmp_path, filename, journal, fsyncs):
+    store = open_store(os.path.join(tmp_path, filename), journal=journal)
+    assert store.durability == 'full'
+    commit(store, foo='bar')
+    assert fsyncs
+
+
+def test_rename_only(tmp_path, filename, journal, fsyncs):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, journal=journal, durability='rename-only')
+    commit(store, foo='bar')
+    assert store.compact()
+    commit(store, baz='qux')
+    assert not fsyncs
+    assert open_store(filename, journal=journal).content == {'foo': 'bar', 'baz': 'qux'}
+    assert [name for name in os.listdir(tmp_path) if name.startswith('tmp')] == []
+
+
+def test_periodic(tmp_path, journal, fsyncs):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, journal=journal, durability='periodic', sync_interval=0.05)
+    commit(store, foo='bar')
+    commit(store, baz='qux')
+    assert not fsyncs
+    deadline = time.monotonic() + 5
+    while not fsyncs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # the file and its directory, once for both commits
+    assert len(fsyncs) == 2
+    assert open_store(filename, journal=journal).content == {'foo': 'bar', 'baz': 'qux'}
+    assert store.close()
+
+
+def test_periodic_flush_and_close(tmp_path, fsyncs):
+    store = open_store(os.path.join(tmp_path, 'test.json'), durability='periodic', sync_interval=60)
+    commit(store, foo='bar')
+    assert not fsyncs
+    assert store.flush()
+    assert len(fsyncs) == 2
+    commit(store, foo='baz')
+    assert store.close()
+    assert len(fsyncs) == 4
+    assert store.close()
+
+
+def test_transaction_overrides_store(tmp_path, fsyncs):
+    store = open_store(os.path.join(tmp_path, 'test.json'), durability='rename-only')
+    t = commit(store, 'full', foo='bar')
+    assert t.durability == 'full'
+    assert fsyncs
+    fsyncs.clear()
+    commit(store, foo='baz')
+    assert not fsyncs
+
+    store = open_store(os.path.join(tmp_path, 'other.json'))
+    commit(store, 'rename-only', foo='bar')
+    assert not fsyncs
+
+
+def test_savepoint_raises_durability(tmp_path, fsyncs):
+    store = open_store(os.path.join(tmp_path, 'test.json'), durability='rename-only')
+    with store.transaction() as t:
+        with store.transaction(durability='full') as s:
+            store.content['foo'] = 'bar'
+        assert s.durability == 'full'
+        with store.transaction(durability='periodic'):
+            store.content['baz'] = 'qux'
+    assert t.durability == 'full'
+    assert fsyncs
+
+
+def test_write_behind(tmp_path, fsyncs):
+    store = open_store(os.path.join(tmp_path, 'test.json'), write_behind=True)
+    with store.transaction(durability='rename-only') as t:
+        store.content['foo'] = 'bar'
+    assert t.wait().unwrap() == Transaction.State.Committed
+    assert not fsyncs
+    with store.transaction() as t:
+        store.content['foo'] = 'baz'
+    assert t.wait().unwrap() == Transaction.State.Committed
+    assert fsyncs
+    assert store.close()
+
+
+def test_invalid_durability(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    assert not JsonStore(filename, durability='never')
+    store = open_store(filename)
+    assert not store.try_transaction(durability='never')
+    assert not store.current_transaction
+
+
+def test_periodic_synced_at_exit(tmp_path, fsyncs):
+    from mrjsonstore import durability
+
+    store = open_store(os.path.join(tmp_path, 'test.json'), durability='periodic', sync_interval=60)
+    commit(store, foo='bar')
+    assert not fsyncs
+    durability._close_syncers()
+    assert len(fsyncs) == 2
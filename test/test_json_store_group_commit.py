@@ -0,0 +1,126 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+import threading
+from mrjsonstore import JsonStore, Transaction, Codec
+
+import pytest
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+class CountingCodec:
+    def __init__(self):
+        self.writes = 0
+        self.codec = Codec('counting', self.serialise, json.loads)
+
+    def serialise(self, content):
+        self.writes += 1
+        return json.dumps(content)
+
+
+def commit_concurrently(store, count):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def commit(i):
+        barrier.wait()
+        with store.transaction() as t:
+            store.content[f'key{i}'] = i
+        results[i] = t.result
+
+    threads = [threading.Thread(target=commit, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_group_commit_requires_threadsafe(tmp_path):
+    assert not JsonStore(os.path.join(tmp_path, 'test.json'), group_commit_window=0.01)
+
+
+def test_group_commit_coalesces_writes(tmp_path, tracked):
+    filename = os.path.join(tmp_path, 'test.json')
+    counting = CountingCodec()
+    store = JsonStore(
+        filename,
+        codec=counting.codec,
+        tracked=tracked,
+        threadsafe=True,
+        group_commit_window=0.2,
+        group_commit_size=20,
+    )
+    assert store
+    store = store.unwrap()
+
+    results = commit_concurrently(store, 20)
+    assert all(result.unwrap() == Transaction.State.Committed for result in results)
+    assert counting.writes < 20
+
+    store_ = JsonStore(filename)
+    assert store_
+    assert store_.unwrap().content == {f'key{i}': i for i in range(20)}
+
+
+def test_group_commit_size_bounds_batch(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    counting = CountingCodec()
+    store = JsonStore(
+        filename,
+        codec=counting.codec,
+        threadsafe=True,
+        group_commit_window=10.0,
+        group_commit_size=1,
+    )
+    assert store
+    store = store.unwrap()
+    for i in range(3):
+        store.content[f'key{i}'] = i
+        assert store.commit()
+    assert counting.writes == 3
+
+
+def test_group_commit_single_committer_within_window(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = JsonStore(filename, threadsafe=True, group_commit_window=0.01)
+    assert store
+    store = store.unwrap()
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+    assert t.result.unwrap() == Transaction.State.Committed
+
+    store_ = JsonStore(filename)
+    assert store_
+    assert store_.unwrap().content == {'foo': 'bar'}
+
+
+def test_group_commit_error_reaches_all_committers(tmp_path):
+    filename = os.path.join(tmp_path, 'invalid', 'non', 'existing', 'path', 'test.json')
+    store = JsonStore(filename, threadsafe=True, group_commit_window=0.2, group_commit_size=10)
+    assert store
+    store = store.unwrap()
+
+    results = commit_concurrently(store, 10)
+    assert not any(results)
+    assert all(isinstance(result.unwrap_err(), FileNotFoundError) for result in results)
+
+    with store.transaction(timeout=1.0) as t:
+        pass
+    assert not t.result
+
+
+def test_group_commit_dry_run(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = JsonStore(filename, dry_run=True, threadsafe=True, group_commit_window=10.0)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert not os.path.exists(filename)
@@ -0,0 +1,146 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import copy
+from mrjsonstore import JsonStore
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.msgpack'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def indexed(request):
+    return request.param
+
+
+users = {
+    'alice': {'email': 'alice@example.com', 'team': 'a', 'address': {'city': 'Berlin'}},
+    'bob': {'email': 'bob@example.com', 'team': 'a', 'address': {'city': 'Paris'}},
+    'carol': {'email': 'carol@example.com', 'team': 'b'},
+}
+
+
+def open_store(filename, indexed, **kwargs):
+    store = JsonStore(filename, tracked=True, **kwargs)
+    assert store
+    store = store.unwrap()
+    if indexed:
+        assert store.create_index('users', 'email')
+        assert store.create_index('users', 'team')
+        assert store.create_index('/users', 'address/city')
+    return store
+
+
+def find(store, field, value):
+    return sorted(store.find('users', field, value).unwrap())
+
+
+def test_find(tmp_path, filename, indexed):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, False)
+    store.content['users'] = copy.deepcopy(users)
+    assert store.commit()
+
+    store = open_store(filename, indexed)
+    assert store.find('users', 'email', 'bob@example.com').unwrap() == {'bob': users['bob']}
+    assert find(store, 'team', 'a') == ['alice', 'bob']
+    assert find(store, 'address/city', 'Paris') == ['bob']
+    assert find(store, 'team', 'c') == []
+    assert not store.find('missing', 'team', 'a')
+
+
+def test_changes_update_index(tmp_path, indexed):
+    store = open_store(os.path.join(tmp_path, 'test.json'), indexed)
+    with store.transaction():
+        store.content['users'] = copy.deepcopy(users)
+    assert find(store, 'team', 'a') == ['alice', 'bob']
+    with store.transaction():
+        store.content['users']['alice']['team'] = 'b'
+        store.content['users']['dave'] = {'team': 'a'}
+        del store.content['users']['bob']
+        # visible before the commit
+        assert find(store, 'team', 'a') == ['dave']
+    assert find(store, 'team', 'b') == ['alice', 'carol']
+    assert store.set('users/carol/team', 'a')
+    assert store.delete('users/dave/team')
+    assert find(store, 'team', 'a') == ['carol']
+    del store.content['users']
+    assert not store.find('users', 'team', 'a')
+
+
+def test_rollback_restores_index(tmp_path, indexed):
+    store = open_store(os.path.join(tmp_path, 'test.json'), indexed)
+    store.content['users'] = copy.deepcopy(users)
+    assert store.commit()
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.content['users']['alice']['email'] = 'alice@example.org'
+            del store.content['users']['bob']
+            assert find(store, 'email', 'alice@example.org') == ['alice']
+            raise RuntimeError()
+    assert find(store, 'email', 'alice@example.org') == []
+    assert find(store, 'email', 'alice@example.com') == ['alice']
+    assert find(store, 'team', 'a') == ['alice', 'bob']
+
+    with store.transaction() as t:
+        with pytest.raises(RuntimeError):
+            with t.savepoint():
+                store.content['users']['carol']['team'] = 'a'
+                assert find(store, 'team', 'a') == ['alice', 'bob', 'carol']
+                raise RuntimeError()
+        assert find(store, 'team', 'a') == ['alice', 'bob']
+
+
+def test_reload_rebuilds_index(tmp_path, indexed):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, indexed, locking=True)
+    store.content['users'] = copy.deepcopy(users)
+    assert store.commit()
+    other = open_store(filename, False, locking=True)
+    with other.transaction():
+        other.content['users']['carol']['team'] = 'a'
+    with store.transaction():
+        assert find(store, 'team', 'a') == ['alice', 'bob', 'carol']
+
+
+def test_lazy_store(tmp_path, indexed):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, False)
+    store.content['users'] = copy.deepcopy(users)
+    assert store.commit()
+    store = open_store(filename, indexed, lazy=True)
+    assert not store.loaded
+    assert find(store, 'team', 'b') == ['carol']
+
+
+def test_values_compared_as_json(tmp_path, indexed):
+    store = open_store(os.path.join(tmp_path, 'test.json'), False)
+    if indexed:
+        assert store.create_index('users', 'tags')
+    store.content['users'] = {'a': {'tags': {'x': [1, 2], 'y': None}}, 'b': {'tags': 'x'}}
+    assert find(store, 'tags', {'y': None, 'x': [1, 2]}) == ['a']
+    assert find(store, 'tags', 'x') == ['b']
+
+
+def test_index_requires_tracking(tmp_path):
+    store = JsonStore(os.path.join(tmp_path, 'test.json')).unwrap()
+    assert not store.create_index('users', 'email')
+    store.content['users'] = copy.deepcopy(users)
+    assert store.find('users', 'team', 'b').unwrap() == {'carol': users['carol']}
+
+
+def test_drop_index(tmp_path):
+    store = open_store(os.path.join(tmp_path, 'test.json'), True)
+    store.content['users'] = copy.deepcopy(users)
+    assert store.drop_index('users', 'team')
+    assert find(store, 'team', 'a') == ['alice', 'bob']
+    assert not store.drop_index('users', 'team')
+    assert store.drop_index('users', 'email')
+    assert store.drop_index('users', 'address/city')
+    store.content['users']['alice']['team'] = 'b'
+    assert find(store, 'team', 'b') == ['alice', 'carol']
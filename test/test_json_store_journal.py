@@ -0,0 +1,228 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+from mrjsonstore import JsonStore, Metrics, Transaction
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml', 'test.msgpack', 'test.cbor'])
+def filename(request):
+    return request.param
+
+
+def read_journal(filename):
+    with open(filename + '.journal') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_journal_commit_appends_changes_only(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True)
+    assert store
+    store = store.unwrap()
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+        store.content['nested'] = {'baz': 123}
+    assert t.result
+    assert t.result.unwrap() == Transaction.State.Committed
+    assert not os.path.exists(filename)
+
+    with store.transaction() as t:
+        store.content['nested']['baz'] = 321
+    assert t.result
+
+    journal = read_journal(filename)
+    assert len(journal) == 2
+    assert journal[1] == [{'op': 'add', 'path': '/nested', 'value': {'baz': 321}}]
+
+    store_ = JsonStore(filename, journal=True)
+    assert store_
+    store_ = store_.unwrap()
+    assert store_.content == {'foo': 'bar', 'nested': {'baz': 321}}
+
+
+def test_journal_records_removal(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    store.content['baz'] = 'qux'
+    assert store.commit()
+    del store.content['foo']
+    assert store.commit()
+
+    assert read_journal(filename)[1] == [{'op': 'remove', 'path': '/foo'}]
+
+    store_ = JsonStore(filename, journal=True)
+    assert store_
+    assert store_.unwrap().content == {'baz': 'qux'}
+
+
+def test_journal_no_entry_without_changes(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert store.commit()
+    assert len(read_journal(filename)) == 1
+
+
+def test_journal_rollback_not_journaled(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    try:
+        with store.transaction() as t:
+            store.content['foo'] = 'baz'
+            raise RuntimeError()
+    except RuntimeError:
+        pass
+    assert t.result.unwrap() == Transaction.State.Rolledback
+    assert store.commit()
+    assert len(read_journal(filename)) == 1
+
+
+def test_journal_compaction(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True, compact_after=3)
+    assert store
+    store = store.unwrap()
+    for i in range(3):
+        store.content[f'key{i}'] = i
+        assert store.commit()
+    assert os.path.exists(filename)
+    assert not os.path.exists(filename + '.journal')
+
+    store.content['key3'] = 3
+    assert store.commit()
+    assert len(read_journal(filename)) == 1
+
+    store_ = JsonStore(filename)
+    assert store_
+    assert store_.unwrap().content == {'key0': 0, 'key1': 1, 'key2': 2}
+
+    store_ = JsonStore(filename, journal=True)
+    assert store_
+    assert store_.unwrap().content == {'key0': 0, 'key1': 1, 'key2': 2, 'key3': 3}
+
+
+def test_journal_explicit_compaction(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert store.compact()
+    assert not os.path.exists(filename + '.journal')
+
+    store_ = JsonStore(filename)
+    assert store_
+    assert store_.unwrap().content == {'foo': 'bar'}
+
+
+def test_journal_replay_is_idempotent_after_interrupted_compaction(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    store.content['baz'] = 'qux'
+    assert store.commit()
+    del store.content['baz']
+    assert store.commit()
+    with open(filename + '.journal') as f:
+        journal = f.read()
+    assert store.compact()
+    with open(filename + '.journal', 'w') as f:
+        f.write(journal)
+
+    store_ = JsonStore(filename, journal=True)
+    assert store_
+    assert store_.unwrap().content == {'foo': 'bar'}
+
+
+def test_journal_torn_last_entry_ignored(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    with open(filename + '.journal', 'a') as f:
+        f.write('[{"op": "add", "path": "/foo", "va')
+
+    store_ = JsonStore(filename, journal=True)
+    assert store_
+    store_ = store_.unwrap()
+    assert store_.content == {'foo': 'bar'}
+    store_.content['foo'] = 'baz'
+    assert store_.commit()
+    assert len(read_journal(filename)) == 2
+
+
+def test_journal_corrupt_entry_fails(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    with open(filename + '.journal', 'w') as f:
+        f.write('[{"op": "add", "path": "/foo", "va\n[]\n')
+
+    store = JsonStore(filename, journal=True)
+    assert not store
+
+
+def test_journal_dry_run(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=True, journal=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert store.compact()
+    assert not os.path.exists(filename)
+    assert not os.path.exists(filename + '.journal')
+
+
+def test_journal_invalid_file(tmp_path, filename):
+    filename = os.path.join(tmp_path, 'invalid', 'non', 'existing', 'path', filename)
+    store = JsonStore(filename, journal=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    assert not store.commit()
+
+
+@pytest.mark.parametrize('old, new', [(1, True), (True, 1), (1, 1.0), (0.0, 0), ([1], [1.0])])
+def test_journal_nested_type_change(tmp_path, filename, old, new):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True, metrics=Metrics()).unwrap()
+    store.content['cfg'] = {'flag': old}
+    assert store.commit()
+    store.content['cfg']['flag'] = new
+    assert store.commit()
+    assert 'skipped_commits' not in store.metrics.counters
+
+    loaded = JsonStore(filename, journal=True).unwrap().content['cfg']['flag']
+    assert loaded == new and type(loaded) is type(new)
+
+
+def test_journal_creation_syncs_directory(tmp_path, monkeypatch):
+    from mrjsonstore import journal
+
+    synced = []
+    monkeypatch.setattr(journal, 'sync_path', synced.append)
+    filename = os.path.join(tmp_path, 'test.json')
+    store = JsonStore(filename, journal=True).unwrap()
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    store.content['foo'] = 'baz'
+    assert store.commit()
+    assert synced == [filename + '.journal']
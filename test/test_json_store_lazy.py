@@ -0,0 +1,167 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from mrjsonstore import JsonStore, Transaction
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=['broken.json', 'broken.yaml'])
+def broken_filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+file_content = {
+    'test.json': r'''
+{
+    "foo": {
+        "bar": "baz"
+    }
+}
+''',
+    'test.yaml': r'''
+foo:
+    bar: baz
+''',
+    'test.yml': r'''
+foo:
+    bar: baz
+''',
+    'broken.json': r'''
+    "foo": {
+        "bar": "baz"
+    }
+}
+''',
+    'broken.yaml': r'''
+%aieatie
+''',
+}
+
+
+def write_file(tmp_path, filename):
+    filepath = os.path.join(tmp_path, filename)
+    with open(filepath, 'w') as f:
+        f.write(file_content[filename])
+    return filepath
+
+
+def test_lazy_loads_on_content_access(tmp_path, filename, tracked):
+    filepath = write_file(tmp_path, filename)
+    store = JsonStore(filepath, lazy=True, tracked=tracked)
+    assert store
+    store = store.unwrap()
+    assert not store.loaded
+    assert store.current_transaction is None
+    assert not store.loaded
+    assert store.content['foo']['bar'] == 'baz'
+    assert store.loaded
+
+
+def test_lazy_broken_file_constructs(tmp_path, broken_filename):
+    filepath = write_file(tmp_path, broken_filename)
+    store = JsonStore(filepath, lazy=True)
+    assert store
+    store = store.unwrap()
+    assert not store.load()
+    assert not store.loaded
+    with pytest.raises(Exception):
+        store.content
+
+
+def test_lazy_load_is_idempotent(tmp_path, filename):
+    filepath = write_file(tmp_path, filename)
+    store = JsonStore(filepath, lazy=True)
+    assert store
+    store = store.unwrap()
+    assert store.load()
+    store.content['foo'] = 'bar'
+    assert store.load()
+    assert store.content['foo'] == 'bar'
+
+
+def test_lazy_commit_without_access_keeps_file(tmp_path, filename, tracked):
+    filepath = write_file(tmp_path, filename)
+    store = JsonStore(filepath, lazy=True, tracked=tracked)
+    assert store
+    store = store.unwrap()
+    assert store.commit()
+    with store.transaction() as t:
+        pass
+    assert t.result.unwrap() == Transaction.State.Committed
+    assert not store.loaded
+    with open(filepath) as f:
+        assert f.read() == file_content[filename]
+
+
+def test_lazy_commit_after_access(tmp_path, filename, tracked):
+    filepath = write_file(tmp_path, filename)
+    store = JsonStore(filepath, lazy=True, tracked=tracked)
+    assert store
+    store = store.unwrap()
+    with store.transaction() as t:
+        store.content['foo']['bar'] = 'qux'
+    assert t.result
+
+    store_ = JsonStore(filepath)
+    assert store_
+    assert store_.unwrap().content == {'foo': {'bar': 'qux'}}
+
+
+def test_lazy_rollback_of_transaction_that_loaded(tmp_path, filename, tracked):
+    filepath = write_file(tmp_path, filename)
+    store = JsonStore(filepath, lazy=True, tracked=tracked)
+    assert store
+    store = store.unwrap()
+    try:
+        with store.transaction() as t:
+            store.content['foo']['bar'] = 'qux'
+            store.content['new'] = 1
+            raise RuntimeError()
+    except RuntimeError:
+        pass
+    assert t.result.unwrap() == Transaction.State.Rolledback
+    assert store.content == {'foo': {'bar': 'baz'}}
+
+
+def test_lazy_rollback_after_load(tmp_path, filename, tracked):
+    filepath = write_file(tmp_path, filename)
+    store = JsonStore(filepath, lazy=True, tracked=tracked)
+    assert store
+    store = store.unwrap()
+    store.content['new'] = 1
+    t = store.transaction()
+    store.content['new'] = 2
+    t.rollback()
+    assert store.content == {'foo': {'bar': 'baz'}, 'new': 1}
+
+
+def test_lazy_journal_replayed_on_access(tmp_path, filename, tracked):
+    filepath = write_file(tmp_path, filename)
+    store = JsonStore(filepath, journal=True, tracked=tracked)
+    assert store
+    store = store.unwrap()
+    store.content['new'] = 1
+    assert store.commit()
+
+    store_ = JsonStore(filepath, lazy=True, journal=True, tracked=tracked)
+    assert store_
+    store_ = store_.unwrap()
+    assert store_.content == {'foo': {'bar': 'baz'}, 'new': 1}
+    store_.content['new'] = 2
+    assert store_.commit()
+
+    store__ = JsonStore(filepath, journal=True)
+    assert store__
+    assert store__.unwrap().content == {'foo': {'bar': 'baz'}, 'new': 2}
@@ -0,0 +1,163 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import multiprocessing
+from mrjsonstore import JsonStore, Transaction, ConcurrentModificationError
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml', 'test.msgpack', 'test.cbor'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def journal(request):
+    return request.param
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, locking=True, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def test_locking_invalid_conflict_policy(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    assert not JsonStore(filename, locking=True, on_conflict='ignore')
+    assert not JsonStore(filename, locking=True, on_conflict='merge')
+
+
+def test_locking_reload_refreshes_read_view(tmp_path, filename, journal):
+    filename = os.path.join(tmp_path, filename)
+    store_a = open_store(filename, journal=journal, threadsafe=True)
+    store_b = open_store(filename, journal=journal)
+    with store_a.transaction():
+        store_a.content['x'] = 1
+    assert store_a.read_view() == {'x': 1}
+    with store_b.transaction():
+        store_b.content['x'] = 2
+    # the transaction reloads the content, rolling it back does not clear the view
+    store_a.transaction()
+    assert store_a.content == {'x': 2}
+    store_a.rollback()
+    assert store_a.read_view() == {'x': 2}
+
+
+def test_locking_conflicting_commit_fails(tmp_path, filename, journal):
+    filename = os.path.join(tmp_path, filename)
+    store_a = open_store(filename, journal=journal)
+    store_b = open_store(filename, journal=journal)
+
+    store_a.content['foo'] = 'a'
+    assert store_a.commit()
+    store_b.content['foo'] = 'b'
+    result = store_b.commit()
+    assert not result
+    assert isinstance(result.unwrap_err(), ConcurrentModificationError)
+
+    store_c = open_store(filename, journal=journal)
+    assert store_c.content == {'foo': 'a'}
+
+
+def test_locking_transaction_reloads_changed_file(tmp_path, filename, journal):
+    filename = os.path.join(tmp_path, filename)
+    store_a = open_store(filename, journal=journal)
+    store_b = open_store(filename, journal=journal)
+
+    store_a.content['foo'] = 'a'
+    assert store_a.commit()
+    with store_b.transaction() as t:
+        assert store_b.content == {'foo': 'a'}
+        store_b.content['bar'] = 'b'
+    assert t.result
+    assert t.result.unwrap() == Transaction.State.Committed
+
+    with store_a.transaction() as t:
+        assert store_a.content == {'foo': 'a', 'bar': 'b'}
+    assert t.result
+
+
+def test_locking_own_commits_do_not_conflict(tmp_path, filename, journal):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, journal=journal)
+    for i in range(5):
+        with store.transaction() as t:
+            store.content[f'key{i}'] = i
+        assert t.result
+    assert store.compact()
+    store.content['key5'] = 5
+    assert store.commit()
+
+
+def test_locking_merge(tmp_path, filename, journal):
+    filename = os.path.join(tmp_path, filename)
+    store_a = open_store(filename, journal=journal, tracked=True, on_conflict='merge')
+    store_b = open_store(filename, journal=journal, tracked=True, on_conflict='merge')
+
+    store_a.content['nested'] = {'a': 1}
+    assert store_a.commit()
+    store_b.content['foo'] = 'b'
+    assert store_b.commit()
+    assert store_b.content == {'nested': {'a': 1}, 'foo': 'b'}
+
+    store_a.content['nested']['b'] = 2
+    assert store_a.commit()
+    assert store_a.content == {'nested': {'a': 1, 'b': 2}, 'foo': 'b'}
+
+    store_c = open_store(filename, journal=journal)
+    assert store_c.content == {'nested': {'a': 1, 'b': 2}, 'foo': 'b'}
+
+
+def test_locking_merge_into_removed_parent_fails(tmp_path, filename, journal):
+    filename = os.path.join(tmp_path, filename)
+    store_a = open_store(filename, journal=journal, tracked=True, on_conflict='merge')
+    store_a.content['nested'] = {'a': 1}
+    assert store_a.commit()
+    store_b = open_store(filename, journal=journal, tracked=True, on_conflict='merge')
+
+    del store_a.content['nested']
+    assert store_a.commit()
+    store_b.content['nested']['b'] = 2
+    result = store_b.commit()
+    assert not result
+    assert isinstance(result.unwrap_err(), ConcurrentModificationError)
+
+
+def add_keys(filename, journal, worker, count):
+    store = JsonStore(filename, locking=True, journal=journal, tracked=True, on_conflict='merge')
+    store = store.unwrap()
+    for i in range(count):
+        with store.transaction() as t:
+            store.content[f'{worker}-{i}'] = i
+        assert t.result
+
+
+def test_locking_multiple_processes(tmp_path, journal):
+    filename = os.path.join(tmp_path, 'test.json')
+    context = multiprocessing.get_context('fork')
+    processes = [
+        context.Process(target=add_keys, args=(filename, journal, worker, 20))
+        for worker in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    store = open_store(filename, journal=journal)
+    assert store.content == {f'{worker}-{i}': i for worker in range(4) for i in range(20)}
+
+
+def test_locking_unsupported(tmp_path, monkeypatch):
+    from mrjsonstore import json_store, locking
+
+    monkeypatch.setattr(json_store, 'locking_supported', False)
+    store = JsonStore(os.path.join(tmp_path, 'test.json'), locking=True)
+    assert isinstance(store.unwrap_err(), ValueError)
+    monkeypatch.setattr(locking, 'fcntl', None)
+    with pytest.raises(OSError):
+        locking.FileLock(os.path.join(tmp_path, 'test.json.lock'))
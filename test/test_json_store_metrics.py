@@ -0,0 +1,138 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import threading
+from mrjsonstore import JsonStore, Metrics, ShardedJsonStore
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.msgpack', 'test.json.gz'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def test_commit_phases(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    metrics = Metrics()
+    store = open_store(filename, metrics=metrics, tracked=tracked)
+    assert store.metrics is metrics
+    with store.transaction():
+        store.content['foo'] = 'bar' * 100
+    for phase in ['snapshot', 'serialise', 'write', 'fsync', 'rename', 'commit']:
+        assert metrics.timings[phase].calls == 1
+        assert metrics.timings[phase].total >= 0
+    assert metrics.counters == {'commits': 1, 'bytes_written': os.path.getsize(filename)}
+
+    open_store(filename, metrics=metrics)
+    assert metrics.timings['deserialise'].calls == 1
+
+
+def test_rollback_and_skipped_commit(tmp_path, tracked):
+    metrics = Metrics()
+    store = open_store(os.path.join(tmp_path, 'test.json'), metrics=metrics, tracked=tracked)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.content['foo'] = 'baz'
+            raise RuntimeError()
+    with store.transaction() as t:
+        with pytest.raises(RuntimeError):
+            with t.savepoint():
+                store.content['foo'] = 'baz'
+                raise RuntimeError()
+    assert metrics.counters['rollbacks'] == 2
+    assert metrics.timings['rollback'].calls == 2
+    assert metrics.counters['commits'] == 2
+    assert metrics.counters['skipped_commits'] == 1
+    assert store.skipped_commits == 1
+    # a skipped commit does not sync or rename anything
+    assert metrics.timings['rename'].calls == 1
+
+
+def test_journal_phase(tmp_path, tracked):
+    filename = os.path.join(tmp_path, 'test.json')
+    metrics = Metrics()
+    store = open_store(filename, metrics=metrics, tracked=tracked, journal=True)
+    with store.transaction():
+        store.content['foo'] = 'bar'
+    assert metrics.timings['journal'].calls == 1
+    assert 'rename' not in metrics.timings
+    assert metrics.counters['bytes_written'] == os.path.getsize(filename + '.journal')
+
+
+def test_write_behind_reports_from_background(tmp_path):
+    metrics = Metrics()
+    store = open_store(os.path.join(tmp_path, 'test.json'), metrics=metrics, write_behind=True)
+    with store.transaction():
+        store.content['foo'] = 'bar'
+    assert store.flush()
+    assert metrics.timings['rename'].calls == 1
+    assert store.close()
+
+
+def test_shared_between_shards(tmp_path):
+    metrics = Metrics()
+    store = ShardedJsonStore(str(tmp_path), shards=4, metrics=metrics)
+    assert store
+    store = store.unwrap()
+    with store.transaction():
+        for i in range(20):
+            store.content[f'key-{i}'] = i
+    assert metrics.timings['rename'].calls == len(os.listdir(tmp_path))
+
+
+def test_thread_safe():
+    metrics = Metrics()
+
+    def record():
+        for _ in range(1000):
+            metrics.observe('write', 0.5)
+            metrics.increment('bytes_written', 2)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.timings['write'].calls == 4000
+    assert metrics.timings['write'].total == 2000
+    assert metrics.timings['write'].max == 0.5
+    assert metrics.counters['bytes_written'] == 8000
+
+
+def test_subclass_receives_observations(tmp_path):
+    observed = []
+
+    class Recording(Metrics):
+        def observe(self, phase, seconds):
+            observed.append(phase)
+
+        def increment(self, counter, amount=1):
+            observed.append(counter)
+
+    store = open_store(os.path.join(tmp_path, 'test.json'), metrics=Recording())
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert observed == [
+        'serialise',
+        'write',
+        'bytes_written',
+        'fsync',
+        'rename',
+        'commit',
+        'commits',
+    ]
@@ -0,0 +1,183 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+from mrjsonstore import JsonStore, Transaction
+from mrjsonstore.patch import apply_operation
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def read_journal(filename):
+    with open(filename + '.journal') as f:
+        return [json.loads(line) for line in f]
+
+
+def replay(operations, document=None):
+    document = document if document is not None else {}
+    for operation in operations:
+        apply_operation(document, operation)
+    return document
+
+
+def test_get(tmp_path, tracked):
+    store = open_store(os.path.join(tmp_path, 'test.json'), tracked=tracked)
+    store.content['a'] = {'b': [1, {'c': 'd'}], 'e/f': 2}
+    assert store.get('a/b/1/c').unwrap() == 'd'
+    assert store.get('/a/b/0').unwrap() == 1
+    assert store.get(['a', 'b', 1]).unwrap() == {'c': 'd'}
+    assert store.get('a/e~1f').unwrap() == 2
+    assert store.get('').unwrap() == store.content
+    assert not store.get('a/x')
+    assert not store.get('a/b/2')
+    assert not store.get('a/b/x')
+
+
+def test_set(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    assert store.set('a', {'b': [1, 2]})
+    assert store.set('a/b/0', 3)
+    assert store.set('a/b/-', 4)
+    assert store.set('/a/c', 'd')
+    assert store.content == {'a': {'b': [3, 2, 4], 'c': 'd'}}
+    assert not store.set('a/b/5', 5)
+    assert not store.set('x/y', 1)
+    assert not store.set('', {})
+    assert store.content == {'a': {'b': [3, 2, 4], 'c': 'd'}}
+    assert store.commit()
+    assert open_store(filename).content == {'a': {'b': [3, 2, 4], 'c': 'd'}}
+
+
+def test_delete(tmp_path, tracked):
+    store = open_store(os.path.join(tmp_path, 'test.json'), tracked=tracked)
+    store.content['a'] = {'b': [1, 2, 3], 'c': 'd'}
+    assert store.delete('a/b/1')
+    assert store.delete('a/c')
+    assert store.content == {'a': {'b': [1, 3]}}
+    assert not store.delete('a/c')
+    assert not store.delete('a/b/2')
+    assert store.delete('a')
+    assert store.content == {}
+
+
+def test_apply_patch(tmp_path, tracked):
+    store = open_store(os.path.join(tmp_path, 'test.json'), tracked=tracked)
+    store.content['a'] = {'b': [1, 2], 'c': {'d': 'e'}}
+    assert store.apply_patch(
+        [
+            {'op': 'test', 'path': '/a/b/0', 'value': 1},
+            {'op': 'add', 'path': '/a/b/1', 'value': 5},
+            {'op': 'replace', 'path': '/a/c/d', 'value': 'f'},
+            {'op': 'copy', 'from': '/a/c', 'path': '/g'},
+            {'op': 'move', 'from': '/a/b', 'path': '/h'},
+            {'op': 'remove', 'path': '/a/c'},
+        ]
+    )
+    assert store.content == {'a': {}, 'g': {'d': 'f'}, 'h': [1, 5, 2]}
+    store.content['g']['d'] = 'x'
+    assert store.content['h'] == [1, 5, 2]
+
+
+@pytest.mark.parametrize(
+    'operation',
+    [
+        {'op': 'test', 'path': '/a/b/0', 'value': 2},
+        {'op': 'remove', 'path': '/a/x'},
+        {'op': 'replace', 'path': '/a/b/4', 'value': 1},
+        {'op': 'move', 'from': '/a', 'path': '/a/c/x'},
+        {'op': 'copy', 'from': '/x', 'path': '/y'},
+        {'op': 'add', 'path': '', 'value': {}},
+        {'op': 'unknown', 'path': '/a'},
+    ],
+)
+def test_apply_patch_is_atomic(tmp_path, tracked, operation):
+    store = open_store(os.path.join(tmp_path, 'test.json'), tracked=tracked)
+    content = {'a': {'b': [1, 2], 'c': {'d': 'e'}}, 'f': 'g'}
+    store.content.update(json.loads(json.dumps(content)))
+    assert not store.apply_patch(
+        [
+            {'op': 'add', 'path': '/a/b/0', 'value': 0},
+            {'op': 'add', 'path': '/a/c/d', 'value': 'x'},
+            {'op': 'remove', 'path': '/f'},
+            {'op': 'move', 'from': '/a/c', 'path': '/h'},
+            {'op': 'add', 'path': '/a/b/-', 'value': [3]},
+            operation,
+        ]
+    )
+    assert store.content == content
+
+
+def test_transaction_operations(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    replica: dict = {}
+    with store.transaction() as t:
+        assert store.set('a', {'b': [1]})
+        assert store.set('a/b/-', 3)
+        assert store.delete('a/b/0')
+    assert t.result.unwrap() == Transaction.State.Committed
+    assert t.operations == [
+        {'op': 'add', 'path': '/a', 'value': {'b': [1]}},
+        {'op': 'add', 'path': '/a/b/-', 'value': 3},
+        {'op': 'remove', 'path': '/a/b/0'},
+    ]
+    store.content['a']['b'].append(4)
+    assert t.operations[0]['value'] == {'b': [1]}
+    replay(t.operations, replica)
+    assert replica == open_store(filename).content == {'a': {'b': [3]}}
+
+    assert store.set('c', 4)
+    assert store.commit()
+    with store.transaction() as t:
+        assert store.apply_patch([{'op': 'move', 'from': '/c', 'path': '/d'}])
+    assert t.operations == [{'op': 'move', 'from': '/c', 'path': '/d'}]
+
+
+def test_operations_rolled_back(tmp_path, tracked):
+    store = open_store(os.path.join(tmp_path, 'test.json'), tracked=tracked)
+    assert store.set('a', 1)
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            assert store.set('b', 2)
+            raise RuntimeError()
+    with store.transaction() as t:
+        assert store.set('c', 3)
+        with pytest.raises(RuntimeError):
+            with t.savepoint():
+                assert store.set('d', 4)
+                raise RuntimeError()
+        with t.savepoint() as s:
+            assert store.set('e', 5)
+        assert s.operations == [{'op': 'add', 'path': '/e', 'value': 5}]
+    assert [operation['path'] for operation in t.operations] == ['/a', '/c', '/e']
+    assert store.content == {'a': 1, 'c': 3, 'e': 5}
+
+
+def test_path_api_journals_deltas(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=True, journal=True)
+    store.content['a'] = {'b': [1, 2], 'c': 'x' * 1000}
+    assert store.commit()
+    with store.transaction():
+        assert store.set('a/b/1', 3)
+    # lists are recorded as a whole, the long string is not written again
+    assert read_journal(filename)[-1] == [{'op': 'add', 'path': '/a/b', 'value': [1, 3]}]
+    assert open_store(filename, journal=True).content == {'a': {'b': [1, 3], 'c': 'x' * 1000}}
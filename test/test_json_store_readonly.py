@@ -0,0 +1,154 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from mrjsonstore import JsonStore, ReadOnlyJsonStore
+
+import pytest
+
+
+@pytest.fixture(params=[True, False])
+def journal(request):
+    return request.param
+
+
+def write_store(filename, content, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    store = store.unwrap()
+    store.content.clear()
+    store.content.update(content)
+    assert store.commit()
+    return store
+
+
+def open_readonly(filename, **kwargs):
+    store = JsonStore.open_readonly(filename, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def test_get_path(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    write_store(filename, {'foo': {'bar': [1, {'baz': 'qux'}]}, 'a/b': 1})
+    store = open_readonly(filename)
+    assert store.get('foo/bar/1/baz').unwrap() == 'qux'
+    assert store.get('/foo/bar/0').unwrap() == 1
+    assert store.get(['foo', 'bar', 1]).unwrap() == {'baz': 'qux'}
+    assert store.get('/a~1b').unwrap() == 1
+    assert store.get('').unwrap() == {'foo': {'bar': [1, {'baz': 'qux'}]}, 'a/b': 1}
+    assert not store.get('foo/baz')
+    assert not store.get('foo/bar/2')
+    assert not store.get('missing')
+
+
+def test_content(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    write_store(filename, {'foo': 'bar', 'baz': [1, 2]})
+    store = open_readonly(filename)
+    assert store.content == {'foo': 'bar', 'baz': [1, 2]}
+    assert len(store.content) == 2
+    assert 'foo' in store.content
+    assert 'qux' not in store.content
+    with pytest.raises(KeyError):
+        store.content['qux']
+
+
+def test_decodes_lazily(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    write_store(filename, {f'key-{i}': {'value': i} for i in range(10)})
+    store = open_readonly(filename, cache_size=3)
+    assert list(store._cache) == []
+    for i in range(5):
+        assert store.content[f'key-{i}'] == {'value': i}
+    assert list(store._cache) == ['key-2', 'key-3', 'key-4']
+    assert store.content['key-2'] == {'value': 2}
+    assert list(store._cache) == ['key-3', 'key-4', 'key-2']
+
+
+def test_revalidate_after_commit(tmp_path, journal):
+    filename = os.path.join(tmp_path, 'test.json')
+    writer = write_store(filename, {'foo': 'bar'}, journal=journal)
+    store = open_readonly(filename, journal=journal)
+    assert store.get('foo').unwrap() == 'bar'
+    assert not store.revalidate().unwrap()
+    assert store.reloads == 0
+
+    writer.content['foo'] = 'baz'
+    writer.content['qux'] = {'quux': 1}
+    assert writer.commit()
+    assert store.get('foo').unwrap() == 'baz'
+    assert store.get('qux/quux').unwrap() == 1
+    assert store.reloads == 1
+    assert store.content == {'foo': 'baz', 'qux': {'quux': 1}}
+    assert store.reloads == 1
+
+    assert writer.compact()
+    assert store.content == {'foo': 'baz', 'qux': {'quux': 1}}
+    assert store.reloads == (2 if journal else 1)
+
+
+def test_journal_overlay(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    writer = write_store(filename, {'foo': {'bar': 1}, 'baz': 2, 'qux': 3}, journal=True)
+    assert writer.compact()
+    writer.content['foo']['bar'] = 4
+    del writer.content['baz']
+    writer.content['new'] = [5]
+    assert writer.commit()
+    assert os.path.getsize(filename + '.journal') > 0
+
+    store = open_readonly(filename, journal=True)
+    assert store.content == {'foo': {'bar': 4}, 'qux': 3, 'new': [5]}
+    assert not store.get('baz')
+    assert 'baz' not in store.content
+    assert store.get('foo/bar').unwrap() == 4
+    assert set(store.content) == {'foo', 'qux', 'new'}
+
+
+def test_journal_torn_tail_left_alone(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    writer = write_store(filename, {'foo': 'bar'}, journal=True)
+    with open(filename + '.journal', 'a') as f:
+        f.write('[{"op": "add", "pa')
+    size = os.path.getsize(filename + '.journal')
+    store = open_readonly(filename, journal=True)
+    assert store.content == {'foo': 'bar'}
+    assert os.path.getsize(filename + '.journal') == size
+
+
+def test_non_standard_literals(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    with open(filename, 'w') as f:
+        f.write('{"foo": NaN, "bar": [Infinity], "baz": "\\u00e4\u00f6"}')
+    store = open_readonly(filename)
+    assert store.get('bar/0').unwrap() == float('inf')
+    assert store.get('baz').unwrap() == 'äö'
+    assert store.get('foo').unwrap() != store.get('foo').unwrap()
+
+
+def test_missing_file_is_empty(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_readonly(filename)
+    assert store.content == {}
+    assert not store.get('foo')
+    write_store(filename, {'foo': 'bar'})
+    assert store.get('foo').unwrap() == 'bar'
+    os.remove(filename)
+    assert store.content == {}
+
+
+def test_invalid_file(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    for text in ['', '[1, 2]', '{"foo": 1']:
+        with open(filename, 'w') as f:
+            f.write(text)
+        assert not JsonStore.open_readonly(filename)
+
+
+def test_yaml_not_supported(tmp_path):
+    assert not ReadOnlyJsonStore(os.path.join(tmp_path, 'test.yaml'))
+
+
+def test_compressed_not_supported(tmp_path):
+    assert not ReadOnlyJsonStore(os.path.join(tmp_path, 'test.json.gz'))
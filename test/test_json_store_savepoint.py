@@ -0,0 +1,171 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from drresult import Panic
+from mrjsonstore import JsonStore, Transaction, Savepoint
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def read_store(filename):
+    return open_store(filename).content
+
+
+def test_savepoint_rollback(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    with store.transaction() as t:
+        store.content['foo'] = {'bar': [1, 2]}
+        with pytest.raises(RuntimeError):
+            with t.savepoint() as s:
+                store.content['foo']['bar'].append(3)
+                store.content['foo']['baz'] = 'qux'
+                store.content['other'] = 1
+                raise RuntimeError()
+        assert s.result.unwrap() == Transaction.State.Rolledback
+        assert store.content == {'foo': {'bar': [1, 2]}}
+        assert not os.path.exists(filename)
+        store.content['foo']['bar'].append(4)
+    assert t.result.unwrap() == Transaction.State.Committed
+    assert read_store(filename) == {'foo': {'bar': [1, 2, 4]}}
+
+
+def test_savepoint_commit_kept_until_outer_commit(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    with store.transaction() as t:
+        with t.savepoint() as s:
+            store.content['foo'] = 'bar'
+        assert s.result.unwrap() == Transaction.State.Committed
+        assert not os.path.exists(filename)
+    assert read_store(filename) == {'foo': 'bar'}
+
+
+def test_outer_rollback_undoes_committed_savepoint(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    with pytest.raises(RuntimeError):
+        with store.transaction() as t:
+            with t.savepoint():
+                store.content['foo'] = 'baz'
+            store.content['qux'] = 1
+            raise RuntimeError()
+    assert t.result.unwrap() == Transaction.State.Rolledback
+    assert store.content == {'foo': 'bar'}
+    assert read_store(filename) == {'foo': 'bar'}
+
+
+def test_nested_transaction_is_savepoint(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    with store.transaction():
+        store.content['foo'] = 1
+        with pytest.raises(RuntimeError):
+            with store.transaction() as inner:
+                assert isinstance(inner, Savepoint)
+                store.content['foo'] = 2
+                with store.transaction():
+                    store.content['bar'] = 3
+                raise RuntimeError()
+        assert store.content == {'foo': 1}
+        with store.transaction(rollback=False):
+            with pytest.raises(RuntimeError):
+                with store.transaction():
+                    store.content['bar'] = 4
+                    raise RuntimeError()
+            store.content['baz'] = 5
+        assert store.content == {'foo': 1, 'baz': 5}
+    assert read_store(filename) == {'foo': 1, 'baz': 5}
+
+
+def test_rollback_of_earlier_savepoint_closes_later_ones(tmp_path, tracked):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, tracked=tracked)
+    t = store.transaction()
+    store.content['a'] = 1
+    first = t.savepoint()
+    store.content['b'] = 2
+    second = first.savepoint()
+    store.content['c'] = 3
+    first.rollback()
+    assert not first.active
+    assert not second.active
+    assert store.content == {'a': 1}
+    with pytest.raises(Panic):
+        second.rollback()
+    with pytest.raises(Panic):
+        second.commit()
+
+    third = t.savepoint()
+    store.content['d'] = 4
+    assert t.commit()
+    assert not third.active
+    assert read_store(filename) == {'a': 1, 'd': 4}
+
+
+def test_savepoint_without_rollback(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename)
+    with store.transaction() as t:
+        s = t.savepoint(rollback=False)
+        store.content['foo'] = 'bar'
+        with pytest.raises(Panic):
+            s.rollback()
+        assert s.commit()
+
+
+def test_savepoint_changed_paths(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, tracked=True)
+    with store.transaction() as t:
+        store.content['foo'] = {'bar': 1}
+        with t.savepoint() as s:
+            store.content['foo']['bar'] = 2
+            store.content['baz'] = 3
+        assert s.changed_paths() == [('foo', 'bar'), ('baz',)]
+    assert t.changed_paths() == [('foo',), ('baz',)]
+
+
+def test_savepoint_in_journaled_store(tmp_path, tracked):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, journal=True, tracked=tracked)
+    with store.transaction() as t:
+        store.content['foo'] = 1
+        with pytest.raises(RuntimeError):
+            with t.savepoint():
+                store.content['bar'] = 2
+                raise RuntimeError()
+    assert open_store(filename, journal=True).content == {'foo': 1}
+
+
+def test_savepoint_in_lazy_store(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    store = open_store(filename, lazy=True)
+    with store.transaction() as t:
+        with pytest.raises(RuntimeError):
+            with t.savepoint():
+                store.content['foo'] = 'baz'
+                raise RuntimeError()
+        assert store.content == {'foo': 'bar'}
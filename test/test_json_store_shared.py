@@ -0,0 +1,174 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+import threading
+from drresult import Panic
+from mrjsonstore import JsonStore
+from mrjsonstore.registry import StoreRegistry, registry
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.msgpack'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def journal(request):
+    return request.param
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+def open_shared(filename, **kwargs):
+    store = JsonStore.open(filename, shared=True, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def test_not_shared_by_default(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = JsonStore.open(filename)
+    assert store
+    assert store.unwrap() is not JsonStore.open(filename).unwrap()
+    assert len(registry) == 0
+
+
+def test_same_instance(tmp_path, filename, journal):
+    filename = os.path.join(tmp_path, filename)
+    store = open_shared(filename, journal=journal)
+    with store.transaction():
+        store.content['foo'] = 'bar'
+    assert open_shared(filename, journal=journal) is store
+    assert (
+        open_shared(os.path.join(tmp_path, '.', os.path.basename(filename)), journal=journal)
+        is store
+    )
+    assert store.content == {'foo': 'bar'}
+    # other options make another store
+    assert open_shared(filename, journal=journal, tracked=True) is not store
+
+
+def test_reloaded_after_external_change(tmp_path, filename, journal):
+    filename = os.path.join(tmp_path, filename)
+    store = open_shared(filename, journal=journal)
+    with store.transaction():
+        store.content['foo'] = 'bar'
+    other = JsonStore(filename, journal=journal).unwrap()
+    with other.transaction():
+        other.content['foo'] = 'baz'
+    assert open_shared(filename, journal=journal) is store
+    assert store.content == {'foo': 'baz'}
+
+
+def test_reload_refreshes_read_view(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_shared(filename)
+    with store.transaction():
+        store.content['x'] = 1
+    assert store.read_view() == {'x': 1}
+    other = JsonStore(filename).unwrap()
+    with other.transaction():
+        other.content['x'] = 2
+    assert open_shared(filename).read_view() == {'x': 2}
+
+
+def test_not_reloaded_during_transaction(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_shared(filename)
+    other = JsonStore(filename).unwrap()
+    with store.transaction():
+        store.content['foo'] = 'bar'
+        with other.transaction():
+            other.content['foo'] = 'baz'
+        assert open_shared(filename) is store
+        assert store.content == {'foo': 'bar'}
+    assert open_shared(filename).content == {'foo': 'bar'}
+
+
+def test_write_behind(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_shared(filename, write_behind=True)
+    for i in range(10):
+        with store.transaction():
+            store.content['foo'] = i
+        assert open_shared(filename, write_behind=True).content == {'foo': i}
+    assert store.close()
+
+
+def test_lru(tmp_path):
+    lru = StoreRegistry(max_stores=2)
+    stores = [
+        lru.open(i, lambda i=i: JsonStore(os.path.join(tmp_path, f'{i}.json'))).unwrap()
+        for i in range(3)
+    ]
+    assert len(lru) == 2
+    assert lru.open(1, lambda: JsonStore(os.path.join(tmp_path, 'x.json'))).unwrap() is stores[1]
+    assert (
+        lru.open(0, lambda: JsonStore(os.path.join(tmp_path, '0.json'))).unwrap() is not stores[0]
+    )
+    # 2 was least recently used
+    assert lru.open(1, lambda: JsonStore(os.path.join(tmp_path, 'x.json'))).unwrap() is stores[1]
+    assert (
+        lru.open(2, lambda: JsonStore(os.path.join(tmp_path, '2.json'))).unwrap() is not stores[2]
+    )
+
+
+def test_max_bytes(tmp_path):
+    lru = StoreRegistry(max_bytes=2000)
+    for i in range(3):
+        store = JsonStore(os.path.join(tmp_path, f'{i}.json')).unwrap()
+        store.content['data'] = 'x' * 800
+        assert store.commit()
+    for i in range(3):
+        lru.open(i, lambda i=i: JsonStore(os.path.join(tmp_path, f'{i}.json')))
+    assert len(lru) == 2
+    lru.max_bytes = 10
+    lru.open(3, lambda: JsonStore(os.path.join(tmp_path, '3.json')))
+    assert len(lru) == 1
+
+
+def test_failed_open_not_registered(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    with open(filename, 'w') as f:
+        f.write('{')
+    assert not JsonStore.open(filename, shared=True)
+    assert len(registry) == 0
+
+
+def test_threads_share_one_store(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    stores = []
+
+    def run():
+        stores.append(open_shared(filename, threadsafe=True))
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(store is stores[0] for store in stores)
+
+
+def test_evicted_store_closed(tmp_path):
+    lru = StoreRegistry(max_stores=1)
+    filename = os.path.join(tmp_path, 'test.json')
+    store = lru.open(0, lambda: JsonStore(filename, write_behind=True)).unwrap()
+    with store.transaction():
+        store.content['foo'] = 'bar'
+    lru.open(1, lambda: JsonStore(os.path.join(tmp_path, 'other.json')))
+    assert len(lru) == 1
+    assert not store._write_behind._thread.is_alive()
+    with open(filename) as f:
+        assert json.load(f) == {'foo': 'bar'}
+    with pytest.raises(Panic):
+        store.commit()
@@ -0,0 +1,204 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+from mrjsonstore import JsonStore, Transaction, Codec
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml', 'test.msgpack', 'test.cbor'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def journal(request):
+    return request.param
+
+
+class CountingCodec:
+    def __init__(self):
+        self.writes = 0
+        self.codec = Codec('counting', self.serialise, json.loads)
+
+    def serialise(self, content):
+        self.writes += 1
+        return json.dumps(content)
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def reset_mtimes(directory):
+    for name in os.listdir(directory):
+        os.utime(os.path.join(directory, name), ns=(0, 0))
+
+
+def changed_files(directory):
+    return sorted(
+        name
+        for name in os.listdir(directory)
+        if os.stat(os.path.join(directory, name)).st_mtime_ns != 0
+    )
+
+
+def test_unchanged_commit_skipped(tmp_path, filename, tracked, journal):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked, journal=journal)
+    store.content['foo'] = {'bar': 'baz'}
+    assert store.commit()
+    assert store.skipped_commits == 0
+    reset_mtimes(tmp_path)
+
+    for i in range(3):
+        assert store.commit().unwrap() == Transaction.State.Committed
+        with store.transaction() as t:
+            pass
+        assert t.result.unwrap() == Transaction.State.Committed
+    assert store.skipped_commits == 6
+    assert changed_files(tmp_path) == []
+
+    store.content['foo']['bar'] = 'qux'
+    assert store.commit()
+    assert store.skipped_commits == 6
+    assert changed_files(tmp_path) != []
+    assert open_store(filename, journal=journal).content == {'foo': {'bar': 'qux'}}
+
+
+def test_tracked_unchanged_commit_does_not_serialise(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    counting = CountingCodec()
+    store = open_store(filename, tracked=True, codec=counting.codec)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert store.commit()
+    assert store.content['foo'] == 'bar'
+    assert store.commit()
+    assert counting.writes == 1
+    assert store.skipped_commits == 2
+
+
+def test_untracked_change_and_revert_skipped(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    reset_mtimes(tmp_path)
+
+    store.content['foo'] = 'baz'
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert store.skipped_commits == 1
+    assert os.listdir(tmp_path) == ['test.json']
+    assert changed_files(tmp_path) == []
+
+
+def test_first_commit_after_load_skipped(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename + '.gz')
+    store = open_store(filename)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+
+    store = open_store(filename)
+    reset_mtimes(tmp_path)
+    assert store.commit()
+    assert store.skipped_commits == 1
+    assert changed_files(tmp_path) == []
+    store.content['foo'] = 'baz'
+    assert store.commit()
+    assert store.skipped_commits == 1
+    assert open_store(filename).content == {'foo': 'baz'}
+
+
+def test_file_written_by_others_rewritten(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    with open(filename, 'w') as f:
+        f.write('{"foo":   "bar"}')
+    store = open_store(filename)
+    assert store.commit()
+    assert store.skipped_commits == 0
+    assert store.commit()
+    assert store.skipped_commits == 1
+
+
+@pytest.mark.parametrize('limit', [None, 0])
+def test_skipped_commit_does_not_open_file(tmp_path, monkeypatch, limit):
+    from mrjsonstore import json_store, streaming
+
+    monkeypatch.setattr(streaming, 'SPOOL_LIMIT', streaming.SPOOL_LIMIT if limit is None else 0)
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename)
+    store.content['foo'] = {'bar': list(range(100))}
+    assert store.commit()
+    assert open_store(filename).content == store.content
+
+    def fail(*args, **kwargs):
+        raise AssertionError('written')
+
+    monkeypatch.setattr(json_store, 'atomic_write', fail)
+    assert store.commit()
+    assert store.skipped_commits == 1
+
+
+def test_deleted_file_rewritten(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    os.remove(filename)
+    assert store.commit()
+    assert store.skipped_commits == 0
+    assert open_store(filename).content == {'foo': 'bar'}
+
+
+def test_reload_resets_fingerprint(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store_a = open_store(filename, locking=True)
+    store_b = open_store(filename, locking=True)
+    with store_b.transaction():
+        store_b.content['foo'] = 'a'
+
+    with store_a.transaction():
+        assert store_a.content == {'foo': 'a'}
+        store_a.content['foo'] = 'c'
+    with store_b.transaction():
+        assert store_b.content == {'foo': 'c'}
+        store_b.content['foo'] = 'a'
+    assert store_b.skipped_commits == 0
+    assert open_store(filename).content == {'foo': 'a'}
+
+
+def test_skipped_commit_does_not_bump_generation(tmp_path, tracked):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, locking=True, tracked=tracked)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    generation = store._lock.generation()
+    assert store.commit()
+    assert store._lock.generation() == generation
+    assert store.skipped_commits == 1
+
+
+def test_write_behind_unchanged_commit_skipped(tmp_path, tracked):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, tracked=tracked, write_behind=True)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert store.flush()
+    with store.transaction() as t:
+        pass
+    if tracked:
+        assert t.result.unwrap() == Transaction.State.Committed
+    assert t.wait().unwrap() == Transaction.State.Committed
+    assert store.close()
+    assert store.skipped_commits == 1
@@ -0,0 +1,184 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from mrjsonstore import JsonStore, Transaction, Savepoint
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, threadsafe=True, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def test_threadsafe_transactions_serialised(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    store.content['counter'] = 0
+
+    def increment(_):
+        with store.transaction() as t:
+            counter = store.content['counter']
+            time.sleep(0.0001)
+            store.content['counter'] = counter + 1
+        return t.result
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(increment, range(50)))
+    assert all(results)
+    assert store.content['counter'] == 50
+
+    store_ = JsonStore(filename)
+    assert store_
+    assert store_.unwrap().content['counter'] == 50
+
+
+def test_threadsafe_transaction_timeout(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename)
+    t = store.transaction()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(store.try_transaction(timeout=0.05)))
+    thread.start()
+    thread.join()
+    assert not result[0]
+    assert isinstance(result[0].unwrap_err(), TimeoutError)
+
+    assert t.commit()
+    thread = threading.Thread(target=lambda: result.append(store.try_transaction(timeout=0.05)))
+    thread.start()
+    thread.join()
+    assert result[1]
+    assert result[1].unwrap().rollback() is None
+
+
+def test_threadsafe_transaction_waits_for_rollback(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename)
+    t = store.transaction()
+    store.content['foo'] = 'bar'
+    started = threading.Event()
+    result = []
+
+    def other():
+        started.set()
+        with store.transaction() as t_:
+            result.append(dict(store.content))
+        result.append(t_.result)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    started.wait()
+    time.sleep(0.01)
+    assert not result
+    store.rollback()
+    thread.join()
+    assert result[0] == {}
+    assert result[1].unwrap() == Transaction.State.Committed
+
+
+def test_threadsafe_store_commit_from_other_thread(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename)
+    t = store.transaction()
+    store.content['foo'] = 'bar'
+    result = []
+    thread = threading.Thread(target=lambda: result.append(store.commit()))
+    thread.start()
+    time.sleep(0.01)
+    assert not result
+    assert t.active
+    assert t.commit()
+    thread.join()
+    assert result[0]
+
+
+def test_threadsafe_nested_transaction_is_savepoint(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename)
+    t = store.transaction()
+    assert isinstance(store.transaction(), Savepoint)
+    assert t.commit()
+
+
+def test_threadsafe_read_view(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    with store.transaction():
+        store.content['foo'] = 'bar'
+    view = store.read_view()
+    assert view == {'foo': 'bar'}
+    assert store.read_view() is view
+
+    t = store.transaction()
+    store.content['foo'] = 'baz'
+    result = []
+    thread = threading.Thread(target=lambda: result.append(store.read_view()))
+    thread.start()
+    thread.join()
+    assert result[0] == {'foo': 'bar'}
+    assert t.commit()
+
+    view = store.read_view()
+    assert view == {'foo': 'baz'}
+
+
+def test_threadsafe_read_view_does_not_wait(tmp_path, filename, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, tracked=tracked)
+    assert store.read_view() == {}
+    with store.transaction():
+        store.content['foo'] = 'bar'
+
+    # the commit published the view, so readers do not wait for the next transaction
+    t = store.transaction()
+    store.content['foo'] = 'baz'
+    result = []
+    thread = threading.Thread(target=lambda: result.append(store.read_view()))
+    thread.start()
+    thread.join(timeout=5)
+    waited = thread.is_alive()
+    assert t.commit()
+    thread.join()
+    assert not waited
+    assert result[0] == {'foo': 'bar'}
+    assert store.read_view() == {'foo': 'baz'}
+
+
+def test_threadsafe_read_view_consistent_under_writes(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = open_store(filename, dry_run=True)
+    store.content['a'] = 0
+    store.content['b'] = 0
+    stop = threading.Event()
+
+    def write():
+        while not stop.is_set():
+            with store.transaction():
+                store.content['a'] += 1
+                store.content['b'] += 1
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(200):
+            view = store.read_view()
+            assert view['a'] == view['b']
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,299 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+import random
+from collections.abc import MutableMapping, MutableSequence
+from drresult import Panic
+from mrjsonstore import JsonStore, Transaction
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml', 'test.msgpack', 'test.cbor'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def dry_run(request):
+    return request.param
+
+
+def test_tracked_records_changed_paths(tmp_path, filename, dry_run):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=dry_run, tracked=True)
+    assert store
+    store = store.unwrap()
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+        store.content['nested'] = {'baz': 123, 'list': [1, 2]}
+    assert t.result
+    assert t.changed_paths() == [('foo',), ('nested',)]
+
+    with store.transaction() as t:
+        store.content['nested']['baz'] = 321
+        store.content['nested']['list'].append(3)
+        assert store.content['foo'] == 'bar'
+    assert t.result
+    assert t.changed_paths() == [('nested', 'baz'), ('nested', 'list')]
+
+    with store.transaction() as t:
+        store.content['nested']['baz'] = 1
+        store.content['nested'] = {}
+        del store.content['foo']
+    assert t.result
+    assert t.changed_paths() == [('nested',), ('foo',)]
+
+
+def test_tracked_no_changes(tmp_path, filename, dry_run):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=dry_run, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = {'bar': [1, 2, 3]}
+    with store.transaction() as t:
+        assert store.content['foo']['bar'][1] == 2
+        assert len(store.content['foo']['bar']) == 3
+        assert 'foo' in store.content
+        assert list(store.content) == ['foo']
+    assert t.result
+    assert t.changed_paths() == []
+
+
+def test_tracked_nested_list_paths(tmp_path, filename, dry_run):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=dry_run, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content['items'] = [{'name': 'a'}, {'name': 'b'}]
+    with store.transaction() as t:
+        store.content['items'][-1]['name'] = 'c'
+    # indices go stale when the list shifts, so the list is recorded as a whole
+    assert t.changed_paths() == [('items',)]
+    assert store.content['items'] == [{'name': 'a'}, {'name': 'c'}]
+
+    with store.transaction() as t:
+        store.content['items'].pop(0)
+    assert t.changed_paths() == [('items',)]
+    assert store.content['items'] == [{'name': 'c'}]
+
+
+def test_tracked_rollback(tmp_path, filename, dry_run):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=dry_run, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    try:
+        with store.transaction() as t:
+            store.content['foo'] = 'baz'
+            store.content['nested'] = {'baz': 123}
+            raise RuntimeError()
+    except RuntimeError:
+        pass
+    assert t.result.unwrap() == Transaction.State.Rolledback
+    assert t.changed_paths() == [('foo',), ('nested',)]
+    assert store.content == {'foo': 'bar'}
+
+
+def test_tracked_assigning_proxy_copies(tmp_path, filename, dry_run):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=dry_run, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content['a'] = {'x': 1}
+    store.content['b'] = store.content['a']
+    with store.transaction() as t:
+        store.content['a']['x'] = 2
+    assert t.changed_paths() == [('a', 'x')]
+    assert store.content['b']['x'] == 1
+
+
+def test_tracked_persists_like_untracked(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, tracked=True)
+    assert store
+    store = store.unwrap()
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+        store.content['nested'] = {'baz': [1, {'qux': 2}]}
+        store.content['nested']['baz'][1]['qux'] = 3
+    assert t.result
+
+    store_ = JsonStore(filename)
+    assert store_
+    assert store_.unwrap().content == {'foo': 'bar', 'nested': {'baz': [1, {'qux': 3}]}}
+
+
+def test_tracked_journal_records_nested_paths(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content['nested'] = {'baz': 123, 'list': [[1], [2]], 'gone': True}
+    assert store.commit()
+    store.content['nested']['baz'] = 321
+    store.content['nested']['list'][1].append(3)
+    del store.content['nested']['gone']
+    assert store.commit()
+
+    with open(filename + '.journal') as f:
+        journal = [json.loads(line) for line in f]
+    assert journal[1] == [
+        {'op': 'add', 'path': '/nested/baz', 'value': 321},
+        {'op': 'add', 'path': '/nested/list', 'value': [[1], [2, 3]]},
+        {'op': 'remove', 'path': '/nested/gone'},
+    ]
+
+    store_ = JsonStore(filename, journal=True, tracked=True)
+    assert store_
+    assert store_.unwrap().content == {'nested': {'baz': 321, 'list': [[1], [2, 3]]}}
+
+
+def test_tracked_proxy_survives_list_shift(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, journal=True, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content['l'] = [{'x': 0}, {'x': 1}, {'x': 2}]
+    item = store.content['l'][2]
+    assert store.commit()
+    store.content['l'].insert(0, {'x': -1})
+    assert store.commit()
+    item['x'] = 5
+    assert store.commit()
+    assert store.content['l'] == [{'x': -1}, {'x': 0}, {'x': 1}, {'x': 5}]
+
+    store_ = JsonStore(filename, journal=True, tracked=True)
+    assert store_
+    assert store_.unwrap().content == store.content
+
+
+def test_untracked_changed_paths_panics(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename)
+    assert store
+    store = store.unwrap()
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+    with pytest.raises(Panic):
+        t.changed_paths()
+
+
+def test_tracked_rollback_restores_nested_changes(tmp_path, filename, dry_run):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=dry_run, tracked=True)
+    assert store
+    store = store.unwrap()
+    original = {
+        'foo': 'bar',
+        'nested': {'baz': 123, 'list': [1, [2, 3], {'qux': 4}]},
+        'gone': None,
+    }
+    store.content.update(json.loads(json.dumps(original)))
+    assert store.commit()
+
+    t = store.transaction()
+    store.content['nested']['baz'] = 321
+    store.content['nested']['list'][1].append(4)
+    store.content['nested']['list'][2]['qux'] = 5
+    store.content['nested']['list'].insert(0, 0)
+    store.content['nested']['list'][3]['qux'] = 6
+    del store.content['gone']
+    store.content['new'] = {'a': 1}
+    store.content['new']['b'] = 2
+    store.content['foo'] = {}
+    store.content['foo']['bar'] = 1
+    store.content['foo'] = 5
+    t.rollback()
+    assert t.result.unwrap() == Transaction.State.Rolledback
+    assert store.content == original
+
+
+def test_tracked_rollback_replaced_then_modified(tmp_path, filename, dry_run):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=dry_run, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content['a'] = {'b': {'c': 1}}
+    stale = store.content['a']['b']
+
+    t = store.transaction()
+    store.content['a']['b']['c'] = 2
+    store.content['a'] = {'b': {'c': 3}}
+    store.content['a']['b']['c'] = 4
+    stale['c'] = 5
+    store.rollback()
+    assert t.result.unwrap() == Transaction.State.Rolledback
+    assert store.content == {'a': {'b': {'c': 1}}}
+
+
+def test_tracked_rollback_only_since_transaction(tmp_path, filename, dry_run):
+    filename = os.path.join(tmp_path, filename)
+    store = JsonStore(filename, dry_run=dry_run, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    with store.transaction() as t:
+        store.content['foo'] = 'baz'
+    assert t.result
+    store.content['foo'] = 'qux'
+
+    t = store.transaction()
+    store.content['foo'] = 'quux'
+    t.rollback()
+    assert store.content['foo'] == 'qux'
+
+
+def random_mutation(rng, node):
+    while True:
+        if isinstance(node, MutableMapping) and node:
+            key = rng.choice(list(node))
+            if rng.random() < 0.5 and isinstance(node[key], (MutableMapping, MutableSequence)):
+                node = node[key]
+                continue
+            match rng.randrange(3):
+                case 0:
+                    node[key] = rng.choice([1, 'x', {'y': [1]}, [2, {'z': 3}]])
+                case 1:
+                    del node[key]
+                case 2:
+                    node[f'k{rng.randrange(5)}'] = {'w': rng.randrange(10)}
+        elif isinstance(node, MutableSequence) and node:
+            index = rng.randrange(len(node))
+            if rng.random() < 0.5 and isinstance(node[index], (MutableMapping, MutableSequence)):
+                node = node[index]
+                continue
+            match rng.randrange(3):
+                case 0:
+                    node[index] = rng.choice([1, {'y': 2}, [3]])
+                case 1:
+                    node.pop(index)
+                case 2:
+                    node.insert(index, {'v': [index]})
+        elif isinstance(node, MutableMapping):
+            node['k'] = [1, {'a': 2}]
+        else:
+            node.append({'a': [1]})
+        return
+
+
+def test_tracked_rollback_random_mutations(tmp_path):
+    rng = random.Random(1234)
+    filename = os.path.join(tmp_path, 'test.json')
+    store = JsonStore(filename, dry_run=True, tracked=True)
+    assert store
+    store = store.unwrap()
+    store.content.update({'a': {'b': [1, {'c': 2}], 'd': {'e': {'f': 3}}}, 'g': [[1, 2], [3]]})
+    for _ in range(200):
+        original = json.loads(json.dumps(store.content.copy()))
+        t = store.transaction()
+        for _ in range(rng.randrange(1, 20)):
+            random_mutation(rng, store.content)
+        if rng.random() < 0.5:
+            t.rollback()
+            assert store.content == original
+        else:
+            assert t.commit()
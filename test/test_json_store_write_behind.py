@@ -0,0 +1,196 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+import sys
+import threading
+import subprocess
+from drresult import Panic
+from mrjsonstore import JsonStore, Transaction, Codec
+
+import pytest
+
+
+@pytest.fixture(params=['test.json', 'test.yaml', 'test.yml'])
+def filename(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def journal(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def tracked(request):
+    return request.param
+
+
+class BlockingCodec:
+    def __init__(self):
+        self.writes = []
+        self.writing = threading.Event()
+        self.proceed = threading.Event()
+        self.codec = Codec('blocking', self.serialise, json.loads)
+
+    def serialise(self, content):
+        self.writing.set()
+        self.proceed.wait()
+        self.writes.append(json.loads(json.dumps(content)))
+        return json.dumps(content)
+
+
+def open_store(filename, **kwargs):
+    store = JsonStore(filename, write_behind=True, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def read_store(filename, **kwargs):
+    store = JsonStore(filename, **kwargs)
+    assert store
+    return store.unwrap().content
+
+
+def test_write_behind_invalid_combinations(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    assert not JsonStore(filename, write_behind=True, locking=True)
+    assert not JsonStore(filename, write_behind=True, threadsafe=True, group_commit_window=0.01)
+
+
+def test_write_behind_commit_returns_pending(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    codec = BlockingCodec()
+    store = open_store(filename, codec=codec.codec)
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+    assert t.result.unwrap() == Transaction.State.Pending
+    codec.writing.wait()
+    assert t.wait(timeout=0.01).unwrap() == Transaction.State.Pending
+    assert not os.path.exists(filename)
+
+    codec.proceed.set()
+    assert t.wait().unwrap() == Transaction.State.Committed
+    assert t.result.unwrap() == Transaction.State.Committed
+    assert read_store(filename) == {'foo': 'bar'}
+    assert store.close()
+
+
+def test_write_behind_drops_superseded_snapshots(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    codec = BlockingCodec()
+    store = open_store(filename, codec=codec.codec)
+    transactions = []
+    for i in range(5):
+        with store.transaction() as t:
+            store.content[f'key{i}'] = i
+        transactions.append(t)
+        codec.writing.wait()
+    codec.proceed.set()
+    assert store.flush()
+    assert codec.writes == [{'key0': 0}, {f'key{i}': i for i in range(5)}]
+    assert all(t.wait().unwrap() == Transaction.State.Committed for t in transactions)
+    assert read_store(filename) == {f'key{i}': i for i in range(5)}
+    assert store.close()
+
+
+def test_write_behind_snapshot_isolated_from_later_changes(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    codec = BlockingCodec()
+    store = open_store(filename, codec=codec.codec)
+    store.content['nested'] = {'a': 1}
+    assert store.commit().unwrap() == Transaction.State.Pending
+    codec.writing.wait()
+    store.content['nested']['a'] = 2
+    codec.proceed.set()
+    assert store.flush()
+    assert read_store(filename) == {'nested': {'a': 1}}
+    assert store.close()
+
+
+def test_write_behind_journal(tmp_path, filename, journal, tracked):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, journal=journal, tracked=tracked, compact_after=3)
+    for i in range(10):
+        with store.transaction():
+            store.content[f'key{i}'] = {'value': i}
+            if i % 2:
+                del store.content[f'key{i - 1}']
+            else:
+                store.content[f'key{i}']['list'] = [i]
+    assert store.flush()
+    assert store.close()
+
+    expected = {f'key{i}': {'value': i} for i in range(1, 10, 2)}
+    assert store.content == expected
+    assert read_store(filename, journal=journal) == expected
+
+
+def test_write_behind_error_surfaces_through_handle(tmp_path, filename):
+    filename = os.path.join(tmp_path, 'invalid', 'non', 'existing', 'path', filename)
+    store = open_store(filename)
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+    assert t.result
+    result = t.wait()
+    assert not result
+    assert isinstance(result.unwrap_err(), FileNotFoundError)
+    result = store.flush()
+    assert not result
+    assert isinstance(result.unwrap_err(), FileNotFoundError)
+
+
+def test_write_behind_retries_after_error(tmp_path, tracked):
+    directory = os.path.join(tmp_path, 'directory')
+    filename = os.path.join(directory, 'test.json')
+    store = open_store(filename, journal=True, tracked=tracked)
+    store.content['foo'] = 'bar'
+    assert not store.commit().unwrap() == Transaction.State.Committed
+    assert not store.flush()
+
+    os.mkdir(directory)
+    store.content['baz'] = 'qux'
+    assert store.commit()
+    assert store.close()
+    assert read_store(filename, journal=True) == {'foo': 'bar', 'baz': 'qux'}
+
+
+def test_write_behind_close(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert store.close()
+    assert read_store(filename) == {'foo': 'bar'}
+    with pytest.raises(Panic):
+        store.commit()
+
+
+def test_write_behind_dry_run(tmp_path, filename):
+    filename = os.path.join(tmp_path, filename)
+    store = open_store(filename, dry_run=True)
+    store.content['foo'] = 'bar'
+    assert store.commit().unwrap() == Transaction.State.Committed
+    assert store.close()
+    assert not os.path.exists(filename)
+
+
+def test_write_behind_written_at_exit(tmp_path):
+    filename = os.path.join(tmp_path, 'test.json')
+    script = f'''
+import json, time
+from mrjsonstore import JsonStore, Codec
+
+def serialise(x):
+    time.sleep(0.2)
+    return json.dumps(x)
+
+store = JsonStore({filename!r}, write_behind=True, codec=Codec('slow', serialise, json.loads)).unwrap()
+for i in range(5):
+    store.content['foo'] = i
+    store.commit()
+'''
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=60)
+    with open(filename) as f:
+        assert json.load(f) == {'foo': 4}
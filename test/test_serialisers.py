@@ -0,0 +1,318 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import os
+import json
+import math
+import decimal
+import datetime
+import yaml
+from typing import List, Tuple
+from drresult import Panic
+from mrjsonstore import JsonStore, Codec, register_codec, serialisers
+from mrjsonstore.serialisers import (
+    json_codec,
+    json_codecs,
+    yaml_codec,
+    msgpack_codec,
+    cbor_codec,
+    yaml_loader,
+    yaml_dumper,
+    codecs_by_extension,
+    default_json_codec,
+)
+
+import pytest
+
+
+@pytest.fixture(params=list(json_codecs))
+def codec(request):
+    return json_codecs[request.param]
+
+
+@pytest.fixture(params=list(json_codecs))
+def other_codec(request):
+    return json_codecs[request.param]
+
+
+content = {
+    'foo': 'bar',
+    'unicode': 'äöü €',
+    'nested': {'list': [1, 2.5, -3, True, False, None, 'a/b'], 'empty': {}},
+    'big': 2**70,
+    'float': 1e-300,
+}
+
+
+def test_default_json_codec_is_preferred_available_backend():
+    assert default_json_codec() is next(iter(json_codecs.values()))
+    assert json_codecs['json'] is json_codec
+
+
+def test_codec_round_trip(codec):
+    assert codec.deserialise(codec.serialise(content)) == content
+
+
+def test_codecs_read_each_other(codec, other_codec):
+    assert other_codec.deserialise(codec.serialise(content)) == content
+
+
+def test_codec_reads_non_standard_literals(codec):
+    loaded = codec.deserialise(json.dumps({'nan': float('nan'), 'inf': float('inf')}))
+    assert math.isnan(loaded['nan'])
+    assert loaded['inf'] == float('inf')
+
+
+def test_codec_non_string_keys_like_stdlib(codec):
+    assert codec.deserialise(codec.serialise({1: 'a'})) == {'1': 'a'}
+
+
+@pytest.mark.parametrize(
+    'value', [datetime.datetime(2024, 1, 1), datetime.date(2024, 1, 1), decimal.Decimal('1')]
+)
+def test_codec_rejects_non_json_types_like_stdlib(codec, value):
+    if codec.name in ('ujson', 'msgspec'):
+        pytest.skip(f'{codec.name} writes them as something else')
+    with pytest.raises(TypeError):
+        json.dumps({'a': value})
+    with pytest.raises(TypeError):
+        codec.serialise({'a': value})
+    with pytest.raises(TypeError):
+        codec.serialise({'a': [{value: 1}]})
+
+
+def test_default_json_codec_is_strict():
+    assert default_json_codec().name in ('orjson', 'json')
+
+
+def test_store_with_codec(tmp_path, codec, other_codec):
+    filename = os.path.join(tmp_path, 'test.json')
+    store = JsonStore(filename, codec=codec)
+    assert store
+    store = store.unwrap()
+    assert store.codec is codec
+    store.content.update(content)
+    assert store.commit()
+
+    store_ = JsonStore(filename, codec=other_codec)
+    assert store_
+    assert store_.unwrap().content == content
+
+
+@pytest.mark.parametrize('text', ['', '{"a": 1', '[1, 2]x', '{"a": 1}'])
+def test_codec_load_like_deserialise(tmp_path, codec, text):
+    filename = os.path.join(tmp_path, 'test.json')
+    with open(filename, 'w') as f:
+        f.write(text)
+    with open(filename, encoding='utf-8') as f:
+        if text == '{"a": 1}':
+            assert (codec.load or (lambda f: codec.deserialise(f.read())))(f) == {'a': 1}
+        else:
+            with pytest.raises(ValueError):
+                (codec.load or (lambda f: codec.deserialise(f.read())))(f)
+
+
+def test_codec_dump_read_by_others(tmp_path, codec, other_codec):
+    filename = os.path.join(tmp_path, 'test.json')
+    with open(filename, 'w', encoding='utf-8') as f:
+        if codec.dump:
+            codec.dump(content, f)
+        else:
+            f.write(codec.serialise(content))
+    with open(filename, encoding='utf-8') as f:
+        assert other_codec.deserialise(f.read()) == content
+
+
+def test_codec_load_non_standard_literals(tmp_path, codec):
+    filename = os.path.join(tmp_path, 'test.json')
+    with open(filename, 'w') as f:
+        f.write(json.dumps({'nan': float('nan'), 'big': 2**70}))
+    store = JsonStore(filename, codec=codec)
+    assert store
+    loaded = store.unwrap().content
+    assert math.isnan(loaded['nan'])
+    assert loaded['big'] == 2**70
+
+
+def test_codec_writes_non_standard_literals(tmp_path, codec, other_codec):
+    filename = os.path.join(tmp_path, 'test.json')
+    values = {'nan': float('nan'), 'inf': float('inf'), 'list': [None, -float('inf')]}
+    assert math.isnan(codec.deserialise(codec.serialise(values))['nan'])
+    store = JsonStore(filename, codec=codec).unwrap()
+    store.content.update(values)
+    store.content['null'] = None
+    assert store.commit()
+    store = JsonStore(filename, codec=other_codec)
+    assert store
+    loaded = store.unwrap().content
+    assert math.isnan(loaded['nan'])
+    assert loaded['inf'] == float('inf')
+    assert loaded['list'] == [None, -float('inf')]
+    assert loaded['null'] is None
+
+
+def test_store_reads_stdlib_file(tmp_path, codec):
+    filename = os.path.join(tmp_path, 'test.json')
+    with open(filename, 'w') as f:
+        f.write(json.dumps(content))
+
+    store = JsonStore(filename, codec=codec)
+    assert store
+    assert store.unwrap().content == content
+
+
+def test_store_selects_codec_by_extension(tmp_path):
+    for filename, codec in [
+        ('test.json', default_json_codec()),
+        ('test', default_json_codec()),
+        ('test.yaml', yaml_codec),
+        ('test.yml', yaml_codec),
+        ('test.msgpack', msgpack_codec),
+        ('test.mpk', msgpack_codec),
+        ('test.cbor', cbor_codec),
+    ]:
+        store = JsonStore(os.path.join(tmp_path, filename))
+        assert store
+        assert store.unwrap().codec is codec
+
+
+def test_user_codec(tmp_path):
+    codec = Codec('pretty', lambda x: json.dumps(x, indent=2, sort_keys=True), json.loads)
+    filename = os.path.join(tmp_path, 'test.json')
+    store = JsonStore(filename, codec=codec)
+    assert store
+    store = store.unwrap()
+    store.content['b'] = 1
+    store.content['a'] = 2
+    assert store.commit()
+    with open(filename) as f:
+        assert f.read() == '{\n  "a": 2,\n  "b": 1\n}'
+
+
+def test_register_codec(tmp_path):
+    codec = Codec('pretty', lambda x: json.dumps(x, indent=2), json.loads)
+    register_codec('.pretty', codec)
+    try:
+        store = JsonStore(os.path.join(tmp_path, 'test.pretty'))
+        assert store
+        assert store.unwrap().codec is codec
+    finally:
+        del codecs_by_extension['.pretty']
+
+
+yaml_implementations: List[Tuple[type, type]] = [(yaml.SafeLoader, yaml.SafeDumper)]
+if yaml.__with_libyaml__:
+    yaml_implementations.append((yaml.CSafeLoader, yaml.CSafeDumper))
+
+
+@pytest.fixture(params=yaml_implementations, ids=lambda x: x[0].__name__)
+def yaml_implementation(request):
+    return request.param
+
+
+yaml_documents = [
+    content,
+    {'strings': ['yes', 'no', 'null', '1.0', '0x10', '', ' padded ', 'a: b', '- x', '#']},
+    {'multiline': 'first\nsecond\n', 'long': 'word ' * 40, 'tab': 'a\tb'},
+    {'floats': [0.1, 1e20, -0.0, float('inf')], 'ints': [0, -1, 2**40]},
+    {'deep': {'a': {'b': {'c': [{'d': [1, [2, [3]]]}]}}}},
+    {'empty': [], 'empty_dict': {}, 'none': None},
+]
+
+
+@pytest.mark.parametrize('document', yaml_documents)
+def test_yaml_implementations_identical(yaml_implementation, document):
+    loader, dumper = yaml_implementation
+    serialised = yaml.dump(document, Dumper=dumper)
+    assert serialised == yaml.safe_dump(document)
+    assert yaml.load(serialised, Loader=loader) == document
+    assert yaml_codec.serialise(document) == serialised
+    assert yaml_codec.deserialise(serialised) == document
+    f = io.StringIO()
+    yaml_codec.dump(document, f)
+    assert f.getvalue() == serialised
+    f.seek(0)
+    assert yaml_codec.load(f) == document
+
+
+def test_yaml_implementations_reject_broken_file(yaml_implementation):
+    loader, _ = yaml_implementation
+    with pytest.raises(yaml.YAMLError):
+        yaml.load('%aieatie\n', Loader=loader)
+
+
+def test_yaml_codec_uses_libyaml_when_available():
+    if yaml.__with_libyaml__:
+        assert yaml_loader is yaml.CSafeLoader
+        assert yaml_dumper is yaml.CSafeDumper
+    else:
+        assert yaml_loader is yaml.SafeLoader
+        assert yaml_dumper is yaml.SafeDumper
+
+
+binary_content = {
+    'foo': 'bar',
+    'unicode': 'äöü €',
+    'nested': {'list': [1, 2.5, -3, True, False, None, 'a/b'], 'empty': {}},
+    'float': 1e-300,
+}
+
+
+@pytest.fixture(params=[msgpack_codec, cbor_codec], ids=lambda x: x.name)
+def binary_codec(request):
+    return request.param
+
+
+def test_binary_codec_round_trip(binary_codec):
+    serialised = binary_codec.serialise(binary_content)
+    assert isinstance(serialised, bytes)
+    assert binary_codec.deserialise(serialised) == binary_content
+    assert math.isnan(binary_codec.deserialise(binary_codec.serialise(float('nan'))))
+
+
+def test_binary_codec_dump_like_serialise(binary_codec):
+    f = io.BytesIO()
+    binary_codec.dump(binary_content, f)
+    assert binary_codec.deserialise(f.getvalue()) == binary_content
+    assert len(f.getvalue()) == len(binary_codec.serialise(binary_content))
+
+
+def test_binary_store(tmp_path, binary_codec):
+    filename = os.path.join(tmp_path, 'test.bin')
+    store = JsonStore(filename, codec=binary_codec)
+    assert store
+    store = store.unwrap()
+    store.content.update(binary_content)
+    assert store.commit()
+    with open(filename, 'rb') as f:
+        assert binary_codec.deserialise(f.read()) == binary_content
+    assert os.path.getsize(filename) < len(json.dumps(binary_content))
+
+    store = JsonStore(filename, codec=binary_codec)
+    assert store
+    assert store.unwrap().content == binary_content
+
+
+def test_binary_store_rollback(tmp_path, binary_codec):
+    filename = os.path.join(tmp_path, 'test.bin')
+    store = JsonStore(filename, codec=binary_codec).unwrap()
+    store.content.update({'bytes': b'\x00\xff', 'map': {1: 'one'}})
+    assert store.commit()
+    with pytest.raises(RuntimeError):
+        with store.transaction() as t:
+            with t.savepoint():
+                store.content['bytes'] = b'changed'
+            store.content['map'][2] = 'two'
+            raise RuntimeError()
+    assert store.content == {'bytes': b'\x00\xff', 'map': {1: 'one'}}
+
+
+def test_missing_binary_backend(tmp_path):
+    codec = serialisers._missing_codec('msgpack', 'msgpack')
+    store = JsonStore(os.path.join(tmp_path, 'test.msgpack'), codec=codec)
+    assert store
+    store = store.unwrap()
+    store.content['foo'] = 'bar'
+    with pytest.raises(Panic, match='msgpack is required'):
+        store.commit()
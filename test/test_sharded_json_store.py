@@ -0,0 +1,247 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+from drresult import Panic
+from mrjsonstore import Codec, ShardedJsonStore, Transaction
+
+import pytest
+
+
+@pytest.fixture(params=[None, 4])
+def shards(request):
+    return request.param
+
+
+@pytest.fixture(params=['.json', '.yaml'])
+def extension(request):
+    return request.param
+
+
+def open_store(directory, **kwargs):
+    store = ShardedJsonStore(directory, **kwargs)
+    assert store
+    return store.unwrap()
+
+
+def mtimes(directory):
+    return {
+        name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in os.listdir(directory)
+    }
+
+
+def test_sharded_invalid_shards(tmp_path):
+    assert not ShardedJsonStore(str(tmp_path), shards=0)
+
+
+def test_sharded_roundtrip(tmp_path, shards, extension):
+    store = open_store(str(tmp_path), shards=shards, extension=extension)
+    with store.transaction() as t:
+        for i in range(10):
+            store.content[f'tenant/{i}'] = {'value': i}
+    assert t.result.unwrap() == Transaction.State.Committed
+    assert len(os.listdir(tmp_path)) == (shards or 10)
+    assert all(name.endswith(extension) for name in os.listdir(tmp_path))
+
+    store_ = open_store(str(tmp_path), shards=shards, extension=extension)
+    assert store_.content == {f'tenant/{i}': {'value': i} for i in range(10)}
+    assert len(store_.content) == 10
+    assert 'tenant/3' in store_.content
+    assert 'tenant/10' not in store_.content
+
+
+def test_sharded_commit_only_rewrites_touched_shards(tmp_path, shards):
+    store = open_store(str(tmp_path), shards=shards)
+    for i in range(20):
+        store.content[f'key{i}'] = i
+    assert store.commit()
+    before = mtimes(tmp_path)
+    os.utime(tmp_path, ns=(0, 0))
+    for name in before:
+        os.utime(os.path.join(tmp_path, name), ns=(0, 0))
+
+    with store.transaction() as t:
+        store.content['key7'] += 1
+    assert t.result
+    assert len(t.shards) == 1
+    after = mtimes(tmp_path)
+    assert [name for name, mtime in after.items() if mtime != 0] == t.shards
+
+    with open(os.path.join(tmp_path, t.shards[0])) as f:
+        assert json.load(f)['key7'] == 8
+
+
+def test_sharded_rollback(tmp_path, shards):
+    store = open_store(str(tmp_path), shards=shards)
+    store.content['foo'] = {'a': 1}
+    assert store.commit()
+    with pytest.raises(RuntimeError):
+        with store.transaction() as t:
+            store.content['foo']['a'] = 2
+            store.content['bar'] = 'baz'
+            raise RuntimeError()
+    assert t.result.unwrap() == Transaction.State.Rolledback
+    assert store.content == {'foo': {'a': 1}}
+
+    store_ = open_store(str(tmp_path), shards=shards)
+    assert store_.content == {'foo': {'a': 1}}
+
+
+def test_sharded_transaction_includes_earlier_changes(tmp_path, shards):
+    store = open_store(str(tmp_path), shards=shards)
+    store.content['foo'] = 'bar'
+    with store.transaction():
+        store.content['baz'] = 'qux'
+    store_ = open_store(str(tmp_path), shards=shards)
+    assert store_.content == {'foo': 'bar', 'baz': 'qux'}
+
+
+def test_sharded_delete_removes_empty_shard(tmp_path):
+    store = open_store(str(tmp_path))
+    store.content['foo'] = 'bar'
+    store.content['baz'] = 'qux'
+    assert store.commit()
+    assert len(os.listdir(tmp_path)) == 2
+
+    del store.content['foo']
+    assert store.commit()
+    assert os.listdir(tmp_path) == ['key-baz.json']
+    with pytest.raises(KeyError):
+        store.content['foo']
+    with pytest.raises(KeyError):
+        del store.content['foo']
+
+    store_ = open_store(str(tmp_path))
+    assert store_.content == {'baz': 'qux'}
+
+
+def test_sharded_key_escaping(tmp_path):
+    store = open_store(str(tmp_path))
+    keys = ['a/b', '..', '', 'ü']
+    for key in keys:
+        store.content[key] = key
+    assert store.commit()
+    assert len(os.listdir(tmp_path)) == len(keys)
+
+    store_ = open_store(str(tmp_path))
+    assert store_.content == {key: key for key in keys}
+
+
+def test_sharded_changed_sharding_fails(tmp_path):
+    store = open_store(str(tmp_path), shards=4)
+    for i in range(10):
+        store.content[f'key{i}'] = i
+    assert store.commit()
+    assert not ShardedJsonStore(str(tmp_path), shards=3)
+
+
+def test_sharded_store_options(tmp_path, shards):
+    store = open_store(str(tmp_path), shards=shards, journal=True, tracked=True)
+    store.content['foo'] = {'a': 1}
+    assert store.commit()
+    store.content['foo']['b'] = 2
+    assert store.commit()
+    assert any(name.endswith('.journal') for name in os.listdir(tmp_path))
+
+    store_ = open_store(str(tmp_path), shards=shards, journal=True)
+    assert store_.content == {'foo': {'a': 1, 'b': 2}}
+
+
+def test_sharded_creates_directory(tmp_path, shards):
+    directory = os.path.join(tmp_path, 'non', 'existing', 'path')
+    store = open_store(directory, shards=shards, dry_run=True)
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    assert not os.path.exists(os.path.join(tmp_path, 'non'))
+
+    store = open_store(directory, shards=shards)
+    assert store.commit()
+    assert not os.path.exists(os.path.join(tmp_path, 'non'))
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+    assert t.result
+    assert open_store(directory, shards=shards).content == {'foo': 'bar'}
+
+
+def test_sharded_commit_error(tmp_path, shards):
+    def serialise(x):
+        raise ValueError('failed')
+
+    store = open_store(str(tmp_path), shards=shards, codec=Codec('failing', serialise, json.loads))
+    with store.transaction() as t:
+        store.content['foo'] = 'bar'
+    assert not t.result
+    assert isinstance(t.result.unwrap_err(), ValueError)
+
+
+def test_sharded_nested_transaction_panics(tmp_path):
+    store = open_store(str(tmp_path))
+    t = store.transaction()
+    with pytest.raises(Panic):
+        store.transaction()
+    assert t.commit()
+
+
+def test_sharded_opens_shards_on_first_access(tmp_path, shards):
+    store = open_store(str(tmp_path), shards=shards)
+    for i in range(10):
+        store.content[f'key{i}'] = i
+    assert store.commit()
+
+    store = open_store(str(tmp_path), shards=shards)
+    assert not store._stores
+    assert store.content['key3'] == 3
+    assert list(store._stores) == [store._shard_name('key3')]
+    assert len(store.content) == 10
+    assert len(store._stores) == len(os.listdir(tmp_path))
+
+
+def test_sharded_reads_do_not_write(tmp_path, shards):
+    store = open_store(str(tmp_path), shards=shards)
+    for i in range(20):
+        store.content[f'key{i}'] = {'value': [i]}
+    assert store.commit()
+    before = mtimes(tmp_path)
+    for name in before:
+        os.utime(os.path.join(tmp_path, name), ns=(0, 0))
+
+    for key, value in store.content.items():
+        assert value['value'][0] == int(key[3:])
+    assert store.commit()
+    with store.transaction() as t:
+        assert 'key1' in store.content
+        assert store.content['key2']['value'] == [2]
+    assert t.shards == []
+    assert all(mtime == 0 for mtime in mtimes(tmp_path).values())
+
+    with store.transaction() as t:
+        store.content['key3']['value'].append(4)
+    assert t.shards == [store._shard_name('key3')]
+    assert open_store(str(tmp_path), shards=shards).content['key3'] == {'value': [3, 4]}
+
+
+def test_sharded_rollback_of_change_in_place(tmp_path, shards):
+    store = open_store(str(tmp_path), shards=shards)
+    store.content['foo'] = {'a': [1]}
+    assert store.commit()
+    foo = store.content['foo']
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            foo['a'].append(2)
+            raise RuntimeError()
+    assert store.content == {'foo': {'a': [1]}}
+
+
+def test_sharded_untracked_fails(tmp_path):
+    assert not ShardedJsonStore(str(tmp_path), tracked=False)
+
+
+def test_sharded_misplaced_key_fails_on_access(tmp_path):
+    store = open_store(str(tmp_path))
+    store.content['foo'] = 'bar'
+    assert store.commit()
+    os.rename(os.path.join(tmp_path, 'key-foo.json'), os.path.join(tmp_path, 'key-baz.json'))
+    store = open_store(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.content['baz']
@@ -0,0 +1,106 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import json
+import math
+import mrjsonstore.streaming
+from mrjsonstore.streaming import dump_object, load_json
+
+import pytest
+
+
+@pytest.fixture(params=[1, 3, 64, 1 << 20])
+def chunk_size(request):
+    return request.param
+
+
+documents = [
+    {},
+    {'foo': 'bar'},
+    {'a': 1, 'b': 12345678901234567890, 'c': -1.5e-10, 'd': True, 'e': None},
+    {'nested': {'list': [1, [2, [3]], {'x': 'y'}], 'empty': {}}, 'other': []},
+    {'unicode': 'äöü € \U0001f600', 'escaped': 'a"b\\c\nd\u0000', 'ke"y': 'v'},
+    {'long': 'x' * 10000, 'numbers': list(range(1000))},
+    [1, 2, 3],
+    'string',
+    42,
+    None,
+]
+
+
+@pytest.mark.parametrize('document', documents)
+@pytest.mark.parametrize('indent', [None, 2])
+def test_load_json_matches_stdlib(document, indent, chunk_size):
+    text = json.dumps(document, indent=indent, ensure_ascii=False)
+    assert load_json(io.StringIO(text), chunk_size) == json.loads(text)
+
+
+def test_load_json_whitespace(chunk_size):
+    text = ' \n{ "a" :\t1 ,\r\n "b" : [ 1 , 2 ] }\n\n '
+    assert load_json(io.StringIO(text), chunk_size) == {'a': 1, 'b': [1, 2]}
+
+
+def test_load_json_keeps_order_and_last_duplicate(chunk_size):
+    loaded = load_json(io.StringIO('{"b": 1, "a": 2, "b": 3}'), chunk_size)
+    assert loaded == {'b': 3, 'a': 2}
+    assert list(loaded) == ['b', 'a']
+
+
+def test_load_json_non_standard_literals(chunk_size):
+    loaded = load_json(io.StringIO('{"nan": NaN, "inf": Infinity, "ninf": -Infinity}'), chunk_size)
+    assert math.isnan(loaded['nan'])
+    assert loaded['inf'] == float('inf')
+    assert loaded['ninf'] == float('-inf')
+
+
+@pytest.mark.parametrize(
+    'text',
+    [
+        '',
+        '   ',
+        '{',
+        '{"a"}',
+        '{"a": }',
+        '{"a": 1',
+        '{"a": 1,}',
+        '{"a": 1 "b": 2}',
+        '{1: 2}',
+        '{"a": 1} x',
+        '{"a": 1}{}',
+        '{"a": [1, 2}',
+        '[1, 2',
+    ],
+)
+def test_load_json_invalid(text, chunk_size):
+    with pytest.raises(json.JSONDecodeError):
+        load_json(io.StringIO(text), chunk_size)
+
+
+@pytest.mark.parametrize('document', documents)
+@pytest.mark.parametrize('separator', [', ', ','])
+def test_dump_object_matches_stdlib(document, separator, monkeypatch, chunk_size):
+    monkeypatch.setattr(mrjsonstore.streaming, 'CHUNK_SIZE', chunk_size)
+    f = io.StringIO()
+    dump_object(document, f, json.dumps, separator)
+    assert json.loads(f.getvalue()) == document
+
+
+def test_dump_object_like_dumps(monkeypatch, chunk_size):
+    monkeypatch.setattr(mrjsonstore.streaming, 'CHUNK_SIZE', chunk_size)
+    document = {f'key{i}': {'value': 'x' * i} for i in range(100)}
+    f = io.StringIO()
+    dump_object(document, f, json.dumps, ', ')
+    assert f.getvalue() == json.dumps(document)
+
+
+def test_dump_object_batches_calls():
+    calls = []
+
+    def dumps(x):
+        calls.append(len(x))
+        return json.dumps(x)
+
+    dump_object({f'key{i}': i for i in range(1000)}, io.StringIO(), dumps, ', ')
+    assert sum(calls) == 1000
+    assert len(calls) < 20